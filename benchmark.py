@@ -0,0 +1,205 @@
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import main
+
+generate_rows = 1000000  # How many synthetic rows generate_dataset makes and writes at a time
+attr_names = ["Age", "Ht", "TailLn", "HairLn", "BangLn", "Reach", "EarLobes"]  # The attributes of a training file
+
+# The mean and standard deviation of the age, height, tail length, hair length and bang length of each class, and
+# how much longer the reach is than the height, and how likely the ear lobes are, measured on 'training.csv'
+class_shapes = {
+    -1: {"name": "Assam", "means": [48.0, 146.0, 12.0, 8.1, 5.0], "stds": [11.4, 11.7, 4.2, 1.5, 1.0],
+         "reach": (2.8, 0.7), "ear_lobes": 0.1},
+    1: {"name": "Bhutan", "means": [43.1, 144.0, 9.1, 9.9, 6.0], "stds": [10.2, 10.5, 5.3, 2.0, 1.0],
+        "reach": (4.9, 1.5), "ear_lobes": 0.9},
+}
+
+
+# This function will parse an amount of rows such as '10000', '10k' or '10M'.
+#
+# argument 1 (text) - the amount of rows, as given in the command line
+def parse_row_count(text):
+    multipliers = {"k": 1000, "m": 1000000}
+    if text[-1:].lower() in multipliers:
+        return int(float(text[:-1]) * multipliers[text[-1:].lower()])
+    return int(text)
+
+
+# This function will write a synthetic training csv file with the same columns as 'training.csv'. Half of the
+# rows are Assams and half are Bhutans (in random order), and the attributes of each class are drawn from normal
+# distributions shaped like the ones in 'training.csv', so the decision tree has something real to learn.
+#
+# argument 1 (file_name) - the name of the csv file that is written
+# argument 2 (row_count) - the amount of rows to write
+# argument 3 (seed) - the seed of the random numbers, so the same file can be made again
+def generate_dataset(file_name, row_count, seed):
+    rng = np.random.default_rng(seed)
+    with open(file_name, "w") as csv_file:
+        csv_file.write(",".join(attr_names) + ",ClassName,ClassID\n")
+        for chunk_start in range(0, row_count, generate_rows):
+            chunk_size = min(generate_rows, row_count - chunk_start)
+            class_ids = np.where(rng.random(chunk_size) < 0.5, -1, 1)
+
+            values = np.empty((chunk_size, 7))
+            for class_id, shape in class_shapes.items():
+                in_class = class_ids == class_id
+                class_size = int(np.count_nonzero(in_class))
+                values[in_class, :5] = rng.normal(shape["means"], shape["stds"], (class_size, 5))
+                values[in_class, 5] = values[in_class, 1] + rng.normal(shape["reach"][0], shape["reach"][1],
+                                                                       class_size)
+                values[in_class, 6] = rng.random(class_size) < shape["ear_lobes"]
+
+            csv_file.writelines("%.1f,%.1f,%.1f,%.1f,%.1f,%.1f,%d,%s,%d\n" %
+                                (*row, class_shapes[class_id]["name"], class_id)
+                                for row, class_id in zip(values.tolist(), class_ids.tolist()))
+
+
+# This function will train the decision tree on one synthetic data set and time each phase separately: loading
+# the csv file, training the tree with best_split, simplifying it and writing the trained program. It returns the
+# timings (in seconds) along with the size of the tree and the peak memory of training. It is run in a spawned
+# process for each data set (see run_suite), so the peak memory of the process is the peak of this data set alone.
+#
+# argument 1 (file_name) - the name of the synthetic csv file
+# argument 2 (program_name) - the name of the trained program that is written
+# argument 3 (args) - the command line arguments
+def run_benchmark(file_name, program_name, args):
+    timings = {}
+    main.split_mode = args.split_mode
+
+    # The phases print their own progress, which is kept out of the benchmark report
+    with contextlib.redirect_stdout(io.StringIO()):
+        start_time = time.perf_counter()
+        columns = main.load_training_file(file_name)
+        timings["load"] = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        main.train_tree(columns)
+        timings["train"] = time.perf_counter() - start_time
+        trained_nodes = len(main.decision_tree)
+
+        start_time = time.perf_counter()
+        main.simplify_tree()
+        timings["simplify"] = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        main.write_trained_program(args.classifier, program_name)
+        timings["write_program"] = time.perf_counter() - start_time
+
+    return {"rows": len(main.record_index), "seconds": timings, "trained_nodes": trained_nodes,
+            "nodes": len(main.decision_tree), "depth": main.total_depth,
+            "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+# This function will score a synthetic data set with the trained program, and returns how long it took (in
+# seconds) and the peak memory of the trained program. The program is waited for with os.wait4, which gives the
+# usage of that one process rather than the largest of every child so far. A new process starts with the peak
+# memory of the process that made it, so the peak is never reported below the (small) peak of this process.
+#
+# argument 1 (program_name) - the name of the trained program
+# argument 2 (file_name) - the name of the synthetic csv file
+def score_dataset(program_name, file_name):
+    start_time = time.perf_counter()
+    score_command = [sys.executable, program_name, file_name, os.devnull]
+    scoring = subprocess.Popen(score_command, stdout=subprocess.DEVNULL)
+    _, wait_status, score_usage = os.wait4(scoring.pid, 0)
+    scoring.returncode = os.waitstatus_to_exitcode(wait_status)
+    if scoring.returncode != 0:
+        raise subprocess.CalledProcessError(scoring.returncode, score_command)
+    return time.perf_counter() - start_time, score_usage.ru_maxrss
+
+
+# This function will print how long each phase of one benchmark took, and how it compares to the same amount
+# of rows in an earlier results file.
+#
+# argument 1 (result) - the result of run_benchmark
+# argument 2 (baseline) - the result of an earlier run with the same amount of rows, or None
+def print_result(result, baseline):
+    print(format(result["rows"], ",") + " rows (" + str(result["trained_nodes"]) + " nodes, " +
+          str(result["nodes"]) + " after simplifying, " + str(result["depth"]) + " levels)")
+    for phase, seconds in result["seconds"].items():
+        line = "    " + phase.ljust(14) + format(seconds, "9.3f") + " s " + \
+               format(result["rows"] / max(seconds, 1e-9), "14,.0f") + " rows/s"
+        if baseline is not None and baseline["seconds"].get(phase):
+            line += " (" + format(seconds / baseline["seconds"][phase], ".2f") + "x the baseline)"
+        print(line)
+    print("    peak memory   " + format(result["max_rss_kb"] / 1024, "9.1f") + " MB training, " +
+          format(result["score_max_rss_kb"] / 1024, ".1f") + " MB scoring")
+
+
+# This function will generate the synthetic data sets (or reuse the ones from an earlier run), benchmark each of
+# them and write the results into a json file. A process starts with the peak memory of the process that made it,
+# so generating and training happen in spawned processes, and this process (which also starts the trained
+# programs) stays small.
+#
+# argument 1 (args) - the command line arguments
+def run_suite(args):
+    baselines = {}
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baselines = {result["rows"]: result for result in json.load(baseline_file)["results"]}
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = []
+    for row_count in [parse_row_count(size) for size in args.sizes.split(",")]:
+        file_name = os.path.abspath(os.path.join(args.data_dir, "synthetic_" + str(row_count) + "_" +
+                                                 str(args.seed) + ".csv"))
+        program_name = os.path.join(args.data_dir, "HW05_Classifier_Hu.py")  # The trained program that is scored
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as size_pool:
+            if not os.path.exists(file_name):
+                start_time = time.perf_counter()
+                size_pool.submit(generate_dataset, file_name, row_count, args.seed).result()
+                print("Generated '" + file_name + "' in " + format(time.perf_counter() - start_time, ".3f") + " s")
+
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as size_pool:
+            result = size_pool.submit(run_benchmark, file_name, program_name, args).result()
+        result["seconds"]["score"], result["score_max_rss_kb"] = score_dataset(program_name, file_name)
+        results.append(result)
+        print_result(result, baselines.get(row_count))
+
+    with open(args.output, "w") as output_file:
+        json.dump({"python": platform.python_version(), "platform": platform.platform(),
+                   "cpu_count": os.cpu_count(), "split_mode": args.split_mode, "classifier": args.classifier,
+                   "seed": args.seed, "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results},
+                  output_file, indent=2)
+    print("Wrote '" + args.output + "'")
+
+
+# This function will run the benchmark suite with the options in the command line.
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark loading, training, writing the trained program and "
+                                                 "scoring on synthetic data sets of increasing size.")
+    parser.add_argument("--sizes", default="10k,100k,1M",
+                        help="the comma-separated amounts of rows of each data set, up to 10M (default: 10k,100k,1M)")
+    parser.add_argument("--seed", type=int, default=6, help="the seed of the synthetic data (default: 6)")
+    parser.add_argument("--data-dir", default="benchmark_data",
+                        help="where the synthetic data sets are kept between runs (default: benchmark_data)")
+    parser.add_argument("--split-mode", choices=["sorted", "histogram"], default="sorted",
+                        help="how best_split finds thresholds (default: sorted)")
+    parser.add_argument("--classifier", choices=["rows", "numpy"], default="rows",
+                        help="which trained program is written and scored (default: rows)")
+    parser.add_argument("--output", default="benchmark_results.json",
+                        help="the json file the results are written to (default: benchmark_results.json)")
+    parser.add_argument("--baseline", help="an earlier results file to compare each phase against")
+    args = parser.parse_args()
+
+    try:
+        run_suite(args)
+
+    # If a file is unable to be opened or written for whatever reason, we will inform the user.
+    except OSError as error:
+        print("Error - " + str(error))
+    except ValueError as error:
+        print("Error - " + str(error))
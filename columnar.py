@@ -0,0 +1,229 @@
+import sys
+import time
+from array import array
+
+import numpy as np
+
+chunk_rows = 1 << 20  # How many rows of a csv file read_csv_columns parses at a time
+min_entropy_gain = 1e-12  # Splits that lower the entropy of a node by less than this are not made, like in main.py
+
+
+# This function will read a training csv file in large chunks, and parses and normalizes a whole column of each
+# chunk at once with NumPy instead of one field at a time. It returns the same columns as the row-by-row loader
+# in main.py (arrays of ints, one for each attribute followed by one for the class ids). The open file is handed
+# to np.loadtxt, whose C reader parses each chunk without building a Python string for every line.
+#
+# argument 1 (file_name) - the name of the training csv file
+# argument 2 (attr_steps) - what each of the seven attributes is rounded to
+def read_csv_columns(file_name, attr_steps):
+    columns = [array('i') for _ in range(8)]
+    steps = np.array(attr_steps, dtype=np.float64)
+
+    with open(file_name, "rb") as csv_file:
+        csv_file.readline()  # We ignore the headers
+        while csv_file.peek(1):
+            # The class name (the eighth field) is the only field that is not a number, so it is skipped
+            values = np.loadtxt(csv_file, delimiter=",", usecols=(0, 1, 2, 3, 4, 5, 6, 8), dtype=np.float64,
+                                ndmin=2, max_rows=chunk_rows, encoding="latin1")
+            if len(values) == 0:
+                break
+
+            # Each attribute is rounded in place to the nearest multiple of its step, rounding halves to even like
+            # round()
+            attributes = values[:, :7]
+            np.divide(attributes, steps, out=attributes)
+            np.rint(attributes, out=attributes)
+            np.multiply(attributes, steps, out=attributes)
+            chunk_columns = values.astype(np.int32).T
+            for value_index in range(8):
+                columns[value_index].frombytes(np.ascontiguousarray(chunk_columns[value_index]).tobytes())
+
+    return columns
+
+
+# This function will load the columns of the normalized records into a NumPy array. There is one row of the
+# array for each of the seven attributes followed by one row for the class id, so columns[7] holds the class ids.
+#
+# argument 1 (store_columns) - the columns of the normalized records returned by load_training_file in main.py
+def load_columns(store_columns):
+    return np.array([np.asarray(column) for column in store_columns], dtype=np.int64).reshape(8, -1)
+
+
+# This function will build the n x log(n) table for every amount of records from 0 up to the size of the
+# training data set, the same way build_nlogn_table in main.py does.
+#
+# argument 1 (record_count) - the amount of records in the training data set
+def nlogn_column(record_count):
+    amounts = np.arange(record_count + 1, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        table = amounts * np.log(amounts)
+    table[0] = 0.0  # 0 x log(0) is treated as 0, just like the entropy formula does
+    return table
+
+
+# This function will determine the best threshold of a single attribute for a set of rows. The class counts of
+# every integer threshold between the smallest and largest value of the attribute are found with a cumulative
+# sum over the counts of each value, and the weighted entropy of every threshold is evaluated at once. Ties are
+# broken in favour of the smallest threshold, just like best_split in main.py. Thresholds that leave either side
+# empty are not splits at all, so their entropy is made infinite.
+#
+# argument 1 (values) - the values of the attribute for each row of the node
+# argument 2 (is_bhutan) - whether each row of the node is a Bhutan
+# argument 3 (attr_bound) - the smallest and largest value of the attribute over the whole training data set
+# argument 4 (nlogn_table) - the n x log(n) table returned by nlogn_column
+def sweep_column(values, is_bhutan, attr_bound, nlogn_table):
+    bin_count = attr_bound[1] - attr_bound[0] + 1
+    bins = values - attr_bound[0]
+    total = len(values)
+
+    # The amount of records (and Bhutans) at or below each threshold
+    left_total = np.cumsum(np.bincount(bins, minlength=bin_count))
+    left_bhutan = np.cumsum(np.bincount(bins[is_bhutan], minlength=bin_count))
+    left_assam = left_total - left_bhutan
+    right_total = total - left_total
+    right_bhutan = left_bhutan[-1] - left_bhutan
+    right_assam = right_total - right_bhutan
+
+    # The weighted entropy is found from the integer class counts with the n x log(n) table, like table_entropy
+    # in main.py does
+    wei_entropy = (nlogn_table[left_total] - nlogn_table[left_assam] - nlogn_table[left_bhutan] +
+                   nlogn_table[right_total] - nlogn_table[right_assam] - nlogn_table[right_bhutan]) / total
+    wei_entropy[(left_total == 0) | (right_total == 0)] = np.inf
+
+    best_bin = int(np.argmin(wei_entropy))
+    return float(wei_entropy[best_bin]), attr_bound[0] + best_bin
+
+
+# This function will build the decision tree from NumPy columns instead of lists of records. It fills the same
+# kind of decision tree that best_split in main.py does (so write_trained_program keeps working), using the same
+# stopping criteria, and returns the total amount of levels of the decision tree.
+#
+# argument 1 (columns) - the column arrays returned by load_columns
+# argument 2 (attr_bounds) - the smallest and largest value of each attribute that can be split on
+# argument 3 (decision_tree) - the empty DecisionTree from main.py that we fill in
+# argument 4 (stop_rules) - the depth, amount of records and purity that stop a node from splitting
+def train_columns(columns, attr_bounds, decision_tree, stop_rules=(10, 9, 0.95)):
+    max_depth, min_records, purity = stop_rules
+    total_depth = 0
+    nlogn_table = nlogn_column(columns.shape[1])
+
+    # We keep a stack of nodes to split, where each node is the array of its rows, its depth, and its node
+    node_stack = [(np.arange(columns.shape[1]), 0, decision_tree.add_node())]
+    while node_stack:
+        rows, depth, node = node_stack.pop()
+        total_depth = max(total_depth, depth + 1)
+
+        is_bhutan = columns[7][rows] == 1
+        bhutan = int(np.count_nonzero(is_bhutan))
+        assam = len(rows) - bhutan
+
+        # The class that appears more frequently in the rows, and its percentage
+        if len(rows) == 0:
+            major_class = 0
+            major_percent = 0
+        elif assam > bhutan:
+            major_class = -1
+            major_percent = assam / (assam + bhutan)
+        else:
+            major_class = 1
+            major_percent = bhutan / (assam + bhutan)
+        decision_tree.value[node] = major_class
+        decision_tree.samples[node] = len(rows)
+
+        # If the decision tree already has its deepest level (11 levels by default), or there are fewer records
+        # than the minimum (9), or if the percentage of the majority class is greater than the purity (95
+        # percent), or if the rows only have one class, we will stop splitting
+        if depth >= max_depth or len(rows) < min_records or major_percent > purity or assam == 0 or bhutan == 0:
+            continue
+
+        best_attribute = 0  # We initialize the best attribute to be the age
+        best_threshold = attr_bounds[0][0]  # We initialize the best attribute to be the min threshold of age
+        best_entropy = 1  # We initialize the best weighted entropy to be the worst possible
+        for list_counter in range(len(attr_bounds)):
+            local_best_ent, local_best_thr = sweep_column(columns[list_counter][rows], is_bhutan,
+                                                          attr_bounds[list_counter], nlogn_table)
+            if local_best_ent < best_entropy:
+                best_attribute = list_counter
+                best_threshold = local_best_thr
+                best_entropy = local_best_ent
+
+        # If even the best split would not lower the entropy of the rows, the node stays a leaf
+        node_entropy = (nlogn_table[len(rows)] - nlogn_table[assam] - nlogn_table[bhutan]) / len(rows)
+        if node_entropy - best_entropy <= min_entropy_gain:
+            continue
+
+        node1, node2 = decision_tree.split_node(node, best_attribute, best_threshold)
+
+        # The second split is pushed first so that the first split is built first, like the recursion in best_split
+        in_split1 = columns[best_attribute][rows] <= best_threshold
+        node_stack.append((rows[~in_split1], depth + 1, node2))
+        node_stack.append((rows[in_split1], depth + 1, node1))
+
+    return total_depth
+
+
+# This function will train the decision tree on a csv file with both the list-based best_split in main.py and
+# the NumPy columns, and prints how long each of them took and whether they built the same decision tree.
+#
+# argument 1 (file_name) - the name of the training csv file
+def compare_backends(file_name):
+    import main
+
+    store_columns = main.load_training_file(file_name)
+
+    start_time = time.perf_counter()
+    main.train_tree(store_columns)
+    list_time = time.perf_counter() - start_time
+    list_tree = main.decision_tree
+
+    main.reset_tree()
+    start_time = time.perf_counter()
+    columns = load_columns(store_columns)
+    load_time = time.perf_counter() - start_time
+    main.total_depth = train_columns(columns, main.attr_bounds, main.decision_tree,
+                                     (main.stop_depth, main.stop_records, main.stop_purity))
+    numpy_time = time.perf_counter() - start_time
+
+    print("records: " + str(columns.shape[1]))
+    print("lists (" + main.split_mode + "): " + format(list_time, ".3f") + " s")
+    print("numpy: " + format(numpy_time, ".3f") + " s (" + format(load_time, ".3f") + " s loading columns)")
+    print("same decision tree: " + str(all(getattr(list_tree, name) == getattr(main.decision_tree, name)
+                                           for name in ["feature", "threshold", "left", "right", "value"])))
+
+
+# This function will load a training csv file with both the row-by-row loader in main.py and read_csv_columns,
+# and prints how many rows per second each of them parsed and whether they gave the same columns.
+#
+# argument 1 (file_name) - the name of the training csv file
+def compare_loaders(file_name):
+    import main
+
+    start_time = time.perf_counter()
+    records = list(main.stream_training_file(file_name))
+    row_columns = [array('i', [a_record[value_index] for a_record in records]) for value_index in range(8)]
+    row_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    bulk_columns = read_csv_columns(file_name, main.attr_steps)
+    bulk_time = time.perf_counter() - start_time
+
+    print("row-by-row loader: " + format(len(records) / max(row_time, 1e-9), ",.0f") + " rows per second")
+    print("bulk loader: " + format(len(records) / max(bulk_time, 1e-9), ",.0f") + " rows per second (" +
+          format(row_time / max(bulk_time, 1e-9), ".1f") + "x)")
+    print("same columns: " + str(row_columns == bulk_columns))
+
+
+# This function will compare the loading and training time of the list-based and NumPy backends on the csv file
+# specified in the command line.
+if __name__ == '__main__':
+    # If the amount of arguments (plus the name of the program) is not 2, we will inform the user.
+    if len(sys.argv) != 2:
+        print("Error - invalid number of arguments (must specify the training csv file)")
+    else:
+        try:
+            compare_loaders(sys.argv[1])
+            compare_backends(sys.argv[1])
+
+        # If the file is unable to be opened for whatever reason, we will inform the user.
+        except OSError:
+            print("Error - cannot open file '" + sys.argv[1] + "'")
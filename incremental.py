@@ -0,0 +1,336 @@
+import argparse
+import json
+import math
+import os
+import time
+
+import main
+
+state_format = "HW06STATE1"  # The format of the state files written by TreeState.save
+hoeffding_delta = 1e-7  # The chance that the Hoeffding bound lets a node pick a split that is not really the best
+hoeffding_tie = 0.05  # Splits closer than this are treated as a tie, so a node is not stuck between two of them
+grace_records = 200  # A node only looks for a new split once its histograms hold at least this many records
+
+
+# This class holds a decision tree along with the sufficient statistics of each of its nodes: how many Assams and
+# Bhutans have reached the node, and a histogram of the classes over the bins of each attribute. New records only
+# ever add to the statistics of the nodes they pass through, so absorbing them costs the same however many
+# records the tree has seen before. A node made by an incremental split starts with empty histograms (the
+# records of its parent are gone), and fills them as new records reach it, like the leaves of a Hoeffding tree.
+class TreeState:
+    __slots__ = ("tree", "class_counts", "histograms", "attr_bounds", "stop_rules", "touched")
+
+    # argument 1 (tree) - the DecisionTree the statistics belong to
+    # argument 2 (attr_bounds) - the smallest and largest value of each attribute, which are the bins of the
+    #                            histograms
+    # argument 3 (stop_rules) - the depth, amount of records and purity that stop a node from splitting
+    def __init__(self, tree, attr_bounds, stop_rules):
+        self.tree = tree
+        self.attr_bounds = [list(bounds) for bounds in attr_bounds]
+        self.stop_rules = tuple(stop_rules)
+        self.class_counts = [[0, 0] for _ in range(len(tree))]  # The Assams and Bhutans of each node
+        self.histograms = [self.empty_histograms() for _ in range(len(tree))]  # The histograms of each node
+        self.touched = set()  # The nodes that new records have reached since the splits were last updated
+
+    # This function will make a histogram for every attribute with no records in it.
+    def empty_histograms(self):
+        return [[[0] * (high - low + 1), [0] * (high - low + 1)] for low, high in self.attr_bounds]
+
+    # This function will add a node to the tree with empty statistics, and returns the node.
+    #
+    # argument 1 (node_stats) - the statistics the node starts with
+    def add_node(self, node_stats):
+        self.class_counts.append([node_stats.assam, node_stats.bhutan])
+        self.histograms.append(self.empty_histograms())
+        return self.tree.add_node(node_stats.total(), node_stats.major_class())
+
+    # This function will widen the bins of an attribute so that a value outside of them has a bin, by adding
+    # empty bins to the histograms of every node.
+    #
+    # argument 1 (attr_index) - the attribute whose bins are widened
+    # argument 2 (value) - the value that needs a bin
+    def widen_bins(self, attr_index, value):
+        low, high = self.attr_bounds[attr_index]
+        low_bins = max(low - value, 0)
+        high_bins = max(value - high, 0)
+        for node_histograms in self.histograms:
+            for class_slot in range(2):
+                node_histograms[attr_index][class_slot] = ([0] * low_bins + node_histograms[attr_index][class_slot] +
+                                                           [0] * high_bins)
+        self.attr_bounds[attr_index] = [low - low_bins, high + high_bins]
+
+    # This function will add a normalized record to the statistics of every node it passes through.
+    #
+    # argument 1 (a_record) - the normalized record, with its class id last
+    def absorb(self, a_record):
+        for attr_index, (low, high) in enumerate(self.attr_bounds):
+            if not low <= a_record[attr_index] <= high:
+                self.widen_bins(attr_index, a_record[attr_index])
+
+        tree = self.tree
+        class_slot = 1 if a_record[7] == 1 else 0
+        node = 0
+        while True:
+            node_counts = self.class_counts[node]
+            node_counts[class_slot] += 1
+            tree.samples[node] = node_counts[0] + node_counts[1]
+            tree.value[node] = main.NodeStats(node_counts[0], node_counts[1]).major_class()
+            for attr_index, node_histogram in enumerate(self.histograms[node]):
+                node_histogram[class_slot][a_record[attr_index] - self.attr_bounds[attr_index][0]] += 1
+            self.touched.add(node)
+
+            if tree.left[node] == -1:
+                break
+            if a_record[tree.feature[node]] <= tree.threshold[node]:
+                node = tree.left[node]
+            else:
+                node = tree.right[node]
+
+    # This function will find the best threshold of every attribute of a node from its histograms, and returns
+    # them as (weighted entropy, attribute, threshold) from the best to the worst.
+    #
+    # argument 1 (node) - the node of the tree
+    def attribute_splits(self, node):
+        attribute_splits = []
+        for attr_index, node_histogram in enumerate(self.histograms[node]):
+            best_entropy, best_threshold = main.sweep_histogram(node_histogram, self.attr_bounds[attr_index][0],
+                                                                main.weighted_entropy)
+            attribute_splits.append((best_entropy, attr_index, best_threshold))
+        attribute_splits.sort()
+        return attribute_splits
+
+    # This function will count the Assams and Bhutans that a node's histograms hold.
+    #
+    # argument 1 (node) - the node of the tree
+    def histogram_stats(self, node):
+        return main.NodeStats(sum(self.histograms[node][0][0]), sum(self.histograms[node][0][1]))
+
+    # This function will split a node on a new attribute and threshold. Its old children (and their subtrees) are
+    # dropped, and the new children start with the class counts of the node's histogram on each side of the
+    # threshold and with empty histograms.
+    #
+    # argument 1 (node) - the node that is split
+    # argument 2 (attr_index) - the attribute the node is split on
+    # argument 3 (threshold) - the threshold the node is split on
+    def split_node(self, node, attr_index, threshold):
+        child_stats = main.split_stats(self.histograms[node][attr_index], self.attr_bounds[attr_index][0], threshold)
+        self.tree.feature[node] = attr_index
+        self.tree.threshold[node] = threshold
+        self.tree.left[node] = self.add_node(child_stats[0])
+        self.tree.right[node] = self.add_node(child_stats[1])
+
+    # This function will look for better splits in every node that new records have reached, from the root down.
+    # A leaf is split once the stopping rules allow it and the Hoeffding bound says its best attribute really is
+    # better than its second best. A split is split again if the Hoeffding bound says its histograms now prefer
+    # another attribute or threshold over the one it has. Nodes that no new records reached are never looked at,
+    # so an update costs the same however big the tree or its history is. It returns how many leaves were split
+    # and how many splits were replaced.
+    def update_splits(self):
+        tree = self.tree
+        new_splits = 0
+        changed_splits = 0
+        node_stack = [(0, 0)]
+        while node_stack:
+            node, depth = node_stack.pop()
+            if node not in self.touched:
+                continue
+            histogram_stats = self.histogram_stats(node)
+            record_count = histogram_stats.total()
+
+            if tree.is_leaf(node):
+                if record_count < grace_records or \
+                        main.stop_splitting(depth, main.NodeStats(*self.class_counts[node]), self.stop_rules):
+                    continue
+                attribute_splits = self.attribute_splits(node)
+                best_entropy, best_attribute, best_threshold = attribute_splits[0]
+                bound = hoeffding_bound(record_count)
+
+                # A split that does not lower the entropy of the node would not separate anything
+                if histogram_stats.entropy() - best_entropy > main.min_entropy_gain and \
+                        (attribute_splits[1][0] - best_entropy > bound or bound < hoeffding_tie):
+                    self.split_node(node, best_attribute, best_threshold)
+                    new_splits += 1
+                continue
+
+            if record_count >= grace_records:
+                attribute_splits = self.attribute_splits(node)
+                best_entropy, best_attribute, best_threshold = attribute_splits[0]
+
+                # The weighted entropy of the split the node already has, measured on the same histograms
+                stats1, stats2 = main.split_stats(self.histograms[node][tree.feature[node]],
+                                                  self.attr_bounds[tree.feature[node]][0], tree.threshold[node])
+                split_entropy = main.weighted_entropy(stats1.assam, stats1.bhutan, stats2.assam, stats2.bhutan)
+                if (best_attribute, best_threshold) != (tree.feature[node], tree.threshold[node]) and \
+                        split_entropy - best_entropy > hoeffding_bound(record_count):
+                    self.split_node(node, best_attribute, best_threshold)
+                    changed_splits += 1
+                    continue
+
+            node_stack.append((tree.left[node], depth + 1))
+            node_stack.append((tree.right[node], depth + 1))
+
+        self.touched.clear()
+        return new_splits, changed_splits
+
+    # This function will determine how many levels the tree has.
+    def depth(self):
+        total_depth = 0
+        node_stack = [(0, 1)]
+        while node_stack:
+            node, level = node_stack.pop()
+            total_depth = max(total_depth, level)
+            if not self.tree.is_leaf(node):
+                node_stack.append((self.tree.left[node], level + 1))
+                node_stack.append((self.tree.right[node], level + 1))
+        return total_depth
+
+    # This function will write the tree and its statistics into a state file. Nodes that were dropped when their
+    # parent was split again are left out, and the nodes are numbered from the root down.
+    #
+    # argument 1 (state_name) - the name of the state file
+    def save(self, state_name):
+        tree = self.tree
+        kept_nodes = [0]  # The nodes that can still be reached, in the order they are written
+        new_nodes = {0: 0}  # The number each kept node gets in the state file
+        for node in kept_nodes:
+            if not tree.is_leaf(node):
+                for child in (tree.left[node], tree.right[node]):
+                    new_nodes[child] = len(kept_nodes)
+                    kept_nodes.append(child)
+
+        state = {"format": state_format, "attr_bounds": self.attr_bounds, "stop_rules": self.stop_rules,
+                 "feature": [tree.feature[node] for node in kept_nodes],
+                 "threshold": [tree.threshold[node] for node in kept_nodes],
+                 "left": [new_nodes.get(tree.left[node], -1) for node in kept_nodes],
+                 "right": [new_nodes.get(tree.right[node], -1) for node in kept_nodes],
+                 "class_counts": [self.class_counts[node] for node in kept_nodes],
+                 "histograms": [self.histograms[node] for node in kept_nodes]}
+
+        # The state is written next to the old one first, so an interrupted update never leaves a broken state
+        with open(state_name + ".tmp", "w") as state_file:
+            json.dump(state, state_file, separators=(",", ":"))
+        os.replace(state_name + ".tmp", state_name)
+
+    # This function will load a state file written by save.
+    #
+    # argument 1 (state_name) - the name of the state file
+    @staticmethod
+    def load(state_name):
+        with open(state_name) as state_file:
+            try:
+                state = json.load(state_file)
+            except ValueError:
+                state = None  # The file is not json at all
+        if not isinstance(state, dict) or state.get("format") != state_format:
+            raise ValueError("'" + state_name + "' is not a state file")
+
+        tree = main.DecisionTree()
+        for node in range(len(state["feature"])):
+            node_counts = state["class_counts"][node]
+            tree.add_node(node_counts[0] + node_counts[1],
+                          main.NodeStats(node_counts[0], node_counts[1]).major_class())
+            tree.feature[node] = state["feature"][node]
+            tree.threshold[node] = state["threshold"][node]
+            tree.left[node] = state["left"][node]
+            tree.right[node] = state["right"][node]
+
+        tree_state = TreeState(tree, state["attr_bounds"], state["stop_rules"])
+        tree_state.class_counts = state["class_counts"]
+        tree_state.histograms = state["histograms"]
+        return tree_state
+
+
+# This function will determine the Hoeffding bound for a node: with probability 1 - hoeffding_delta, the
+# difference in weighted entropy between two splits measured on this many records is within the bound of the
+# true difference. The entropy of two classes (in natural log) ranges over ln(2).
+#
+# argument 1 (record_count) - the amount of records the splits were measured on
+def hoeffding_bound(record_count):
+    return math.sqrt(math.log(2) ** 2 * math.log(1 / hoeffding_delta) / (2 * record_count))
+
+
+# This function will train a decision tree on a training file with best_split, and returns its state with the
+# statistics of every node filled in from the training records.
+#
+# argument 1 (file_name) - the name of the training csv file or binary column cache
+def train_state(file_name):
+    columns = main.load_training_file(file_name)
+    main.train_tree(columns)
+    tree_state = TreeState(main.decision_tree, main.attr_bounds,
+                           (main.stop_depth, main.stop_records, main.stop_purity))
+    for a_record in zip(*columns):
+        tree_state.absorb(a_record)
+    tree_state.touched.clear()
+    return tree_state
+
+
+# This function will train a new state on the rows file or add the rows file to an existing state, and writes
+# the state, the trained program and the model file of the updated tree.
+#
+# argument 1 (args) - the command line arguments
+def run_update(args):
+    start_time = time.perf_counter()
+    if args.init:
+        main.stop_depth, main.stop_records, main.stop_purity = args.max_depth, args.min_records, args.purity
+        tree_state = train_state(args.rows_file)
+        print("Trained a new tree of " + str(len(tree_state.tree)) + " nodes on '" + args.rows_file + "' in " +
+              format(time.perf_counter() - start_time, ".3f") + " s")
+    else:
+        tree_state = TreeState.load(args.state_file)
+        load_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        row_count = 0
+        for a_record in main.stream_training_file(args.rows_file):
+            tree_state.absorb(a_record)
+            row_count += 1
+        new_splits, changed_splits = tree_state.update_splits()
+        print("Added " + str(row_count) + " rows in " + format(time.perf_counter() - start_time, ".3f") +
+              " s (after loading the state in " + format(load_time, ".3f") + " s): split " + str(new_splits) +
+              " leaves and replaced " + str(changed_splits) + " splits")
+    tree_state.save(args.state_file)
+
+    # The trained program and model file are written from the updated tree, the same way 'main.py' writes them
+    main.decision_tree = tree_state.tree
+    main.total_depth = tree_state.depth()
+    if not args.no_simplify:
+        main.simplify_tree()
+    main.write_trained_program(args.classifier)
+    main.write_model_file(args.model_file, main.read_attribute_names(args.rows_file))
+
+
+# This function will update the decision tree with the rows file specified in the command line.
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Keep a decision tree up to date with new labeled rows, without "
+                                                 "training it again on every row it has seen.")
+    parser.add_argument("state_file", help="the state file that holds the tree and the statistics of its nodes")
+    parser.add_argument("rows_file", help="the csv file (or binary column cache) of new labeled rows")
+    parser.add_argument("--init", action="store_true",
+                        help="train a new tree on the rows file with best_split and start a new state file")
+    parser.add_argument("--max-depth", type=int, default=10,
+                        help="with --init, the deepest a node can be, where the root is at depth 0 (default: 10)")
+    parser.add_argument("--min-records", type=int, default=9,
+                        help="with --init, nodes with fewer records than this are not split (default: 9)")
+    parser.add_argument("--purity", type=float, default=0.95,
+                        help="with --init, nodes whose majority class is more than this fraction of their records "
+                             "are not split (default: 0.95)")
+    parser.add_argument("--classifier", choices=["rows", "numpy"], default="rows",
+                        help="write a trained program that classifies one record at a time, or whole chunks of "
+                             "records at once with NumPy (default: rows)")
+    parser.add_argument("--no-simplify", action="store_true",
+                        help="write the tree as it is, instead of collapsing splits that make no difference and "
+                             "merging identical subtrees")
+    parser.add_argument("--model-file", default="HW05_Model_Hu.json",
+                        help="the model file that predictor.py can load (default: HW05_Model_Hu.json)")
+    args = parser.parse_args()
+
+    try:
+        run_update(args)
+
+    # If a file is unable to be opened for whatever reason, we will inform the user.
+    except OSError as error:
+        print("Error - cannot open file '" + str(error.filename) + "'")
+
+    # If the state file is not one written by this program, we will inform the user as well.
+    except ValueError as error:
+        print("Error - " + str(error))
@@ -0,0 +1,133 @@
+import argparse
+import asyncio
+import csv
+import json
+import time
+
+
+# This function will open a connection to the scoring server, on its Unix socket if one is given and on its TCP
+# port otherwise.
+#
+# argument 1 (args) - the command line arguments
+async def open_server_connection(args):
+    if args.unix_socket:
+        return await asyncio.open_unix_connection(args.unix_socket)
+    return await asyncio.open_connection(args.host, args.port)
+
+
+# This function will send a request over a connection and read the response, and returns the decoded json body.
+#
+# argument 1 (reader) - the stream the response is read from
+# argument 2 (writer) - the stream the request is written to
+# argument 3 (request) - the encoded request
+async def send_request(reader, writer, request):
+    writer.write(request)
+    await writer.drain()
+    await reader.readline()  # The status line
+    content_length = 0
+    while True:
+        header_line = await reader.readline()
+        if header_line in [b"\r\n", b""]:
+            break
+        name, value = header_line.decode("latin-1").split(":", 1)
+        if name.strip().lower() == "content-length":
+            content_length = int(value)
+    return json.loads(await reader.readexactly(content_length))
+
+
+# This function will build an HTTP request for the scoring server.
+#
+# argument 1 (method) - the HTTP method
+# argument 2 (path) - the path of the request
+# argument 3 (content_type) - the content type of the body
+# argument 4 (body) - the encoded body
+def build_request(method, path, content_type, body):
+    return (method + " " + path + " HTTP/1.1\r\nHost: localhost\r\nContent-Type: " + content_type +
+            "\r\nContent-Length: " + str(len(body)) + "\r\n\r\n").encode("ascii") + body
+
+
+# This function will keep sending the same request over one connection until the deadline, and records how long
+# each response took.
+#
+# argument 1 (args) - the command line arguments
+# argument 2 (request) - the encoded request
+# argument 3 (latencies) - the list the latency of each request is added to, in seconds
+# argument 4 (deadline) - when to stop sending requests (a time.perf_counter value)
+async def run_client(args, request, latencies, deadline):
+    reader, writer = await open_server_connection(args)
+    try:
+        while time.perf_counter() < deadline:
+            start_time = time.perf_counter()
+            await send_request(reader, writer, request)
+            latencies.append(time.perf_counter() - start_time)
+    finally:
+        writer.close()
+
+
+# This function will determine a percentile of a sorted list of latencies.
+#
+# argument 1 (latencies) - the sorted latencies
+# argument 2 (fraction) - the percentile, as a fraction (0.5 for the median)
+def percentile(latencies, fraction):
+    return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+
+# This function will run every client against the scoring server at the same time, and prints the requests and
+# rows per second along with the p50 and p99 latency of the requests.
+#
+# argument 1 (args) - the command line arguments
+async def run_load(args):
+    with open(args.csv_file, newline="") as csv_file:
+        read_data = csv.reader(csv_file)
+        header = next(read_data)
+        rows = [row[:7] for row in read_data][:args.rows_per_request]
+    if args.format == "csv":
+        request = build_request("POST", "/predict", "text/csv",
+                                "\n".join(",".join(row) for row in [header[:7]] + rows).encode("utf-8"))
+    else:
+        request = build_request("POST", "/predict", "application/json", json.dumps({"rows": rows}).encode("utf-8"))
+
+    latencies = []
+    start_time = time.perf_counter()
+    await asyncio.gather(*[run_client(args, request, latencies, start_time + args.duration)
+                           for _ in range(args.concurrency)])
+    run_time = time.perf_counter() - start_time
+
+    reader, writer = await open_server_connection(args)
+    stats = await send_request(reader, writer, build_request("GET", "/stats", "application/json", b""))
+    writer.close()
+
+    latencies.sort()
+    print(str(len(latencies)) + " requests of " + str(len(rows)) + " rows from " + str(args.concurrency) +
+          " clients in " + format(run_time, ".2f") + " s")
+    print("requests per second: " + format(len(latencies) / run_time, ",.0f"))
+    print("rows per second: " + format(len(latencies) * len(rows) / run_time, ",.0f"))
+    print("p50 latency: " + format(percentile(latencies, 0.5) * 1000, ".3f") + " ms")
+    print("p99 latency: " + format(percentile(latencies, 0.99) * 1000, ".3f") + " ms")
+    print("requests per batch on the server: " + format(stats["requests"] / max(stats["batches"], 1), ".1f"))
+
+
+# This function will run the load generator against a scoring server started by 'server.py'.
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Send requests to the scoring server from many clients at once "
+                                                 "and report its latency and throughput.")
+    parser.add_argument("csv_file", help="the csv file the rows of each request are taken from")
+    parser.add_argument("--host", default="127.0.0.1", help="the address of the server (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8506, help="the port of the server (default: 8506)")
+    parser.add_argument("--unix-socket", help="connect to this Unix socket instead of a TCP port")
+    parser.add_argument("--concurrency", type=int, default=32,
+                        help="the amount of clients sending requests at the same time (default: 32)")
+    parser.add_argument("--duration", type=float, default=5.0, help="how long to send requests, in seconds "
+                                                                    "(default: 5)")
+    parser.add_argument("--rows-per-request", type=int, default=1,
+                        help="the amount of rows in each request (default: 1)")
+    parser.add_argument("--format", choices=["json", "csv"], default="json",
+                        help="send the rows as json or as csv (default: json)")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run_load(args))
+
+    # If the csv file or the server cannot be reached, we will inform the user.
+    except OSError as error:
+        print("Error - " + str(error))
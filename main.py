@@ -1,32 +1,62 @@
 # Raymond Hu 4/2/22
+import argparse
 import csv
+import itertools
+import json
 import math
+import mmap
+import os
+import random
+import struct
 import sys
-
-all_splits = []  # A list of all the splits (attribute and threshold) that happens within the ideal decision tree
-attr_array = []  # A list of lists of all the attributes that are relevant for the given data
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, util
+
+try:
+    import columnar  # The NumPy backend, which is only available if NumPy is installed
+except ImportError:
+    columnar = None
+
+decision_tree = None  # The decision tree that is being built (a DecisionTree)
+attr_bounds = []  # The smallest and largest value of each attribute list
 total_depth = 0  # The total amount of levels for the decision tree
-
-
-# This function will determine the entropy of a set of records.
+attr_steps = [2, 4, 2, 2, 2, 2, 1]  # What each attribute is rounded to (the ear lobes are not rounded)
+cache_magic = b"HW06COL1"  # The first bytes of a binary column cache written by write_column_cache
+model_format = "HW06TREE1"  # The format of the model files written by write_model_file
+class_labels = {-1: "Assam", 1: "Bhutan"}  # The name of each class id
+split_mode = "sorted"  # How best_split finds thresholds ('sorted' or 'histogram')
+record_columns = []  # The shared record store, with one column (array) for each value of a record
+record_index = array('i')  # The indexes of the records, where every node of the tree is a slice of this array
+attribute_pool = None  # The process pool that scores the attributes of large nodes, if training uses more than 1 job
+parallel_min_records = 10000  # Nodes with fewer records than this are always scored in this process
+subtree_pool = None  # The process pool that builds large subtrees, if training uses more than 1 subtree worker
+subtree_futures = []  # The subtrees that have been handed to the subtree pool and are not merged yet
+subtree_depth = 0  # The depth at which large subtrees are handed to the subtree pool
+subtree_min_records = 10000  # Subtrees with fewer records than this are always built in this process
+shared_store = None  # The shared memory block that holds the record store when subtrees are built in parallel
+max_emit_depth = 40  # Subtrees nested deeper than this in the trained program are written as functions of their own
+nlogn_table = array('d')  # n x log(n) for every amount of records n, up to the size of the training data set
+trace_events = None  # The events of the training trace (a list), if training is being traced
+sweep_thresholds = 0  # The amount of thresholds the last call of sweep_attribute or sweep_histogram tested
+stop_depth = 10  # Nodes at this depth (the root is at depth 0) are never split, so the tree has at most 11 levels
+stop_records = 9  # Nodes with fewer records than this are never split
+stop_purity = 0.95  # Nodes whose majority class is more than this fraction of their records are never split
+min_entropy_gain = 1e-12  # Splits that lower the entropy of a node by less than this (rounding error) are not made
+ensemble_trees = []  # The decision tree and total amount of levels of each tree of a bagged ensemble, if trained
+
+
+# This function will determine the entropy of a set of records from its class counts alone, so that callers
+# which already know how many Assams and Bhutans there are do not need to scan the records again.
 #
-# argument 1 (set_of_records) - the set of records that we need to analyze
-def cal_entropy(set_of_records):
-    # If there are no records in the list, we exit
-    if len(set_of_records) == 0:
+# argument 1 (assam) - the amount of Assam records in the set
+# argument 2 (bhutan) - the amount of Bhutan records in the set
+def count_entropy(assam, bhutan):
+    # If there are no records in the set, we exit
+    if assam + bhutan == 0:
         return 0
 
-    assam = 0
-    bhutan = 0
-    for a_record in set_of_records:
-        # If the eighth attribute of the record (class id) is 1, it is Bhutan
-        if a_record[7] == 1:
-            bhutan += 1
-
-        # Otherwise it is Assam
-        else:
-            assam += 1
-
     p_of_assam = assam / (assam + bhutan)  # P(assam) is the amount of assams over the total classes
     p_of_bhutan = bhutan / (assam + bhutan)  # P(bhutan) is the amount of bhutans over the total classes
 
@@ -51,1834 +81,2476 @@ def cal_entropy(set_of_records):
     return entropy
 
 
-# This function will determine whether there are more Assams or Bhuttans in a particular set of records.
+# This function will determine the weighted entropy of splitting a set of records into two nodes, given the
+# class counts of each node.
 #
-# argument 1 (set_of_records) - the set of records that we need to analyze
-def more_class(set_of_records):
-    # If there are no records in the list, we exit
-    if len(set_of_records) == 0:
-        return 0
-
-    assam = 0
-    bhutan = 0
-    for a_record in set_of_records:
-        # If the eighth attribute of the record (class id) is 1, it is Bhutan
-        if a_record[7] == 1:
-            bhutan += 1
-
-        # Otherwise it is Assam
-        else:
-            assam += 1
+# argument 1 (assam1) - the amount of Assam records in the first node
+# argument 2 (bhutan1) - the amount of Bhutan records in the first node
+# argument 3 (assam2) - the amount of Assam records in the second node
+# argument 4 (bhutan2) - the amount of Bhutan records in the second node
+def weighted_entropy(assam1, bhutan1, assam2, bhutan2):
+    total = assam1 + bhutan1 + assam2 + bhutan2
 
-    # Return the class with the higher count
-    if assam > bhutan:
-        return -1
-    else:
-        return 1
+    # The weighted entropy = (length of first list / total records) x entropy of first list +
+    # (length of second list / total records) x entropy of second list)
+    return (((assam1 + bhutan1) / total) * count_entropy(assam1, bhutan1)) + (((assam2 + bhutan2) / total) *
+                                                                            count_entropy(assam2, bhutan2))
 
 
-# This function will determine the percentage of the majority class (Assam or Bhuttan)
-# over the total classes.
+# This function will fill the global n x log(n) table for every amount of records from 0 up to the size of the
+# training data set. It only needs to be built once per training run.
 #
-# argument 1 (set_of_records) - the set of records that we need to analyze
-def more_percent(set_of_records):
-    # If there are no records in the list, we exit
-    if len(set_of_records) == 0:
-        return 0
-
-    assam = 0
-    bhutan = 0
-    for a_record in set_of_records:
-        # If the eighth attribute of the record (class id) is 1, it is Bhutan
-        if a_record[7] == 1:
-            bhutan += 1
-
-        # Otherwise it is Assam
-        else:
-            assam += 1
-
-    # Return the percentage of the majority class
-    if assam > bhutan:
-        return assam / (assam + bhutan)
-    else:
-        return bhutan / (assam + bhutan)
-
-
-# This function will determine the best attribute and threshold to split a list of records by determining
-# the least weighted entropy. It will keep calling itself recursively until the stopping criteria are met.
+# argument 1 (record_count) - the amount of records in the training data set
+def build_nlogn_table(record_count):
+    global nlogn_table
+    nlogn_table = array('d', [0.0])  # 0 x log(0) is treated as 0, just like the entropy formula does
+    nlogn_table.extend(amount * math.log(amount) for amount in range(1, record_count + 1))
+
+
+# This function will determine the same weighted entropy as weighted_entropy, but directly from the integer
+# class counts with a few lookups into the n x log(n) table instead of divisions and log operations. Since
+# (n1 / n) x entropy of the first node = (n1 x log(n1) - assam1 x log(assam1) - bhutan1 x log(bhutan1)) / n,
+# the weighted entropy only needs the table and one division. The results are the same as weighted_entropy
+# within float tolerance.
 #
-# argument 1 (the_records) - the set of records that we need to analyze and gather info from
-# argument 2 (depth) - the depth of the current node out of the entire decision tree
-# argument 2 (index_split) - the index of the decision tree level that we append some info into
-def best_split(the_records, depth, index_split):
-    major_class = more_class(the_records)  # The class that appears more frequently in the records
-    major_percent = more_percent(the_records)  # The percentage of the major_class
-    global total_depth
-
-    # Update the global max depth if the local depth is greater than it
-    if depth + 1 > total_depth:
-        total_depth = depth + 1
-
-    # If the decision tree already has 9 levels, or there are less than 9 records, or if the percentage
-    # of the majority class is greater than 95 percent, we will stop splitting
-    if depth > 10 or len(the_records) < 9 or major_percent > 0.95:
-
-        # If the stopping criteria is met, we let the program know there is no need to split anymore
-        all_splits[depth][index_split] = [0, 0, major_class]
-
-        return
-    else:
-        best_attribute = 0  # We initialize the best attribute to be the age
-        best_threshold = min(attr_array[0])  # We initialize the best attribute to be the min threshold of age
-        best_entropy = 1  # We initialize the best weighted entropy to be the worst possible
-        list_counter = 0  # We use this counter to determine the index belonging to the current attribute
-
-        # For each attribute list in the global array
-        for attr_list in attr_array:
-            local_best_ent = 1  # We initialize the best entropy for this attribute
-            local_best_thr = min(attr_list)  # We initialize the best threshold
-            current_threshold = min(attr_list)  # We keep track of the current threshold
-
-            # We go over every possible threshold for the attribute list
-            while current_threshold <= max(attr_list):
-                node1 = []
-                node2 = []
-                for a_record in the_records:
-                    # If the attribute of the record is less than or equal to the test threshold, it
-                    # will go into the first list
-                    if a_record[list_counter] <= current_threshold:
-                        node1.append(a_record)
-                    else:
-                        node2.append(a_record)
-
-                # The weighted entropy = (length of first list / total records) x entropy of first list +
-                # (length of second list / total records) x entropy of second list)
-                wei_entropy = ((len(node1) / len(the_records)) * cal_entropy(node1)) + ((len(node2) / len(the_records))
-                                                                                        * cal_entropy(node2))
-
-                # If the weighted entropy of this threshold is better than the previous best, we
-                # update the appropriate values to reflect this
-                if wei_entropy < local_best_ent:
-                    local_best_ent = wei_entropy
-                    local_best_thr = current_threshold
-
-                current_threshold += 1  # Test new threshold
-
-            # If the best entropy of the current attribute is better than the global entropy, we
-            # update the appropriate values to reflect this
-            if local_best_ent < best_entropy:
-                best_attribute = list_counter
-                best_threshold = local_best_thr
-                best_entropy = local_best_ent
-
-            list_counter += 1  # Update new attribute index
-
-    split1 = []  # The list of records in the first split
-    split2 = []  # The list of records in the second split
-
-    # We append each record to either the first or second split according to the best attribute and
-    # its best threshold
-    for test_record in the_records:
-        if test_record[best_attribute] <= best_threshold:
-            split1.append(test_record)
-        else:
-            split2.append(test_record)
+# argument 1 (assam1) - the amount of Assam records in the first node
+# argument 2 (bhutan1) - the amount of Bhutan records in the first node
+# argument 3 (assam2) - the amount of Assam records in the second node
+# argument 4 (bhutan2) - the amount of Bhutan records in the second node
+def table_entropy(assam1, bhutan1, assam2, bhutan2):
+    return (nlogn_table[assam1 + bhutan1] - nlogn_table[assam1] - nlogn_table[bhutan1] +
+            nlogn_table[assam2 + bhutan2] - nlogn_table[assam2] - nlogn_table[bhutan2]) / \
+        (assam1 + bhutan1 + assam2 + bhutan2)
 
-    # We append the best attribute, threshold, and the class that appears the most to the global list
-    # for the classifier program
-    all_splits[depth][index_split] = [best_attribute, best_threshold, major_class]
 
-    best_split(split1, depth + 1, index_split * 2)  # Perform a recursive call using the first split
-    best_split(split2, depth + 1, (index_split * 2) + 1)  # Perform a recursive call using the second split
+# This function will determine n x log(n) for an amount of records, the same way build_nlogn_table fills its table.
+#
+# argument 1 (amount) - the amount of records
+def nlogn(amount):
+    return amount * math.log(amount) if amount else 0.0
 
 
-# This function will build a trained program (a python file called 'HW05_Classifier_Hu.py') which will
-# utilize the decision tree built by best_split in order to determine which class each record of a csv
-# file falls into.
-def write_trained_program():
-    print(total_depth)
-    mentee_program = open("HW05_Classifier_Hu.py", "w")
-    mentee_program.write("import csv\n")
-    mentee_program.write("import sys\n")
-    mentee_program.write("\n")
-    mentee_program.write("\n")
-    mentee_program.write("# This function reads the csv file specified in the command line, and classifies each row of "
-                         "data into one of\n")
-    mentee_program.write("# two classes.\n")
-    mentee_program.write("if __name__ == '__main__':\n")
-    mentee_program.write("    # If the amount of arguments (plus the name of the program) is not 2, we will inform the "
-                         "user.\n")
-    mentee_program.write("    if len(sys.argv) != 2:\n")
-    mentee_program.write("        print(\"Error - invalid number of arguments (must specify the csv file)\")\n")
-    mentee_program.write("    else:\n")
-    mentee_program.write("        try:\n")
-    mentee_program.write("            # The second cmd argument is the csv file we have to open and retrieve data "
-                         "from\n")
-    mentee_program.write("            with open(sys.argv[1]) as csv_file:\n")
-    mentee_program.write("                read_data = csv.reader(csv_file)\n")
-    mentee_program.write("                all_records = []  # The normalized records that we will classify later\n")
-    mentee_program.write("                output_file = open(\"output.csv\", \"w\", newline=\"\")  # Puts the "
-                         "classified data into another csv file\n")
-    mentee_program.write("                write_data = csv.writer(output_file)\n")
-    mentee_program.write("                header = next(read_data)\n")
-    mentee_program.write("                header.append('Class')\n")
-    mentee_program.write("                write_data.writerow(header)  # Puts the header in the output file\n")
-    mentee_program.write("\n")
-    mentee_program.write("                # We first normalize values in each record\n")
-    mentee_program.write("                for row in read_data:\n")
-    mentee_program.write("                    cur_record = [0] * 7  # The record with normalized values\n")
-    mentee_program.write("\n")
-    mentee_program.write("                    # Append the normalized age into the record array\n")
-    mentee_program.write("                    the_float = float(row[0].strip())\n")
-    mentee_program.write("                    norm_age = round(the_float / 2) * 2\n")
-    mentee_program.write("                    cur_record[0] = norm_age\n")
-    mentee_program.write("\n")
-    mentee_program.write("                    # Append the normalized height into the record array\n")
-    mentee_program.write("                    the_float = float(row[1].strip())\n")
-    mentee_program.write("                    norm_height = round(the_float / 4) * 4\n")
-    mentee_program.write("                    cur_record[1] = norm_height\n")
-    mentee_program.write("\n")
-    mentee_program.write("                    # Append the normalized tail length into the record array\n")
-    mentee_program.write("                    the_float = float(row[2].strip())\n")
-    mentee_program.write("                    norm_tail = round(the_float / 2) * 2\n")
-    mentee_program.write("                    cur_record[2] = norm_tail\n")
-    mentee_program.write("\n")
-    mentee_program.write("                    # Append the normalized hair length into the record array\n")
-    mentee_program.write("                    the_float = float(row[3].strip())\n")
-    mentee_program.write("                    norm_hair = round(the_float / 2) * 2\n")
-    mentee_program.write("                    cur_record[3] = norm_hair\n")
-    mentee_program.write("\n")
-    mentee_program.write("                    # Append the normalized bang length into the record array\n")
-    mentee_program.write("                    the_float = float(row[4].strip())\n")
-    mentee_program.write("                    norm_bang = round(the_float / 2) * 2\n")
-    mentee_program.write("                    cur_record[4] = norm_bang\n")
-    mentee_program.write("\n")
-    mentee_program.write("                    # Append the normalized reach into the record array\n")
-    mentee_program.write("                    the_float = float(row[5].strip())\n")
-    mentee_program.write("                    norm_reach = round(the_float / 2) * 2\n")
-    mentee_program.write("                    cur_record[5] = norm_reach\n")
-    mentee_program.write("\n")
-    mentee_program.write("                    # Append the earlobe values into the record array\n")
-    mentee_program.write("                    earlobe = int(row[6].strip())\n")
-    mentee_program.write("                    cur_record[6] = earlobe\n")
-    mentee_program.write("\n")
-    mentee_program.write("                    all_records.append(cur_record)\n")
-    mentee_program.write("\n")
-    mentee_program.write("                # For each record with normalized values, we determine which class it "
-                         "belongs to\n")
-    mentee_program.write("                for record in all_records:\n")
-
-    # This is if the decision tree is only 1 level deep
-    if total_depth == 1:
-        mentee_program.write("write_data.writerow(['" + str(all_splits[0][0][2]) + "'])\n")
-
-    # This is if the decision tree is 2 levels deep
-    elif total_depth == 2:
-        mentee_program.write("                    if record[" + str(all_splits[0][0][0]) + "] <= " +
-                             str(all_splits[0][0][1]) + ":\n")
-        mentee_program.write("                        write_data.writerow(['" + str(all_splits[1][0][2]) + "'])\n")
-        mentee_program.write("                    else:\n")
-        mentee_program.write("                        write_data.writerow(['" + str(all_splits[1][1][2]) + "'])\n")
-
-    # This is if the decision tree is 3 levels deep
-    elif total_depth == 3:
-        mentee_program.write("                    if record[" + str(all_splits[0][0][0]) + "] <= " +
-                             str(all_splits[0][0][1]) + ":\n")
-
-        # If the stopping criteria has been met, we just return whatever majority class exists for this node
-        if all_splits[1][0][1] == 0:
-            mentee_program.write("                        write_data.writerow(['" + str(all_splits[1][0][2]) + "'])\n")
-
-            # Otherwise, we utilize the best attribute and the best threshold
-        else:
-            mentee_program.write("                        if record[" + str(all_splits[1][0][0]) + "] <= " +
-                                 str(all_splits[1][0][1]) + ":\n")
-            mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][0][2]) +
-                                 "'])\n")
-            mentee_program.write("                        else:\n")
-            mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][1][2]) +
-                                 "'])\n")
-        mentee_program.write("                    else:\n")
-
-        # If the stopping criteria has been met, we just return whatever majority class exists for this node
-        if all_splits[1][1][1] == 0:
-            mentee_program.write("                        write_data.writerow(['" + str(all_splits[1][1][2]) + "'])\n")
-
-        # Otherwise, we utilize the best attribute and the best threshold
-        else:
-            mentee_program.write("                        if record[" + str(all_splits[1][1][0]) + "] <= " +
-                                 str(all_splits[1][1][1]) + ":\n")
-            mentee_program.write(
-                "                            write_data.writerow(['" + str(all_splits[2][2][2]) + "'])\n")
-            mentee_program.write("                        else:\n")
-            mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][3][2]) +
-                                 "'])\n")
-
-    # This is if the decision tree is 4 levels deep
-    elif total_depth == 4:
-        mentee_program.write("                    if record[" + str(all_splits[0][0][0]) + "] <= " +
-                             str(all_splits[0][0][1]) + ":\n")
-
-        # If the stopping criteria has been met, we just return whatever majority class exists for this node
-        if all_splits[1][0][1] == 0:
-            mentee_program.write("                        write_data.writerow(['" + str(all_splits[1][0][2]) + "'])\n")
-
-            # Otherwise, we utilize the best attribute and the best threshold
+# This function will determine the same weighted entropy as table_entropy, but computes each n x log(n) when it is
+# needed instead of looking it up. It needs no table, so training that never holds the training data set in memory
+# does not have to allocate a float for every record either. The results are identical to table_entropy.
+#
+# argument 1 (assam1) - the amount of Assam records in the first node
+# argument 2 (bhutan1) - the amount of Bhutan records in the first node
+# argument 3 (assam2) - the amount of Assam records in the second node
+# argument 4 (bhutan2) - the amount of Bhutan records in the second node
+def nlogn_entropy(assam1, bhutan1, assam2, bhutan2):
+    return (nlogn(assam1 + bhutan1) - nlogn(assam1) - nlogn(bhutan1) +
+            nlogn(assam2 + bhutan2) - nlogn(assam2) - nlogn(bhutan2)) / \
+        (assam1 + bhutan1 + assam2 + bhutan2)
+
+
+# This class holds the statistics of a node of the decision tree (how many Assams and Bhutans it has), so the
+# majority class, the percentage of the majority class and the entropy of the node can be answered without
+# scanning its records again. The statistics of the two children of a node are found while the node is being
+# partitioned, so only the root of the tree ever has its records counted on their own.
+class NodeStats:
+    __slots__ = ("assam", "bhutan")
+
+    # argument 1 (assam) - the amount of Assam records in the node
+    # argument 2 (bhutan) - the amount of Bhutan records in the node
+    def __init__(self, assam, bhutan):
+        self.assam = assam
+        self.bhutan = bhutan
+
+    # This function will determine the statistics of the other child of a node, given the statistics of one of
+    # its children.
+    #
+    # argument 1 (child_stats) - the statistics of one child of this node
+    def minus(self, child_stats):
+        return NodeStats(self.assam - child_stats.assam, self.bhutan - child_stats.bhutan)
+
+    # This function will determine the amount of records in the node.
+    def total(self):
+        return self.assam + self.bhutan
+
+    # This function will determine the class with the higher count (0 if there are no records).
+    def major_class(self):
+        if self.assam + self.bhutan == 0:
+            return 0
+        elif self.assam > self.bhutan:
+            return -1
         else:
-            mentee_program.write("                        if record[" + str(all_splits[1][0][0]) + "] <= " +
-                                 str(all_splits[1][0][1]) + ":\n")
-
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][0][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][0][2]) +
-                                     "'])\n")
-
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][0][0]) + "] <= " +
-                                     str(all_splits[2][0][1]) + ":\n")
-                mentee_program.write("                                write_data.writerow(['" +
-                                     str(all_splits[3][0][2]) + "'])\n")
-                mentee_program.write("                            else:\n")
-                mentee_program.write("                                write_data.writerow(['" +
-                                     str(all_splits[3][1][2]) + "'])\n")
-            mentee_program.write("                        else:\n")
-
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][1][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][1][2]) +
-                                     "'])\n")
-
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][1][0]) + "] <= " +
-                                     str(all_splits[2][1][1]) + ":\n")
-                mentee_program.write("                                write_data.writerow(['" +
-                                     str(all_splits[3][2][2]) + "'])\n")
-                mentee_program.write("                            else:\n")
-                mentee_program.write("                                write_data.writerow(['" +
-                                     str(all_splits[3][3][2]) + "'])\n")
-
-        mentee_program.write("                    else:\n")
-
-        # If the stopping criteria has been met, we just return whatever majority class exists for this node
-        if all_splits[1][1][1] == 0:
-            mentee_program.write("                        write_data.writerow(['" + str(all_splits[1][1][2]) + "'])\n")
-
-            # Otherwise, we utilize the best attribute and the best threshold
+            return 1
+
+    # This function will determine the percentage of the majority class over the total classes (0 if there
+    # are no records).
+    def major_percent(self):
+        if self.assam + self.bhutan == 0:
+            return 0
+        elif self.assam > self.bhutan:
+            return self.assam / (self.assam + self.bhutan)
         else:
-            mentee_program.write("                        if record[" + str(all_splits[1][1][0]) + "] <= " +
-                                 str(all_splits[1][0][1]) + ":\n")
-
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][2][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][2][2]) +
-                                     "'])\n")
-
+            return self.bhutan / (self.assam + self.bhutan)
+
+    # This function will determine the entropy of the node.
+    def entropy(self):
+        return count_entropy(self.assam, self.bhutan)
+
+    # This function will determine whether every record of the node is of the same class (or there are none).
+    def is_pure(self):
+        return self.assam == 0 or self.bhutan == 0
+
+
+# This class holds a decision tree as parallel arrays, with one entry in each array for every node of the tree.
+# The root is node 0, and nodes are only added when they exist, so the tree takes memory for its actual nodes
+# rather than for every node a tree of its depth could have. A leaf has no attribute (-1) and no children (-1),
+# so a threshold of 0 is an ordinary threshold.
+class DecisionTree:
+    __slots__ = ("feature", "threshold", "left", "right", "value", "samples")
+
+    def __init__(self):
+        self.feature = array('b')  # The attribute each node is split on, or -1 for a leaf
+        self.threshold = array('i')  # The threshold each node is split on (records at or below it go left)
+        self.left = array('i')  # The first child of each node, or -1 for a leaf
+        self.right = array('i')  # The second child of each node, or -1 for a leaf
+        self.value = array('b')  # The class that appears more frequently in the records of each node
+        self.samples = array('i')  # The amount of training records that reach each node
+
+    # This function will determine the amount of nodes in the decision tree.
+    def __len__(self):
+        return len(self.feature)
+
+    # This function will add a leaf to the decision tree, and returns its node.
+    #
+    # argument 1 (samples) - the amount of training records that reach the leaf
+    # argument 2 (value) - the class that appears more frequently in those records
+    def add_node(self, samples=0, value=0):
+        self.feature.append(-1)
+        self.threshold.append(0)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.value.append(value)
+        self.samples.append(samples)
+        return len(self.feature) - 1
+
+    # This function will turn a leaf into a split with two new leaves as its children, and returns the children.
+    #
+    # argument 1 (node) - the leaf that is split
+    # argument 2 (attr_index) - the attribute the node is split on
+    # argument 3 (threshold) - the threshold the node is split on
+    def split_node(self, node, attr_index, threshold):
+        self.feature[node] = attr_index
+        self.threshold[node] = threshold
+        self.left[node] = self.add_node()
+        self.right[node] = self.add_node()
+        return self.left[node], self.right[node]
+
+    # This function will determine whether a node is a leaf.
+    #
+    # argument 1 (node) - the node of the decision tree
+    def is_leaf(self, node):
+        return self.left[node] == -1
+
+    # This function will route a normalized record down the decision tree, and returns the leaf it reaches.
+    #
+    # argument 1 (a_record) - the normalized record
+    def find_leaf(self, a_record):
+        node = 0
+        left = self.left
+        while left[node] != -1:
+            if a_record[self.feature[node]] <= self.threshold[node]:
+                node = left[node]
             else:
-                mentee_program.write("                            if record[" + str(all_splits[2][2][0]) + "] <= " +
-                                     str(all_splits[2][2][1]) + ":\n")
-                mentee_program.write("                                write_data.writerow(['" +
-                                     str(all_splits[3][5][2]) + "'])\n")
-                mentee_program.write("                            else:\n")
-                mentee_program.write("                                write_data.writerow(['" +
-                                     str(all_splits[3][6][2]) + "'])\n")
-            mentee_program.write("                        else:\n")
-
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][3][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][3][2]) +
-                                     "'])\n")
-
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][3][0]) + "] <= " +
-                                     str(all_splits[2][3][1]) + ":\n")
-                mentee_program.write("                                write_data.writerow(['" +
-                                     str(all_splits[3][6][2]) + "'])\n")
-                mentee_program.write("                            else:\n")
-                mentee_program.write("                                write_data.writerow(['" +
-                                     str(all_splits[3][7][2]) + "'])\n")
-
-    # This is if the decision tree is 5 levels deep
-    elif total_depth == 5:
-        mentee_program.write("                    if record[" + str(all_splits[0][0][0]) + "] <= " +
-                             str(all_splits[0][0][1]) + ":\n")
-
-        # If the stopping criteria has been met, we just return whatever majority class exists for this node
-        if all_splits[1][0][1] == 0:
-            mentee_program.write("                        write_data.writerow(['" + str(all_splits[1][0][2]) + "'])\n")
-
-        # Otherwise, we utilize the best attribute and the best threshold
-        else:
-            mentee_program.write("                        if record[" + str(all_splits[1][0][0]) + "] <= " +
-                                 str(all_splits[1][0][1]) + ":\n")
-
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][0][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][0][2]) +
-                                     "'])\n")
-
+                node = self.right[node]
+        return node
+
+    # This function will replace a leaf with a decision tree that was built on its own (by a subtree worker),
+    # whose root takes the place of the leaf and whose other nodes are added to the end of this tree.
+    #
+    # argument 1 (node) - the leaf that is replaced
+    # argument 2 (subtree) - the decision tree that replaces it
+    def graft(self, node, subtree):
+        offset = len(self.feature) - 1  # Node n of the subtree (other than its root) becomes node offset + n
+        for subtree_node in range(len(subtree)):
+            left = subtree.left[subtree_node]
+            right = subtree.right[subtree_node]
+            if left != -1:
+                left += offset
+                right += offset
+            if subtree_node == 0:
+                self.feature[node] = subtree.feature[0]
+                self.threshold[node] = subtree.threshold[0]
+                self.left[node] = left
+                self.right[node] = right
+                self.value[node] = subtree.value[0]
+                self.samples[node] = subtree.samples[0]
             else:
-                mentee_program.write("                            if record[" + str(all_splits[2][0][0]) + "] <= " +
-                                     str(all_splits[2][0][1]) + ":\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][0][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][0][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][0][0]) +
-                                         "] <= " + str(all_splits[3][0][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][0][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][1][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][1][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][1][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][1][0]) +
-                                         "] <= " + str(all_splits[3][1][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][2][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][3][2]) + "'])\n")
-
-            mentee_program.write("                        else:\n")
-
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][1][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][1][2]) +
-                                     "'])\n")
-
+                self.feature.append(subtree.feature[subtree_node])
+                self.threshold.append(subtree.threshold[subtree_node])
+                self.left.append(left)
+                self.right.append(right)
+                self.value.append(subtree.value[subtree_node])
+                self.samples.append(subtree.samples[subtree_node])
+
+
+# This function will determine the best threshold of a single attribute for a node. The records of the node are
+# sorted by the attribute once, and we only test the distinct values that actually appear in the records. The
+# class counts on each side of the threshold are updated as we sweep, so each threshold costs the same no
+# matter how many records there are. Ties are broken in favour of the smallest threshold, just like testing
+# every integer threshold from the smallest value of the attribute would. Thresholds that leave either side empty
+# are not tested, so if all records have the same value the best entropy stays at 1 (worse than any split).
+#
+# argument 1 (start) - the position in record_index where the records of the node begin
+# argument 2 (end) - the position in record_index where the records of the node end
+# argument 3 (attr_index) - the index of the attribute we are testing thresholds for
+# argument 4 (low_threshold) - the smallest value of the attribute over the whole training data set
+def sweep_attribute(start, end, attr_index, low_threshold):
+    global sweep_thresholds
+    attr_column = record_columns[attr_index]
+    class_column = record_columns[7]
+    sorted_indexes = sorted(record_index[start:end], key=attr_column.__getitem__)
+    total = len(sorted_indexes)
+    local_best_ent = 1  # We initialize the best entropy for this attribute
+    local_best_thr = low_threshold  # We initialize the best threshold
+
+    left_assam = 0  # The amount of Assams at or below the current threshold
+    left_bhutan = 0  # The amount of Bhutans at or below the current threshold
+    right_bhutan = 0  # The amount of Bhutans above the current threshold
+    for a_index in sorted_indexes:
+        if class_column[a_index] == 1:
+            right_bhutan += 1
+    right_assam = total - right_bhutan  # The amount of Assams above the current threshold
+
+    thresholds = 0  # The amount of thresholds tested
+    position = 0
+    while position < total:
+        current_threshold = attr_column[sorted_indexes[position]]
+
+        # We move every record with the current value over to the first node
+        while position < total and attr_column[sorted_indexes[position]] == current_threshold:
+            if class_column[sorted_indexes[position]] == 1:
+                left_bhutan += 1
+                right_bhutan -= 1
             else:
-                mentee_program.write("                            if record[" + str(all_splits[2][1][0]) + "] <= " +
-                                     str(all_splits[2][1][1]) + ":\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][2][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][2][2]) + "'])\n")
+                left_assam += 1
+                right_assam -= 1
+            position += 1
 
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][2][0]) +
-                                         "] <= " + str(all_splits[3][2][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][4][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][5][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][3][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][3][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][3][0]) +
-                                         "] <= " + str(all_splits[3][3][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][6][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][7][2]) + "'])\n")
+        # The largest value moves every record over to the first node, which is no split at all
+        if position == total:
+            break
+        wei_entropy = table_entropy(left_assam, left_bhutan, right_assam, right_bhutan)
+        thresholds += 1
 
-        mentee_program.write("                    else:\n")
+        # If the weighted entropy of this threshold is better than the previous best, we
+        # update the appropriate values to reflect this
+        if wei_entropy < local_best_ent:
+            local_best_ent = wei_entropy
+            local_best_thr = current_threshold
 
-        # If the stopping criteria has been met, we just return whatever majority class exists for this node
-        if all_splits[1][1][1] == 0:
-            mentee_program.write("                        write_data.writerow(['" + str(all_splits[1][1][2]) + "'])\n")
+    sweep_thresholds = thresholds
+    return local_best_ent, local_best_thr
 
-        # Otherwise, we utilize the best attribute and the best threshold
-        else:
-            mentee_program.write("                        if record[" + str(all_splits[1][1][0]) + "] <= " +
-                                 str(all_splits[1][1][1]) + ":\n")
 
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][2][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][2][2]) +
-                                     "'])\n")
+# This function will build the histogram of a single attribute for a node. The histogram holds two lists
+# (Assam counts and Bhutan counts) with one bin for every integer value between the smallest and largest value
+# of the attribute, so all thresholds of the attribute can be tested without looking at the records again.
+#
+# argument 1 (start) - the position in record_index where the records of the node begin
+# argument 2 (end) - the position in record_index where the records of the node end
+# argument 3 (attr_index) - the index of the attribute we are building the histogram for
+def build_histogram(start, end, attr_index):
+    class_column = record_columns[7]
+    attr_column = record_columns[attr_index]
+    low_threshold = attr_bounds[attr_index][0]
+    bin_count = attr_bounds[attr_index][1] - low_threshold + 1
 
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][2][0]) + "] <= " +
-                                     str(all_splits[2][2][1]) + ":\n")
+    # The first list of the histogram counts Assams and the second list counts Bhutans
+    histogram = [[0] * bin_count, [0] * bin_count]
+    for position in range(start, end):
+        a_index = record_index[position]
+        histogram[1 if class_column[a_index] == 1 else 0][attr_column[a_index] - low_threshold] += 1
 
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][4][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][4][2]) + "'])\n")
+    return histogram
 
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][4][0]) +
-                                         "] <= " + str(all_splits[3][4][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][8][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][9][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][5][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][5][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][5][0]) +
-                                         "] <= " + str(all_splits[3][5][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][10][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][11][2]) + "'])\n")
 
-            mentee_program.write("                        else:\n")
-
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][3][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][3][2]) +
-                                     "'])\n")
-
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][3][0]) + "] <= " +
-                                     str(all_splits[2][3][1]) + ":\n")
+# This function will build the histograms of every attribute for a node.
+#
+# argument 1 (start) - the position in record_index where the records of the node begin
+# argument 2 (end) - the position in record_index where the records of the node end
+def build_histograms(start, end):
+    return map_attributes(histogram_task, start, end)
 
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][6][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][6][2]) + "'])\n")
 
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][6][0]) +
-                                         "] <= " + str(all_splits[3][6][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][12][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][13][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][7][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][7][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][7][0]) +
-                                         "] <= " + str(all_splits[3][7][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][14][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][15][2]) + "'])\n")
-
-    # This is if the decision tree is 6 levels deep
-    elif total_depth == 6:
-        mentee_program.write("                    if record[" + str(all_splits[0][0][0]) + "] <= " +
-                             str(all_splits[0][0][1]) + ":\n")
-
-        # If the stopping criteria has been met, we just return whatever majority class exists for this node
-        if all_splits[1][0][1] == 0:
-            mentee_program.write("                        write_data.writerow(['" + str(all_splits[1][0][2]) + "'])\n")
-
-        # Otherwise, we utilize the best attribute and the best threshold
+# This function will determine the histograms of one child node by subtracting the histograms of its sibling
+# from the histograms of the parent, so that only the smaller child ever needs to be scanned.
+#
+# argument 1 (parent_histograms) - the histograms of the parent node
+# argument 2 (sibling_histograms) - the histograms of the other child node
+def subtract_histograms(parent_histograms, sibling_histograms):
+    histograms = []
+    for parent_hist, sibling_hist in zip(parent_histograms, sibling_histograms):
+        histograms.append([[parent_count - sibling_count for parent_count, sibling_count in
+                            zip(parent_hist[class_slot], sibling_hist[class_slot])] for class_slot in range(2)])
+    return histograms
+
+
+# This function will determine the best threshold of a single attribute from its histogram. Every bin is a
+# possible threshold, and the class counts on each side are updated as we sweep over the bins. Empty bins give
+# the same split as the bin before them (or an empty first side), so they are never tested, and neither is the
+# last bin with records in it, which leaves the second side empty.
+#
+# argument 1 (histogram) - the Assam and Bhutan counts of every bin of the attribute
+# argument 2 (low_threshold) - the smallest value of the attribute over the whole training data set
+# argument 3 (split_entropy) - the function that determines the weighted entropy of a threshold from its class
+#                              counts (weighted_entropy works without the n x log(n) table)
+def sweep_histogram(histogram, low_threshold, split_entropy=table_entropy):
+    global sweep_thresholds
+    assam_bins = histogram[0]
+    bhutan_bins = histogram[1]
+    local_best_ent = 1  # We initialize the best entropy for this attribute
+    local_best_thr = low_threshold  # We initialize the best threshold
+
+    left_assam = 0  # The amount of Assams at or below the current threshold
+    left_bhutan = 0  # The amount of Bhutans at or below the current threshold
+    right_assam = sum(assam_bins)  # The amount of Assams above the current threshold
+    right_bhutan = sum(bhutan_bins)  # The amount of Bhutans above the current threshold
+
+    thresholds = 0  # The amount of thresholds tested
+    for bin_index in range(len(assam_bins)):
+        # An empty bin does not move any records, so its split is the same as the previous one
+        if assam_bins[bin_index] == 0 and bhutan_bins[bin_index] == 0:
+            continue
+
+        left_assam += assam_bins[bin_index]
+        left_bhutan += bhutan_bins[bin_index]
+        right_assam -= assam_bins[bin_index]
+        right_bhutan -= bhutan_bins[bin_index]
+
+        # Once every record is in the first node, no later bin can split the records either
+        if right_assam + right_bhutan == 0:
+            break
+        wei_entropy = split_entropy(left_assam, left_bhutan, right_assam, right_bhutan)
+        thresholds += 1
+
+        # If the weighted entropy of this threshold is better than the previous best, we
+        # update the appropriate values to reflect this
+        if wei_entropy < local_best_ent:
+            local_best_ent = wei_entropy
+            local_best_thr = low_threshold + bin_index
+
+    sweep_thresholds = thresholds
+    return local_best_ent, local_best_thr
+
+
+# This function will find the best threshold of every attribute of a node from the histograms of the node.
+#
+# argument 1 (histograms) - the histograms of the node
+# argument 2 (split_entropy) - the function that determines the weighted entropy of a threshold from its class
+#                              counts
+def sweep_histograms(histograms, split_entropy=table_entropy):
+    attribute_bests = []
+    for attr_index in range(len(attr_bounds)):
+        start_time = time.perf_counter()
+        attribute_bests.append(sweep_histogram(histograms[attr_index], attr_bounds[attr_index][0], split_entropy))
+        if trace_events is not None:
+            trace_event("sweep attribute " + str(attr_index), "sweep", start_time,
+                        {"attribute": attr_index, "thresholds": sweep_thresholds, "records_scanned": 0})
+    return attribute_bests
+
+
+# This function will set up a worker process of the attribute pool with the shared record store, so that the
+# records only have to be sent to each worker once.
+#
+# argument 1 (columns) - the columns of the record store
+# argument 2 (bounds) - the smallest and largest value of each attribute
+# argument 3 (mode) - how best_split finds thresholds ('sorted' or 'histogram')
+# argument 4 (tracing) - whether the worker collects trace events for the parent process
+def init_worker(columns, bounds, mode, tracing):
+    global record_columns, attr_bounds, split_mode, trace_events
+    record_columns = columns
+    attr_bounds = bounds
+    split_mode = mode
+    trace_events = [] if tracing else None  # A forked worker starts its own trace, which pool_task hands back
+
+    # A forked worker already has the n x log(n) table from the parent process, but a spawned worker does not
+    if len(nlogn_table) <= len(columns[0]):
+        build_nlogn_table(len(columns[0]))
+
+
+# This function will find the best threshold of one attribute for the records of a node. It is run by the
+# attribute pool, where the node indexes become the record_index of the worker.
+#
+# argument 1 (node_indexes) - the indexes of the records of the node
+# argument 2 (attr_index) - the index of the attribute we are testing thresholds for
+def sweep_task(node_indexes, attr_index):
+    global record_index
+    start_time = time.perf_counter()
+    record_index = node_indexes
+    attribute_best = sweep_attribute(0, len(node_indexes), attr_index, attr_bounds[attr_index][0])
+    if trace_events is not None:
+        trace_event("sweep attribute " + str(attr_index), "sweep", start_time,
+                    {"attribute": attr_index, "thresholds": sweep_thresholds, "records_scanned": len(node_indexes)})
+    return attribute_best
+
+
+# This function will build the histogram of one attribute for the records of a node. It is run by the attribute
+# pool, where the node indexes become the record_index of the worker.
+#
+# argument 1 (node_indexes) - the indexes of the records of the node
+# argument 2 (attr_index) - the index of the attribute we are building the histogram for
+def histogram_task(node_indexes, attr_index):
+    global record_index
+    start_time = time.perf_counter()
+    record_index = node_indexes
+    histogram = build_histogram(0, len(node_indexes), attr_index)
+    if trace_events is not None:
+        trace_event("histogram attribute " + str(attr_index), "histogram", start_time,
+                    {"attribute": attr_index, "thresholds": 0, "records_scanned": len(node_indexes)})
+    return histogram
+
+
+# This function will run a task (sweep_task or histogram_task) for every attribute of a node, and returns the
+# results in the order of the attributes. The attributes are independent of each other, so if there is an
+# attribute pool and the node is large enough they are handled at the same time by the pool. Small nodes are
+# handled in this process, since sending them to the pool would cost more time than it saves. A worker of the pool
+# traces its own attributes, and those events are added to the trace of this process.
+#
+# argument 1 (task) - the function to run for each attribute
+# argument 2 (start) - the position in record_index where the records of the node begin
+# argument 3 (end) - the position in record_index where the records of the node end
+def map_attributes(task, start, end):
+    if attribute_pool is not None and end - start >= parallel_min_records:
+        node_indexes = array('i', record_index[start:end])
+        return [merge_trace_events(task_result) for task_result in
+                attribute_pool.map(pool_task, [task] * len(attr_bounds), [node_indexes] * len(attr_bounds),
+                                   range(len(attr_bounds)))]
+
+    # A task run in this process works on the node slice of the global record_index directly
+    results = []
+    for attr_index in range(len(attr_bounds)):
+        start_time = time.perf_counter()
+        if task is sweep_task:
+            results.append(sweep_attribute(start, end, attr_index, attr_bounds[attr_index][0]))
+            if trace_events is not None:
+                trace_event("sweep attribute " + str(attr_index), "sweep", start_time,
+                            {"attribute": attr_index, "thresholds": sweep_thresholds, "records_scanned": end - start})
         else:
-            mentee_program.write("                        if record[" + str(all_splits[1][0][0]) + "] <= " +
-                                 str(all_splits[1][0][1]) + ":\n")
-
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][0][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][0][2]) +
-                                     "'])\n")
-
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][0][0]) + "] <= " +
-                                     str(all_splits[2][0][1]) + ":\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][0][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][0][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][0][0]) +
-                                         "] <= " + str(all_splits[3][0][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][0][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][1][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][1][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][1][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][1][0]) +
-                                         "] <= " + str(all_splits[3][1][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][2][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][3][2]) + "'])\n")
-
-            mentee_program.write("                        else:\n")
-
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][1][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][1][2]) +
-                                     "'])\n")
-
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][1][0]) + "] <= " +
-                                     str(all_splits[2][1][1]) + ":\n")
+            results.append(build_histogram(start, end, attr_index))
+            if trace_events is not None:
+                trace_event("histogram attribute " + str(attr_index), "histogram", start_time,
+                            {"attribute": attr_index, "thresholds": 0, "records_scanned": end - start})
+    return results
 
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][2][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][2][2]) + "'])\n")
 
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][2][0]) +
-                                         "] <= " + str(all_splits[3][2][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][4][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][5][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][3][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][3][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][3][0]) +
-                                         "] <= " + str(all_splits[3][3][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][6][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][7][2]) + "'])\n")
+# This function will count how many Assams and Bhutans there are in a node. This is only needed for the root
+# of the decision tree, since partition_records counts them for every other node.
+#
+# argument 1 (start) - the position in record_index where the records of the node begin
+# argument 2 (end) - the position in record_index where the records of the node end
+def count_classes(start, end):
+    class_column = record_columns[7]
+    bhutan = 0
+    for position in range(start, end):
+        # If the class id of the record is 1, it is Bhutan
+        if class_column[record_index[position]] == 1:
+            bhutan += 1
 
-        mentee_program.write("                    else:\n")
+    # Otherwise it is Assam
+    return NodeStats((end - start) - bhutan, bhutan)
 
-        # If the stopping criteria has been met, we just return whatever majority class exists for this node
-        if all_splits[1][1][1] == 0:
-            mentee_program.write("                        write_data.writerow(['" + str(all_splits[1][1][2]) + "'])\n")
 
-        # Otherwise, we utilize the best attribute and the best threshold
+# This function will split a node in place (like the partition step of quicksort) by swapping the indexes in
+# record_index, so that the records at or below the threshold come first and the rest come after them. No
+# records are copied, so splitting never needs more memory than the index array itself. The Bhutans of the
+# first split are counted along the way, so the statistics of both splits come for free.
+#
+# argument 1 (start) - the position in record_index where the records of the node begin
+# argument 2 (end) - the position in record_index where the records of the node end
+# argument 3 (attr_index) - the index of the attribute we are splitting on
+# argument 4 (threshold) - the threshold of the attribute we are splitting on
+# argument 5 (node_stats) - the statistics of the node
+def partition_records(start, end, attr_index, threshold, node_stats):
+    attr_column = record_columns[attr_index]
+    class_column = record_columns[7]
+    bhutan1 = 0  # The amount of Bhutans in the first split
+    low_position = start
+    high_position = end - 1
+    while low_position <= high_position:
+        if attr_column[record_index[low_position]] <= threshold:
+            if class_column[record_index[low_position]] == 1:
+                bhutan1 += 1
+            low_position += 1
         else:
-            mentee_program.write("                        if record[" + str(all_splits[1][1][0]) + "] <= " +
-                                 str(all_splits[1][1][1]) + ":\n")
-
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][2][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][2][2]) +
-                                     "'])\n")
-
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][2][0]) + "] <= " +
-                                     str(all_splits[2][2][1]) + ":\n")
+            record_index[low_position], record_index[high_position] = \
+                record_index[high_position], record_index[low_position]
+            high_position -= 1
 
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][4][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][4][2]) + "'])\n")
+    # The first split is start to low_position, and the second split is low_position to end
+    stats1 = NodeStats((low_position - start) - bhutan1, bhutan1)
+    return low_position, stats1, node_stats.minus(stats1)
 
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][4][0]) +
-                                         "] <= " + str(all_splits[3][4][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][8][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][9][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][5][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][5][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][5][0]) +
-                                         "] <= " + str(all_splits[3][5][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][10][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][11][2]) + "'])\n")
 
-            mentee_program.write("                        else:\n")
+# This function will determine whether a node should stop splitting and become a leaf of the decision tree.
+#
+# argument 1 (depth) - the depth of the node out of the entire decision tree
+# argument 2 (node_stats) - the statistics of the node
+# argument 3 (stop_rules) - the depth, amount of records and purity that stop a node from splitting, if they are
+#                           not the ones training uses (stop_depth, stop_records and stop_purity)
+def stop_splitting(depth, node_stats, stop_rules=None):
+    max_depth, min_records, purity = stop_rules or (stop_depth, stop_records, stop_purity)
+
+    # If the decision tree already has its deepest level (11 levels by default), or there are fewer records than
+    # the minimum (9), or if the percentage of the majority class is greater than the purity (95 percent), or if
+    # the node only has one class (even when the purity is 100 percent), we will stop splitting
+    return depth >= max_depth or node_stats.total() < min_records or node_stats.major_percent() > purity or \
+        node_stats.is_pure()
+
+
+# This function will determine the best attribute and threshold of a node from the best threshold (and its
+# weighted entropy) of each attribute. If even the best split would not lower the entropy of the node, there is
+# nothing to gain from splitting it, and None is returned instead.
+#
+# argument 1 (attribute_bests) - the best weighted entropy and threshold of each attribute, in order
+# argument 2 (node_stats) - the statistics of the node
+def pick_best_split(attribute_bests, node_stats):
+    best_attribute = 0  # We initialize the best attribute to be the age
+    best_threshold = attr_bounds[0][0]  # We initialize the best attribute to be the min threshold of age
+    best_entropy = 1  # We initialize the best weighted entropy to be the worst possible
+    list_counter = 0  # We use this counter to determine the index belonging to the current attribute
+
+    for local_best_ent, local_best_thr in attribute_bests:
+        # If the best entropy of the current attribute is better than the global entropy, we
+        # update the appropriate values to reflect this
+        if local_best_ent < best_entropy:
+            best_attribute = list_counter
+            best_threshold = local_best_thr
+            best_entropy = local_best_ent
+
+        list_counter += 1  # Update new attribute index
+
+    if node_stats.entropy() - best_entropy <= min_entropy_gain:
+        return None
+    return best_attribute, best_threshold
+
+
+# This function will determine the best attribute and threshold to split a node by determining the least
+# weighted entropy. The node is the slice of record_index from start to end. It will keep calling itself
+# recursively until the stopping criteria are met.
+#
+# argument 1 (start) - the position in record_index where the records of the node begin
+# argument 2 (end) - the position in record_index where the records of the node end
+# argument 3 (depth) - the depth of the current node out of the entire decision tree
+# argument 4 (node) - the node of decision_tree that we fill in
+# argument 5 (histograms) - the histograms of the node, if split_mode is 'histogram' and they are known
+# argument 6 (node_stats) - the statistics of the node, if they are known
+def best_split(start, end, depth, node, histograms=None, node_stats=None):
+    global total_depth
+    node_time = time.perf_counter()
 
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][3][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][3][2]) +
-                                     "'])\n")
+    # Only the root of the decision tree needs its records counted, every other node gets its statistics from
+    # the partition of its parent
+    if node_stats is None:
+        node_stats = count_classes(start, end)
+    decision_tree.value[node] = node_stats.major_class()  # The class that appears more frequently in the records
+    decision_tree.samples[node] = node_stats.total()
 
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][3][0]) + "] <= " +
-                                     str(all_splits[2][3][1]) + ":\n")
+    # Update the global max depth if the local depth is greater than it
+    if depth + 1 > total_depth:
+        total_depth = depth + 1
 
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][6][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][6][2]) + "'])\n")
+    best_split_found = None  # The best attribute and threshold of the node, if it is split
+    if not stop_splitting(depth, node_stats):
+        # In histogram mode, the root node is the only node whose histograms are built from scratch
+        if split_mode == "histogram" and histograms is None:
+            histograms = build_histograms(start, end)
 
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][6][0]) +
-                                         "] <= " + str(all_splits[3][6][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][12][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][13][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][7][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][7][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][7][0]) +
-                                         "] <= " + str(all_splits[3][7][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][14][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][15][2]) + "'])\n")
-
-    # This is if the decision tree is 7 levels deep
-    elif total_depth == 7:
-        mentee_program.write("                    if record[" + str(all_splits[0][0][0]) + "] <= " +
-                             str(all_splits[0][0][1]) + ":\n")
-
-        # If the stopping criteria has been met, we just return whatever majority class exists for this node
-        if all_splits[1][0][1] == 0:
-            mentee_program.write("                        write_data.writerow(['" + str(all_splits[1][0][2]) + "'])\n")
-
-        # Otherwise, we utilize the best attribute and the best threshold
+        # We find the best threshold for each attribute in the global array
+        if split_mode == "histogram":
+            attribute_bests = sweep_histograms(histograms)
         else:
-            mentee_program.write("                        if record[" + str(all_splits[1][0][0]) + "] <= " +
-                                 str(all_splits[1][0][1]) + ":\n")
-
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][0][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][0][2]) +
-                                     "'])\n")
-
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][0][0]) + "] <= " +
-                                     str(all_splits[2][0][1]) + ":\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][0][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][0][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][0][0]) +
-                                         "] <= " + str(all_splits[3][0][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][0][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][1][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][1][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][1][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][1][0]) +
-                                         "] <= " + str(all_splits[3][1][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][2][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][3][2]) + "'])\n")
-
-            mentee_program.write("                        else:\n")
+            attribute_bests = map_attributes(sweep_task, start, end)
 
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][1][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][1][2]) +
-                                     "'])\n")
-
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][1][0]) + "] <= " +
-                                     str(all_splits[2][1][1]) + ":\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][2][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][2][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][2][0]) +
-                                         "] <= " + str(all_splits[3][2][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][4][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][5][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][3][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][3][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][3][0]) +
-                                         "] <= " + str(all_splits[3][3][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][6][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][7][2]) + "'])\n")
+        best_split_found = pick_best_split(attribute_bests, node_stats)
 
-        mentee_program.write("                    else:\n")
-
-        # If the stopping criteria has been met, we just return whatever majority class exists for this node
-        if all_splits[1][1][1] == 0:
-            mentee_program.write("                        write_data.writerow(['" + str(all_splits[1][1][2]) + "'])\n")
+    if best_split_found is None:
+        # If the stopping criteria is met, or no split lowers the entropy, the node stays a leaf of the decision tree
+        if trace_events is not None:
+            trace_event("leaf " + str(node), "node", node_time, {"node": node, "depth": depth, "records": end - start})
+        return
+    best_attribute, best_threshold = best_split_found
 
-        # Otherwise, we utilize the best attribute and the best threshold
+    # We move each record into either the first or second split according to the best attribute and
+    # its best threshold
+    start_time = time.perf_counter()
+    middle, stats1, stats2 = partition_records(start, end, best_attribute, best_threshold, node_stats)
+    if trace_events is not None:
+        trace_event("partition", "partition", start_time, {"records_scanned": end - start})
+
+    # We split the node on the best attribute and threshold for the classifier program
+    node1, node2 = decision_tree.split_node(node, best_attribute, best_threshold)
+
+    histograms1 = None  # The histograms of the first split
+    histograms2 = None  # The histograms of the second split
+
+    # In histogram mode, we only scan the smaller split and get the histograms of the larger one by subtraction
+    if split_mode == "histogram":
+        if middle - start <= end - middle:
+            histograms1 = build_histograms(start, middle)
+            histograms2 = subtract_histograms(histograms, histograms1)
         else:
-            mentee_program.write("                        if record[" + str(all_splits[1][1][0]) + "] <= " +
-                                 str(all_splits[1][1][1]) + ":\n")
-
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][2][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][2][2]) +
-                                     "'])\n")
-
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][2][0]) + "] <= " +
-                                     str(all_splits[2][2][1]) + ":\n")
+            histograms2 = build_histograms(middle, end)
+            histograms1 = subtract_histograms(histograms, histograms2)
 
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][4][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][4][2]) + "'])\n")
+    build_subtree(start, middle, depth + 1, node1, histograms1, stats1)  # Build the first split's subtree
+    build_subtree(middle, end, depth + 1, node2, histograms2, stats2)  # Build the second split's subtree
 
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][4][0]) +
-                                         "] <= " + str(all_splits[3][4][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][8][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][9][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][5][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][5][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][5][0]) +
-                                         "] <= " + str(all_splits[3][5][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][10][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][11][2]) + "'])\n")
+    if trace_events is not None:
+        trace_event("node " + str(node), "node", node_time, {"node": node, "depth": depth, "records": end - start,
+                                                             "attribute": best_attribute, "threshold": best_threshold})
 
-            mentee_program.write("                        else:\n")
 
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][3][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][3][2]) +
-                                     "'])\n")
+# This function will build the subtree of a node. If there is a subtree pool, the node is at the depth where
+# subtrees are handed out and it has enough records, the subtree is built by a worker process (and grafted onto
+# decision_tree later by wait_for_subtrees). Otherwise best_split is called in this process.
+#
+# argument 1 (start) - the position in record_index where the records of the node begin
+# argument 2 (end) - the position in record_index where the records of the node end
+# argument 3 (depth) - the depth of the node out of the entire decision tree
+# argument 4 (node) - the node of decision_tree that the subtree starts at
+# argument 5 (histograms) - the histograms of the node, if split_mode is 'histogram'
+# argument 6 (node_stats) - the statistics of the node
+def build_subtree(start, end, depth, node, histograms, node_stats):
+    if subtree_pool is not None and depth >= subtree_depth and end - start >= subtree_min_records:
+        subtree_futures.append((node, subtree_pool.submit(pool_task, subtree_task, start, end, depth, histograms,
+                                                          node_stats)))
+    else:
+        best_split(start, end, depth, node, histograms, node_stats)
 
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][3][0]) + "] <= " +
-                                     str(all_splits[2][3][1]) + ":\n")
 
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][6][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][6][2]) + "'])\n")
+# This function will set up a worker process of the subtree pool. The worker attaches to the shared memory
+# block of the record store instead of receiving a copy of the records, and since every subtree is a different
+# slice of the shared record_index, the workers can partition their slices in place at the same time.
+#
+# argument 1 (store_name) - the name of the shared memory block
+# argument 2 (record_count) - the amount of records in the record store
+# argument 3 (bounds) - the smallest and largest value of each attribute
+# argument 4 (mode) - how best_split finds thresholds ('sorted' or 'histogram')
+# argument 5 (stop_rules) - the depth, amount of records and purity that stop a node from splitting
+# argument 6 (tracing) - whether the worker collects trace events for the parent process
+def init_subtree_worker(store_name, record_count, bounds, mode, stop_rules, tracing):
+    global shared_store, record_columns, record_index, attr_bounds, split_mode, subtree_pool, attribute_pool, \
+        trace_events, stop_depth, stop_records, stop_purity
+    # A forked worker already has the block from the parent process, but a spawned worker has to attach to it.
+    # The views of a spawned worker must be released when it exits, before the block is closed.
+    if shared_store is None:
+        shared_store = shared_memory.SharedMemory(name=store_name)
+        util.Finalize(None, release_store_views, exitpriority=10)
+
+    record_columns, record_index = share_store_views(record_count)
+    attr_bounds = bounds
+    split_mode = mode
+    stop_depth, stop_records, stop_purity = stop_rules
+    subtree_pool = None
+    attribute_pool = None
+    trace_events = [] if tracing else None  # A forked worker starts its own trace, which pool_task hands back
+    if len(nlogn_table) <= record_count:
+        build_nlogn_table(record_count)
+
+
+# This function will create the views of the record columns and record_index over the shared memory block. The
+# block holds the 8 columns of the record store followed by record_index, each one as 4 byte integers.
+#
+# argument 1 (record_count) - the amount of records in the record store
+def share_store_views(record_count):
+    block_size = record_count * 4
+    views = [shared_store.buf[value_index * block_size:(value_index + 1) * block_size].cast('i')
+             for value_index in range(9)]
+    return views[:8], views[8]
+
+
+# This function will release the views of the record columns and record_index over the shared memory block,
+# and closes the block.
+def release_store_views():
+    global shared_store, record_columns, record_index
+    for a_view in record_columns + [record_index]:
+        a_view.release()
+    record_columns = []
+    record_index = array('i')
+    shared_store.close()
+    shared_store = None
+
+
+# This function will build a subtree in a worker of the subtree pool, and returns the subtree (as a decision tree
+# of its own) along with the total amount of levels of the entire decision tree it reaches.
+#
+# argument 1 (start) - the position in record_index where the records of the subtree begin
+# argument 2 (end) - the position in record_index where the records of the subtree end
+# argument 3 (depth) - the depth of the root of the subtree out of the entire decision tree
+# argument 4 (histograms) - the histograms of the root of the subtree, if split_mode is 'histogram'
+# argument 5 (node_stats) - the statistics of the root of the subtree
+def subtree_task(start, end, depth, histograms, node_stats):
+    reset_tree()
+    best_split(start, end, depth, decision_tree.add_node(), histograms, node_stats)
+    return decision_tree, total_depth
+
+
+# This function will wait until every subtree handed to the subtree pool has been built, and grafts them onto
+# the decision tree. The nodes in the trace of a subtree are numbered the way they are in the decision tree.
+def wait_for_subtrees():
+    global total_depth
+    start_time = time.perf_counter()
+    for node, future in subtree_futures:
+        subtree_result, worker_events = future.result()
+        subtree, subtree_total_depth = subtree_result
+        offset = len(decision_tree) - 1  # Node n of the subtree (other than its root) becomes node offset + n
+        for an_event in worker_events or []:
+            if "node" in an_event["args"]:
+                graft_node = node if an_event["args"]["node"] == 0 else an_event["args"]["node"] + offset
+                an_event["name"] = an_event["name"].split(" ")[0] + " " + str(graft_node)
+                an_event["args"]["node"] = graft_node
+        merge_trace_events((subtree_result, worker_events))
+        decision_tree.graft(node, subtree)
+        total_depth = max(total_depth, subtree_total_depth)
+    if trace_events is not None:
+        trace_event("wait for subtrees", "subtrees", start_time, {"subtrees": len(subtree_futures)})
+    subtree_futures.clear()
+
+
+# This function will simplify the decision tree without changing any of its predictions. A split whose two
+# branches end up as the same subtree (two leaves of the same class, say) is replaced by that subtree, and
+# subtrees that are identical (the same splits down to the same leaves) are merged into one. This turns the tree
+# into a decision DAG, where a node can be reached from more than one split. The amount of training records that
+# reach a merged node is added up over every place it was merged from.
+def simplify_tree():
+    global decision_tree, total_depth
+    if len(decision_tree) == 0:
+        return
 
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][6][0]) +
-                                         "] <= " + str(all_splits[3][6][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][12][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][13][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][7][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][7][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][7][0]) +
-                                         "] <= " + str(all_splits[3][7][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][14][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][15][2]) + "'])\n")
-
-    # This is if the decision tree is 8 levels deep
-    elif total_depth == 8:
-        mentee_program.write("                    if record[" + str(all_splits[0][0][0]) + "] <= " +
-                             str(all_splits[0][0][1]) + ":\n")
-
-        # If the stopping criteria has been met, we just return whatever majority class exists for this node
-        if all_splits[1][0][1] == 0:
-            mentee_program.write("                        write_data.writerow(['" + str(all_splits[1][0][2]) + "'])\n")
-
-        # Otherwise, we utilize the best attribute and the best threshold
+    subtree_ids = {}  # The id of each distinct subtree, by its key (a leaf's class, or a split and its subtrees)
+    subtree_keys = []  # The key of each distinct subtree, where subtrees always come after their own subtrees
+    subtree_values = []  # The majority class of each distinct subtree
+    subtree_samples = []  # The amount of training records that reach each distinct subtree
+    node_subtrees = [0] * len(decision_tree)  # The id of the distinct subtree each node of the tree turned into
+
+    # We visit the nodes bottom up, so both subtrees of a split are known before the split itself
+    node_stack = [(0, False)]
+    while node_stack:
+        node, children_done = node_stack.pop()
+        if not decision_tree.is_leaf(node) and not children_done:
+            node_stack.append((node, True))
+            node_stack.append((decision_tree.right[node], False))
+            node_stack.append((decision_tree.left[node], False))
+            continue
+
+        if decision_tree.is_leaf(node):
+            subtree_key = (decision_tree.value[node],)
+        elif node_subtrees[decision_tree.left[node]] == node_subtrees[decision_tree.right[node]]:
+            # Both branches lead to the same subtree, so the split makes no difference to any prediction
+            node_subtrees[node] = node_subtrees[decision_tree.left[node]]
+            continue
         else:
-            mentee_program.write("                        if record[" + str(all_splits[1][0][0]) + "] <= " +
-                                 str(all_splits[1][0][1]) + ":\n")
-
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][0][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][0][2]) +
-                                     "'])\n")
-
+            subtree_key = (decision_tree.feature[node], decision_tree.threshold[node],
+                           node_subtrees[decision_tree.left[node]], node_subtrees[decision_tree.right[node]])
+
+        if subtree_key not in subtree_ids:
+            subtree_ids[subtree_key] = len(subtree_keys)
+            subtree_keys.append(subtree_key)
+            subtree_values.append(decision_tree.value[node])
+            subtree_samples.append(0)
+        node_subtrees[node] = subtree_ids[subtree_key]
+        subtree_samples[node_subtrees[node]] += decision_tree.samples[node]
+
+    # The distinct subtrees become the nodes of the new tree, numbered from the root down so the root is node 0
+    old_nodes = len(decision_tree)
+    old_comparisons = mean_comparisons()
+    decision_tree = DecisionTree()
+    subtree_nodes = {node_subtrees[0]: decision_tree.add_node(subtree_samples[node_subtrees[0]],
+                                                              subtree_values[node_subtrees[0]])}
+    subtree_queue = [node_subtrees[0]]
+    for subtree_id in subtree_queue:
+        subtree_key = subtree_keys[subtree_id]
+        if len(subtree_key) == 1:
+            continue
+        for child_id in subtree_key[2:]:
+            if child_id not in subtree_nodes:
+                subtree_nodes[child_id] = decision_tree.add_node(subtree_samples[child_id], subtree_values[child_id])
+                subtree_queue.append(child_id)
+        node = subtree_nodes[subtree_id]
+        decision_tree.feature[node] = subtree_key[0]
+        decision_tree.threshold[node] = subtree_key[1]
+        decision_tree.left[node] = subtree_nodes[subtree_key[2]]
+        decision_tree.right[node] = subtree_nodes[subtree_key[3]]
+
+    # The amount of levels is the longest path from the root, which can only have become shorter
+    subtree_levels = []
+    for subtree_key in subtree_keys:
+        subtree_levels.append(1 if len(subtree_key) == 1 else
+                              1 + max(subtree_levels[subtree_key[2]], subtree_levels[subtree_key[3]]))
+    total_depth = subtree_levels[node_subtrees[0]]
+
+    print("Simplified the decision tree from " + str(old_nodes) + " to " + str(len(decision_tree)) + " nodes (" +
+          format(old_comparisons, ".2f") + " to " + format(mean_comparisons(), ".2f") +
+          " comparisons per training record)")
+
+
+# This function will simplify every tree of a bagged ensemble with simplify_tree.
+def simplify_ensemble():
+    global decision_tree, total_depth
+    for tree_number, (a_tree, tree_depth) in enumerate(ensemble_trees):
+        decision_tree, total_depth = a_tree, tree_depth
+        simplify_tree()
+        ensemble_trees[tree_number] = (decision_tree, total_depth)
+    total_depth = max(tree_depth for _, tree_depth in ensemble_trees)
+
+
+# This function will determine how many comparisons it takes on average to classify a training record with the
+# decision tree, which is the amount of records that reach each split added up and divided by the amount of
+# records.
+def mean_comparisons():
+    split_samples = sum(decision_tree.samples[node] for node in range(len(decision_tree))
+                        if not decision_tree.is_leaf(node))
+    return split_samples / max(decision_tree.samples[0], 1)
+
+
+# This function will determine the splits of the decision tree that can be reached from more than one split,
+# which only happens once simplify_tree has merged identical subtrees.
+def shared_subtrees():
+    parent_counts = [0] * len(decision_tree)
+    for node in range(len(decision_tree)):
+        if not decision_tree.is_leaf(node):
+            parent_counts[decision_tree.left[node]] += 1
+            parent_counts[decision_tree.right[node]] += 1
+    return set(node for node in range(len(decision_tree))
+               if parent_counts[node] > 1 and not decision_tree.is_leaf(node))
+
+
+# This function will lay the decision tree out level by level, so it can be printed. Each level lists the
+# attribute, threshold and majority class of the nodes at that depth, found by walking the nodes the tree has, so
+# a deep tree takes no more room than its nodes. Leaves have no attribute (None), and a subtree that simplify_tree
+# has merged is only listed at the first level it is reached from.
+def tree_levels():
+    split_levels = []
+    level_nodes = [0]  # The nodes at the depth being laid out
+    seen_nodes = {0}  # The nodes that have been laid out already
+    while level_nodes:
+        split_levels.append([])
+        next_nodes = []
+        for node in level_nodes:
+            if decision_tree.is_leaf(node):
+                split_levels[-1].append([None, None, decision_tree.value[node]])
             else:
-                mentee_program.write("                            if record[" + str(all_splits[2][0][0]) + "] <= " +
-                                     str(all_splits[2][0][1]) + ":\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][0][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][0][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][0][0]) +
-                                         "] <= " + str(all_splits[3][0][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][0][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][1][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][1][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][1][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][1][0]) +
-                                         "] <= " + str(all_splits[3][1][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][2][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][3][2]) + "'])\n")
-
-            mentee_program.write("                        else:\n")
-
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][1][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][1][2]) +
-                                     "'])\n")
-
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][1][0]) + "] <= " +
-                                     str(all_splits[2][1][1]) + ":\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][2][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][2][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][2][0]) +
-                                         "] <= " + str(all_splits[3][2][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][4][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][5][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][3][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][3][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][3][0]) +
-                                         "] <= " + str(all_splits[3][3][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][6][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][7][2]) + "'])\n")
+                split_levels[-1].append([decision_tree.feature[node], decision_tree.threshold[node],
+                                         decision_tree.value[node]])
+                for child_node in (decision_tree.left[node], decision_tree.right[node]):
+                    if child_node not in seen_nodes:
+                        seen_nodes.add(child_node)
+                        next_nodes.append(child_node)
+        level_nodes = next_nodes
+    return split_levels
+
+
+# This function will build a trained program (a python file called 'HW05_Classifier_Hu.py' unless another name
+# is given) which will utilize the decision tree built by best_split in order to determine which class each
+# record of a csv file falls into.
+#
+# argument 1 (classifier) - whether the trained program classifies one record at a time ('rows') or whole chunks
+#                           of records at once with NumPy ('numpy')
+# argument 2 (program_name) - the name of the trained program that is written
+def write_trained_program(classifier="rows", program_name="HW05_Classifier_Hu.py"):
+    print(total_depth)
+    mentee_program = open(program_name, "w")
+    if classifier == "numpy":
+        write_batch_program(mentee_program)
+    else:
+        write_row_program(mentee_program)
+    mentee_program.close()
 
-        mentee_program.write("                    else:\n")
+    report_program_cost(program_name)
 
-        # If the stopping criteria has been met, we just return whatever majority class exists for this node
-        if all_splits[1][1][1] == 0:
-            mentee_program.write("                        write_data.writerow(['" + str(all_splits[1][1][2]) + "'])\n")
 
-        # Otherwise, we utilize the best attribute and the best threshold
-        else:
-            mentee_program.write("                        if record[" + str(all_splits[1][1][0]) + "] <= " +
-                                 str(all_splits[1][1][1]) + ":\n")
+# This function will write the trained program that normalizes and classifies one record at a time, with the
+# decision tree written out as if statements.
+#
+# argument 1 (mentee_program) - the trained program that is being written
+def write_row_program(mentee_program):
+    mentee_program.write("import argparse\n")
+    mentee_program.write("import contextlib\n")
+    mentee_program.write("import csv\n")
+    mentee_program.write("import itertools\n")
+    mentee_program.write("import json\n")
+    mentee_program.write("import mmap\n")
+    mentee_program.write("import os\n")
+    mentee_program.write("import shutil\n")
+    mentee_program.write("import struct\n")
+    mentee_program.write("import sys\n")
+    mentee_program.write("import tempfile\n")
+    mentee_program.write("import time\n")
+    mentee_program.write("from array import array\n")
+    mentee_program.write("from concurrent.futures import ProcessPoolExecutor\n")
+    mentee_program.write("\n")
+    mentee_program.write("CACHE_MAGIC = b\"HW06COL1\"  # The first bytes of a binary column cache written by 'main.py "
+                         "--convert'\n")
+    mentee_program.write("\n")
+    mentee_program.write("\n")
+    mentee_program.write("# This function normalizes the values of one row of the csv file.\n")
+    mentee_program.write("#\n")
+    mentee_program.write("# argument 1 (row) - the row of the csv file, as a list of strings (or numbers)\n")
+    mentee_program.write("def normalize_record(row):\n")
+    mentee_program.write("    cur_record = [0] * 7  # The record with normalized values\n")
+    mentee_program.write("\n")
+    mentee_program.write("    # Append the normalized age into the record array\n")
+    mentee_program.write("    the_float = float(row[0])\n")
+    mentee_program.write("    norm_age = round(the_float / 2) * 2\n")
+    mentee_program.write("    cur_record[0] = norm_age\n")
+    mentee_program.write("\n")
+    mentee_program.write("    # Append the normalized height into the record array\n")
+    mentee_program.write("    the_float = float(row[1])\n")
+    mentee_program.write("    norm_height = round(the_float / 4) * 4\n")
+    mentee_program.write("    cur_record[1] = norm_height\n")
+    mentee_program.write("\n")
+    mentee_program.write("    # Append the normalized tail length into the record array\n")
+    mentee_program.write("    the_float = float(row[2])\n")
+    mentee_program.write("    norm_tail = round(the_float / 2) * 2\n")
+    mentee_program.write("    cur_record[2] = norm_tail\n")
+    mentee_program.write("\n")
+    mentee_program.write("    # Append the normalized hair length into the record array\n")
+    mentee_program.write("    the_float = float(row[3])\n")
+    mentee_program.write("    norm_hair = round(the_float / 2) * 2\n")
+    mentee_program.write("    cur_record[3] = norm_hair\n")
+    mentee_program.write("\n")
+    mentee_program.write("    # Append the normalized bang length into the record array\n")
+    mentee_program.write("    the_float = float(row[4])\n")
+    mentee_program.write("    norm_bang = round(the_float / 2) * 2\n")
+    mentee_program.write("    cur_record[4] = norm_bang\n")
+    mentee_program.write("\n")
+    mentee_program.write("    # Append the normalized reach into the record array\n")
+    mentee_program.write("    the_float = float(row[5])\n")
+    mentee_program.write("    norm_reach = round(the_float / 2) * 2\n")
+    mentee_program.write("    cur_record[5] = norm_reach\n")
+    mentee_program.write("\n")
+    mentee_program.write("    # Append the earlobe values into the record array\n")
+    mentee_program.write("    earlobe = int(row[6])\n")
+    mentee_program.write("    cur_record[6] = earlobe\n")
+    mentee_program.write("\n")
+    mentee_program.write("    return cur_record\n")
+    mentee_program.write("\n")
+    mentee_program.write("\n")
+    write_file_functions(mentee_program)
+    mentee_program.write("# This function opens the file specified in the command line, and gives back its header and "
+                         "its normalized\n")
+    mentee_program.write("# records. The records are normalized one at a time as they are read, so the file is never "
+                         "held in memory. A\n")
+    mentee_program.write("# binary column cache is memory-mapped instead of parsed, and '-' reads the csv file from "
+                         "stdin.\n")
+    mentee_program.write("#\n")
+    mentee_program.write("# argument 1 (file_name) - the name of the csv file or binary column cache, or '-'\n")
+    mentee_program.write("@contextlib.contextmanager\n")
+    mentee_program.write("def open_records(file_name):\n")
+    mentee_program.write("    if file_name != \"-\" and is_column_cache(file_name):\n")
+    mentee_program.write("        header, columns = read_column_cache(file_name)\n")
+    mentee_program.write("        yield header[:7], zip(*columns[:7])\n")
+    mentee_program.write("    else:\n")
+    mentee_program.write("        with open_stream(file_name, \"r\") as csv_file:\n")
+    mentee_program.write("            read_data = csv.reader(csv_file)\n")
+    mentee_program.write("            header = next(read_data)\n")
+    mentee_program.write("\n")
+    mentee_program.write("            # We normalize the values in each record as it is read\n")
+    mentee_program.write("            yield header, (normalize_record(row) for row in read_data)\n")
+    mentee_program.write("\n")
+    mentee_program.write("\n")
+    write_tree_functions(mentee_program)
+    mentee_program.write("\n")
+    mentee_program.write("\n")
+    mentee_program.write("# This function classifies one row (the values of the seven attributes, as strings or "
+                         "numbers), and returns its\n")
+    mentee_program.write("# class. It keeps no state between calls and never touches the filesystem, so a host program "
+                         "can import the\n")
+    mentee_program.write("# trained program and call it from several threads at once.\n")
+    mentee_program.write("#\n")
+    mentee_program.write("# argument 1 (row) - the row to classify\n")
+    mentee_program.write("def predict_one(row):\n")
+    mentee_program.write("    return classify(normalize_record(row))\n")
+    mentee_program.write("\n")
+    mentee_program.write("\n")
+    mentee_program.write("# This function classifies every row of an iterable of rows, and returns their classes as a "
+                         "list. Like\n")
+    mentee_program.write("# predict_one, it keeps no state between calls and never touches the filesystem.\n")
+    mentee_program.write("#\n")
+    mentee_program.write("# argument 1 (rows) - the rows to classify\n")
+    mentee_program.write("def predict_batch(rows):\n")
+    mentee_program.write("    return [classify(normalize_record(row)) for row in rows]\n")
+    mentee_program.write("\n")
+    mentee_program.write("\n")
+    mentee_program.write("# This function classifies each row of a csv file (or binary column cache), and writes its "
+                         "class into the output\n")
+    mentee_program.write("# file. Each row is classified and written out as soon as it is read, so memory use stays "
+                         "the same no matter how\n")
+    mentee_program.write("# big the file is.\n")
+    mentee_program.write("#\n")
+    mentee_program.write("# argument 1 (file_name) - the name of the csv file or binary column cache, or '-' for "
+                         "stdin\n")
+    mentee_program.write("# argument 2 (output_name) - the name of the output file, or '-' for stdout\n")
+    mentee_program.write("def score_file(file_name, output_name):\n")
+    mentee_program.write("    with open_records(file_name) as (header, all_records), open_stream(output_name, \"w\") "
+                         "as output_file:\n")
+    mentee_program.write("        write_data = csv.writer(output_file)\n")
+    mentee_program.write("        header.append('Class')\n")
+    mentee_program.write("        write_data.writerow(header)  # Puts the header in the output file\n")
+    mentee_program.write("\n")
+    mentee_program.write("        # For each record with normalized values, we determine which class it belongs to\n")
+    mentee_program.write("        write_data.writerows([classify(record)] for record in all_records)\n")
+    mentee_program.write("\n")
+    mentee_program.write("\n")
+    mentee_program.write("# This function classifies the rows of a byte range of a csv file, and writes their classes "
+                         "into a part file.\n")
+    mentee_program.write("# It runs in a worker process of score_in_parallel, and returns the name of the part file.\n")
+    mentee_program.write("#\n")
+    mentee_program.write("# argument 1 (file_name) - the name of the csv file\n")
+    mentee_program.write("# argument 2 (range_start) - the position in the file where the range begins\n")
+    mentee_program.write("# argument 3 (range_end) - the position in the file where the range ends\n")
+    mentee_program.write("# argument 4 (part_name) - the name of the part file\n")
+    mentee_program.write("def score_range(file_name, range_start, range_end, part_name):\n")
+    mentee_program.write("    with open(file_name, \"rb\") as csv_file, open(part_name, \"w\", newline=\"\") as "
+                         "part_file:\n")
+    mentee_program.write("        read_data = csv.reader(read_range_lines(csv_file, range_start, range_end))\n")
+    mentee_program.write("        csv.writer(part_file).writerows([classify(normalize_record(row))] for row in "
+                         "read_data)\n")
+    mentee_program.write("    return part_name\n")
+    mentee_program.write("\n")
+    mentee_program.write("\n")
+    write_parallel_functions(mentee_program)
 
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][2][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][2][2]) +
-                                     "'])\n")
 
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][2][0]) + "] <= " +
-                                     str(all_splits[2][2][1]) + ":\n")
+# This function will write the functions of the trained program that open its input and output files, and that
+# recognize and memory-map a binary column cache.
+#
+# argument 1 (mentee_program) - the trained program that is being written
+def write_file_functions(mentee_program):
+    mentee_program.write("# This function opens a file for reading or writing, where '-' stands for stdin or stdout "
+                         "(which are left open).\n")
+    mentee_program.write("#\n")
+    mentee_program.write("# argument 1 (file_name) - the name of the file, or '-'\n")
+    mentee_program.write("# argument 2 (mode) - 'r' to read the file or 'w' to write it\n")
+    mentee_program.write("def open_stream(file_name, mode):\n")
+    mentee_program.write("    if file_name == \"-\":\n")
+    mentee_program.write("        return contextlib.nullcontext(sys.stdin if mode == \"r\" else sys.stdout)\n")
+    mentee_program.write("    return open(file_name, mode, newline=\"\")\n")
+    mentee_program.write("\n")
+    mentee_program.write("\n")
+    mentee_program.write("# This function determines whether a file is a binary column cache instead of a csv file.\n")
+    mentee_program.write("#\n")
+    mentee_program.write("# argument 1 (file_name) - the name of the file\n")
+    mentee_program.write("def is_column_cache(file_name):\n")
+    mentee_program.write("    with open(file_name, \"rb\") as test_file:\n")
+    mentee_program.write("        return test_file.read(len(CACHE_MAGIC)) == CACHE_MAGIC\n")
+    mentee_program.write("\n")
+    mentee_program.write("\n")
+    mentee_program.write("# This function memory-maps a binary column cache, and returns the column names and a view "
+                         "of each column. The\n")
+    mentee_program.write("# values are already normalized, so nothing has to be parsed.\n")
+    mentee_program.write("#\n")
+    mentee_program.write("# argument 1 (file_name) - the name of the binary column cache\n")
+    mentee_program.write("def read_column_cache(file_name):\n")
+    mentee_program.write("    with open(file_name, \"rb\") as cache_file:\n")
+    mentee_program.write("        cache_map = mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ)\n")
+    mentee_program.write("    header_length = struct.unpack_from(\"<I\", cache_map, 8)[0]\n")
+    mentee_program.write("    header = json.loads(bytes(cache_map[16:16 + header_length]).decode(\"utf-8\"))\n")
+    mentee_program.write("    column_size = header[\"rows\"] * array(header[\"typecode\"]).itemsize\n")
+    mentee_program.write("    data_offset = header[\"data_offset\"]\n")
+    mentee_program.write("\n")
+    mentee_program.write("    columns = []\n")
+    mentee_program.write("    for column_index in range(len(header[\"columns\"])):\n")
+    mentee_program.write("        column_start = data_offset + column_index * column_size\n")
+    mentee_program.write("        column = memoryview(cache_map)[column_start:column_start + "
+                         "column_size].cast(header[\"typecode\"])\n")
+    mentee_program.write("\n")
+    mentee_program.write("        # The columns can only be used in place if they are in the byte order of this "
+                         "machine\n")
+    mentee_program.write("        if header[\"byteorder\"] != sys.byteorder:\n")
+    mentee_program.write("            column = array(header[\"typecode\"], column)\n")
+    mentee_program.write("            column.byteswap()\n")
+    mentee_program.write("        columns.append(column)\n")
+    mentee_program.write("\n")
+    mentee_program.write("    return [a_column[\"name\"] for a_column in header[\"columns\"]], columns\n")
+    mentee_program.write("\n")
+    mentee_program.write("\n")
 
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][4][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][4][2]) + "'])\n")
 
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][4][0]) +
-                                         "] <= " + str(all_splits[3][4][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][8][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][9][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][5][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][5][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][5][0]) +
-                                         "] <= " + str(all_splits[3][5][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][10][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][11][2]) + "'])\n")
+# This function will write the trained program that classifies whole chunks of records at once with NumPy. The
+# csv file is parsed and normalized a chunk at a time, the decision tree is written out as arrays (like
+# DecisionTree) and walked one level at a time for every record of a chunk together, and the classes of a chunk
+# are written out in one go.
+#
+# argument 1 (mentee_program) - the trained program that is being written
+def write_batch_program(mentee_program):
+    mentee_program.write("import argparse\n")
+    mentee_program.write("import contextlib\n")
+    mentee_program.write("import csv\n")
+    mentee_program.write("import itertools\n")
+    mentee_program.write("import json\n")
+    mentee_program.write("import mmap\n")
+    mentee_program.write("import os\n")
+    mentee_program.write("import shutil\n")
+    mentee_program.write("import struct\n")
+    mentee_program.write("import sys\n")
+    mentee_program.write("import tempfile\n")
+    mentee_program.write("import time\n")
+    mentee_program.write("from array import array\n")
+    mentee_program.write("from concurrent.futures import ProcessPoolExecutor\n")
+    mentee_program.write("\n")
+    mentee_program.write("import numpy as np\n")
+    mentee_program.write("\n")
+    mentee_program.write("CACHE_MAGIC = b\"HW06COL1\"  # The first bytes of a binary column cache written by 'main.py "
+                         "--convert'\n")
+    mentee_program.write("ATTR_STEPS = np.array(" + str(attr_steps) + ")  # What each attribute is rounded to\n")
+    # Every tree of an ensemble walks its own copy of the node of each record, so ensembles use smaller chunks
+    mentee_program.write("CHUNK_ROWS = " + str(250000 // max(len(ensemble_trees), 1)) + "  # How many records are "
+                         "classified at a time\n")
+    mentee_program.write("CLASS_LINES = np.array([\"-1\\r\\n\", \"0\\r\\n\", \"1\\r\\n\"])  # The line "
+                         "written for the classes -1, 0 and 1\n")
+    mentee_program.write("\n")
 
-            mentee_program.write("                        else:\n")
+    # Leaves lead back to themselves, so records that reach a leaf early stay there for the rest of the levels
+    if ensemble_trees:
+        write_ensemble_arrays(mentee_program)
+    else:
+        tree_nodes = range(len(decision_tree))
+        mentee_program.write("# The decision tree, with one entry in each array for every node. Leaves lead back to "
+                             "themselves.\n")
+        mentee_program.write("TREE_DEPTH = " + str(total_depth) + "\n")
+        write_array_constant(mentee_program, "FEATURE", [max(decision_tree.feature[node], 0) for node in tree_nodes])
+        write_array_constant(mentee_program, "THRESHOLD", [decision_tree.threshold[node] for node in tree_nodes])
+        write_array_constant(mentee_program, "LEFT", [node if decision_tree.is_leaf(node) else
+                                                      decision_tree.left[node] for node in tree_nodes])
+        write_array_constant(mentee_program, "RIGHT", [node if decision_tree.is_leaf(node) else
+                                                       decision_tree.right[node] for node in tree_nodes])
+        write_array_constant(mentee_program, "VALUE", [decision_tree.value[node] for node in tree_nodes])
+    mentee_program.write("\n")
+    mentee_program.write("\n")
+    write_file_functions(mentee_program)
+    mentee_program.write("# This function reads the lines of a csv file in large chunks, and gives back the records of "
+                         "each chunk as a\n")
+    mentee_program.write("# NumPy array with one row for each record. Each attribute of a chunk is rounded at once to "
+                         "the nearest multiple\n")
+    mentee_program.write("# of its step.\n")
+    mentee_program.write("#\n")
+    mentee_program.write("# argument 1 (csv_lines) - the lines of the csv file after its header (an open csv file "
+                         "works as well)\n")
+    mentee_program.write("def read_csv_chunks(csv_lines):\n")
+    mentee_program.write("    csv_lines = iter(csv_lines)\n")
+    mentee_program.write("    while True:\n")
+    mentee_program.write("        lines = list(itertools.islice(csv_lines, CHUNK_ROWS))\n")
+    mentee_program.write("        if not lines:\n")
+    mentee_program.write("            break\n")
+    mentee_program.write("        values = np.loadtxt(lines, delimiter=\",\", usecols=range(7), dtype=np.float64, "
+                         "ndmin=2)\n")
+    mentee_program.write("        yield (np.round(values / ATTR_STEPS) * ATTR_STEPS).astype(np.int64)\n")
+    mentee_program.write("\n")
+    mentee_program.write("\n")
+    mentee_program.write("# This function gives back the records of a binary column cache in chunks, as NumPy arrays "
+                         "with one row for each\n")
+    mentee_program.write("# record. The values are already normalized.\n")
+    mentee_program.write("#\n")
+    mentee_program.write("# argument 1 (columns) - the views of the attribute columns of the cache\n")
+    mentee_program.write("def read_cache_chunks(columns):\n")
+    mentee_program.write("    for chunk_start in range(0, len(columns[0]), CHUNK_ROWS):\n")
+    mentee_program.write("        yield np.column_stack([np.asarray(column[chunk_start:chunk_start + CHUNK_ROWS]) for "
+                         "column in columns])\n")
+    mentee_program.write("\n")
+    mentee_program.write("\n")
+    mentee_program.write("# This function opens the file specified in the command line, and gives back its header and "
+                         "its normalized\n")
+    mentee_program.write("# records in chunks. A binary column cache is memory-mapped instead of parsed, and '-' reads "
+                         "the csv file from\n")
+    mentee_program.write("# stdin.\n")
+    mentee_program.write("#\n")
+    mentee_program.write("# argument 1 (file_name) - the name of the csv file or binary column cache, or '-'\n")
+    mentee_program.write("@contextlib.contextmanager\n")
+    mentee_program.write("def open_record_chunks(file_name):\n")
+    mentee_program.write("    if file_name != \"-\" and is_column_cache(file_name):\n")
+    mentee_program.write("        header, columns = read_column_cache(file_name)\n")
+    mentee_program.write("        yield header[:7], read_cache_chunks(columns[:7])\n")
+    mentee_program.write("    else:\n")
+    mentee_program.write("        with open_stream(file_name, \"r\") as csv_file:\n")
+    mentee_program.write("            header = next(csv.reader([csv_file.readline()]))\n")
+    mentee_program.write("            yield header, read_csv_chunks(csv_file)\n")
+    mentee_program.write("\n")
+    mentee_program.write("\n")
+    if ensemble_trees:
+        write_ensemble_classify(mentee_program)
+    else:
+        mentee_program.write("# This function classifies a whole chunk of normalized records at once. Every record "
+                             "starts at the root, and\n")
+        mentee_program.write("# each step moves all the records down one level of the decision tree with a single "
+                             "np.where (leaves lead back\n")
+        mentee_program.write("# to themselves), so the tree is walked in as many steps as it has levels.\n")
+        mentee_program.write("#\n")
+        mentee_program.write("# argument 1 (records) - the normalized records, as a NumPy array with one row for each "
+                             "record\n")
+        mentee_program.write("def classify_batch(records):\n")
+        mentee_program.write("    row_indexes = np.arange(len(records))\n")
+        mentee_program.write("    nodes = np.zeros(len(records), dtype=np.intp)\n")
+        mentee_program.write("    for _ in range(TREE_DEPTH - 1):\n")
+        mentee_program.write("        go_left = records[row_indexes, FEATURE[nodes]] <= THRESHOLD[nodes]\n")
+        mentee_program.write("        nodes = np.where(go_left, LEFT[nodes], RIGHT[nodes])\n")
+        mentee_program.write("    return VALUE[nodes]\n")
+    mentee_program.write("\n")
+    mentee_program.write("\n")
+    mentee_program.write("# This function classifies one row (the values of the seven attributes, as strings or "
+                         "numbers), and returns its\n")
+    mentee_program.write("# class. It keeps no state between calls and never touches the filesystem, so a host program "
+                         "can import the\n")
+    mentee_program.write("# trained program and call it from several threads at once.\n")
+    mentee_program.write("#\n")
+    mentee_program.write("# argument 1 (row) - the row to classify\n")
+    mentee_program.write("def predict_one(row):\n")
+    mentee_program.write("    return predict_batch([row])[0]\n")
+    mentee_program.write("\n")
+    mentee_program.write("\n")
+    mentee_program.write("# This function classifies every row of an iterable of rows at once, and returns their "
+                         "classes as a list. Like\n")
+    mentee_program.write("# predict_one, it keeps no state between calls and never touches the filesystem.\n")
+    mentee_program.write("#\n")
+    mentee_program.write("# argument 1 (rows) - the rows to classify\n")
+    mentee_program.write("def predict_batch(rows):\n")
+    mentee_program.write("    values = np.array([row[:7] for row in rows], dtype=np.float64).reshape(-1, 7)\n")
+    mentee_program.write("    return classify_batch((np.round(values / ATTR_STEPS) * "
+                         "ATTR_STEPS).astype(np.int64)).tolist()\n")
+    mentee_program.write("\n")
+    mentee_program.write("\n")
+    mentee_program.write("# This function classifies each row of a csv file (or binary column cache) a chunk of rows "
+                         "at a time, and writes\n")
+    mentee_program.write("# their classes into the output file.\n")
+    mentee_program.write("#\n")
+    mentee_program.write("# argument 1 (file_name) - the name of the csv file or binary column cache, or '-' for "
+                         "stdin\n")
+    mentee_program.write("# argument 2 (output_name) - the name of the output file, or '-' for stdout\n")
+    mentee_program.write("def score_file(file_name, output_name):\n")
+    mentee_program.write("    with open_record_chunks(file_name) as (header, record_chunks), open_stream(output_name, "
+                         "\"w\") as output_file:\n")
+    mentee_program.write("        header.append('Class')\n")
+    mentee_program.write("        csv.writer(output_file).writerow(header)  # Puts the header in the output file\n")
+    mentee_program.write("\n")
+    mentee_program.write("        # Each chunk of records is classified at once, and its classes are written out "
+                         "together\n")
+    mentee_program.write("        for records in record_chunks:\n")
+    mentee_program.write("            output_file.write(\"\".join(CLASS_LINES[classify_batch(records) + "
+                         "1].tolist()))\n")
+    mentee_program.write("\n")
+    mentee_program.write("\n")
+    mentee_program.write("# This function classifies the rows of a byte range of a csv file, and writes their classes "
+                         "into a part file.\n")
+    mentee_program.write("# It runs in a worker process of score_in_parallel, and returns the name of the part file.\n")
+    mentee_program.write("#\n")
+    mentee_program.write("# argument 1 (file_name) - the name of the csv file\n")
+    mentee_program.write("# argument 2 (range_start) - the position in the file where the range begins\n")
+    mentee_program.write("# argument 3 (range_end) - the position in the file where the range ends\n")
+    mentee_program.write("# argument 4 (part_name) - the name of the part file\n")
+    mentee_program.write("def score_range(file_name, range_start, range_end, part_name):\n")
+    mentee_program.write("    with open(file_name, \"rb\") as csv_file, open(part_name, \"w\", newline=\"\") as "
+                         "part_file:\n")
+    mentee_program.write("        for records in read_csv_chunks(read_range_lines(csv_file, range_start, "
+                         "range_end)):\n")
+    mentee_program.write("            part_file.write(\"\".join(CLASS_LINES[classify_batch(records) + 1].tolist()))\n")
+    mentee_program.write("    return part_name\n")
+    mentee_program.write("\n")
+    mentee_program.write("\n")
+    write_parallel_functions(mentee_program)
 
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][3][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][3][2]) +
-                                     "'])\n")
 
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][3][0]) + "] <= " +
-                                     str(all_splits[2][3][1]) + ":\n")
+# This function will write the trees of a bagged ensemble into the trained program as one set of node arrays,
+# where the nodes of each tree follow the nodes of the tree before it and ROOTS holds the root of each tree.
+#
+# argument 1 (mentee_program) - the trained program that is being written
+def write_ensemble_arrays(mentee_program):
+    roots = []
+    features = []
+    thresholds = []
+    lefts = []
+    rights = []
+    values = []
+    for a_tree, _ in ensemble_trees:
+        node_offset = len(features)  # Where the nodes of this tree begin in the arrays
+        roots.append(node_offset)
+        for node in range(len(a_tree)):
+            features.append(max(a_tree.feature[node], 0))
+            thresholds.append(a_tree.threshold[node])
+            lefts.append(node_offset + (node if a_tree.is_leaf(node) else a_tree.left[node]))
+            rights.append(node_offset + (node if a_tree.is_leaf(node) else a_tree.right[node]))
+            values.append(a_tree.value[node])
+
+    mentee_program.write("# The " + str(len(ensemble_trees)) + " decision trees of the ensemble, with one entry in "
+                         "each array for every node of every tree. Leaves\n")
+    mentee_program.write("# lead back to themselves.\n")
+    mentee_program.write("TREE_DEPTH = " + str(total_depth) + "\n")
+    write_array_constant(mentee_program, "ROOTS", roots)
+    write_array_constant(mentee_program, "FEATURE", features)
+    write_array_constant(mentee_program, "THRESHOLD", thresholds)
+    write_array_constant(mentee_program, "LEFT", lefts)
+    write_array_constant(mentee_program, "RIGHT", rights)
+    write_array_constant(mentee_program, "VALUE", values)
+
+
+# This function will write the classify_batch of the trained program for a bagged ensemble, which walks every
+# tree for every record at once and lets the trees vote.
+#
+# argument 1 (mentee_program) - the trained program that is being written
+def write_ensemble_classify(mentee_program):
+    mentee_program.write("# This function classifies a whole chunk of normalized records at once with every tree of "
+                         "the ensemble. Each\n")
+    mentee_program.write("# record starts at the root of every tree, and each step moves all the records down one "
+                         "level of all the trees\n")
+    mentee_program.write("# with a single np.where (leaves lead back to themselves). The class of a record is the "
+                         "one most trees vote for,\n")
+    mentee_program.write("# and a tied vote goes to Bhutan, like a tied node does.\n")
+    mentee_program.write("#\n")
+    mentee_program.write("# argument 1 (records) - the normalized records, as a NumPy array with one row for each "
+                         "record\n")
+    mentee_program.write("def classify_batch(records):\n")
+    mentee_program.write("    row_indexes = np.arange(len(records))\n")
+    mentee_program.write("    nodes = np.repeat(ROOTS[:, np.newaxis], len(records), axis=1)  # The node of each record "
+                         "in each tree\n")
+    mentee_program.write("    for _ in range(TREE_DEPTH - 1):\n")
+    mentee_program.write("        go_left = records[row_indexes, FEATURE[nodes]] <= THRESHOLD[nodes]\n")
+    mentee_program.write("        nodes = np.where(go_left, LEFT[nodes], RIGHT[nodes])\n")
+    mentee_program.write("    return np.where(VALUE[nodes].sum(axis=0) >= 0, 1, -1)\n")
+
+
+# This function will write the functions of the trained program that classify a csv file with several worker
+# processes (each of them classifying its own byte range of the file, with the score_range of the trained
+# program), and the code that runs the trained program from the command line.
+#
+# argument 1 (mentee_program) - the trained program that is being written
+def write_parallel_functions(mentee_program):
+    mentee_program.write("# This function splits the rows of a csv file (after its header) into byte ranges of about "
+                         "the same size, where\n")
+    mentee_program.write("# every range begins at the start of a line.\n")
+    mentee_program.write("#\n")
+    mentee_program.write("# argument 1 (file_name) - the name of the csv file\n")
+    mentee_program.write("# argument 2 (data_start) - the position in the file where the first row after the header "
+                         "begins\n")
+    mentee_program.write("# argument 3 (range_count) - the amount of ranges\n")
+    mentee_program.write("def split_byte_ranges(file_name, data_start, range_count):\n")
+    mentee_program.write("    file_size = os.path.getsize(file_name)\n")
+    mentee_program.write("    range_starts = [data_start]\n")
+    mentee_program.write("    with open(file_name, \"rb\") as csv_file:\n")
+    mentee_program.write("        for range_index in range(1, range_count):\n")
+    mentee_program.write("            csv_file.seek(max(data_start + (file_size - data_start) * range_index // "
+                         "range_count, range_starts[-1]))\n")
+    mentee_program.write("            csv_file.readline()  # The range is moved forward to the start of the next "
+                         "line\n")
+    mentee_program.write("            range_starts.append(csv_file.tell())\n")
+    mentee_program.write("    return list(zip(range_starts, range_starts[1:] + [file_size]))\n")
+    mentee_program.write("\n")
+    mentee_program.write("\n")
+    mentee_program.write("# This function reads the lines of a byte range of a csv file, as strings.\n")
+    mentee_program.write("#\n")
+    mentee_program.write("# argument 1 (csv_file) - the csv file, opened in binary mode\n")
+    mentee_program.write("# argument 2 (range_start) - the position in the file where the range begins\n")
+    mentee_program.write("# argument 3 (range_end) - the position in the file where the range ends\n")
+    mentee_program.write("def read_range_lines(csv_file, range_start, range_end):\n")
+    mentee_program.write("    csv_file.seek(range_start)\n")
+    mentee_program.write("    position = range_start\n")
+    mentee_program.write("    while position < range_end:\n")
+    mentee_program.write("        line = csv_file.readline()\n")
+    mentee_program.write("        if not line:\n")
+    mentee_program.write("            break\n")
+    mentee_program.write("        position += len(line)\n")
+    mentee_program.write("        yield line.decode(\"utf-8\")\n")
+    mentee_program.write("\n")
+    mentee_program.write("\n")
+    mentee_program.write("# This function classifies the rows of a csv file with several worker processes. The file is "
+                         "split into byte\n")
+    mentee_program.write("# ranges, and each worker classifies a range into a part file of its own. The parts are "
+                         "copied into the output\n")
+    mentee_program.write("# file in the order of their ranges as soon as they are done, so the classes come out in the "
+                         "order of the rows.\n")
+    mentee_program.write("#\n")
+    mentee_program.write("# argument 1 (file_name) - the name of the csv file\n")
+    mentee_program.write("# argument 2 (output_name) - the name of the output file, or '-' for stdout\n")
+    mentee_program.write("# argument 3 (workers) - the amount of worker processes\n")
+    mentee_program.write("def score_in_parallel(file_name, output_name, workers):\n")
+    mentee_program.write("    with open(file_name, \"rb\") as csv_file:\n")
+    mentee_program.write("        header = next(csv.reader([csv_file.readline().decode(\"utf-8\")]))\n")
+    mentee_program.write("        data_start = csv_file.tell()\n")
+    mentee_program.write("\n")
+    mentee_program.write("    # There are a few ranges for each worker, so a worker that finishes early can take on "
+                         "another range\n")
+    mentee_program.write("    byte_ranges = split_byte_ranges(file_name, data_start, workers * 4)\n")
+    mentee_program.write("    with tempfile.TemporaryDirectory() as part_directory, open_stream(output_name, \"w\") as "
+                         "output_file:\n")
+    mentee_program.write("        header.append('Class')\n")
+    mentee_program.write("        csv.writer(output_file).writerow(header)  # Puts the header in the output file\n")
+    mentee_program.write("        part_names = [os.path.join(part_directory, \"part\" + str(range_index) + \".csv\")\n")
+    mentee_program.write("                      for range_index in range(len(byte_ranges))]\n")
+    mentee_program.write("        with ProcessPoolExecutor(max_workers=workers) as worker_pool:\n")
+    mentee_program.write("            for part_name in worker_pool.map(score_range, [file_name] * len(byte_ranges),\n")
+    mentee_program.write("                                             [byte_range[0] for byte_range in "
+                         "byte_ranges],\n")
+    mentee_program.write("                                             [byte_range[1] for byte_range in byte_ranges], "
+                         "part_names):\n")
+    mentee_program.write("                with open(part_name, newline=\"\") as part_file:\n")
+    mentee_program.write("                    shutil.copyfileobj(part_file, output_file)\n")
+    mentee_program.write("\n")
+    mentee_program.write("\n")
+    mentee_program.write("# This function times the importable API on the rows of a csv file, and prints how long a "
+                         "call of predict_one\n")
+    mentee_program.write("# takes and how long a call of predict_batch with 10000 rows takes.\n")
+    mentee_program.write("#\n")
+    mentee_program.write("# argument 1 (file_name) - the name of the csv file the rows are taken from\n")
+    mentee_program.write("def benchmark_api(file_name):\n")
+    mentee_program.write("    with open(file_name, newline=\"\") as csv_file:\n")
+    mentee_program.write("        read_data = csv.reader(csv_file)\n")
+    mentee_program.write("        next(read_data)  # We ignore the headers\n")
+    mentee_program.write("        rows = list(itertools.islice(read_data, 10000))\n")
+    mentee_program.write("    if not rows:\n")
+    mentee_program.write("        print(\"Error - there are no rows in '\" + file_name + \"' to time the API with\")\n")
+    mentee_program.write("        return\n")
+    mentee_program.write("    rows = (rows * (10000 // len(rows) + 1))[:10000]\n")
+    mentee_program.write("\n")
+    mentee_program.write("    start_time = time.perf_counter()\n")
+    mentee_program.write("    for row in rows:\n")
+    mentee_program.write("        predict_one(row)\n")
+    mentee_program.write("    one_time = (time.perf_counter() - start_time) / len(rows)\n")
+    mentee_program.write("\n")
+    mentee_program.write("    start_time = time.perf_counter()\n")
+    mentee_program.write("    for _ in range(20):\n")
+    mentee_program.write("        predict_batch(rows)\n")
+    mentee_program.write("    batch_time = (time.perf_counter() - start_time) / 20\n")
+    mentee_program.write("\n")
+    mentee_program.write("    print(\"predict_one: \" + format(one_time * 1000000, \".2f\") + \" us per call\")\n")
+    mentee_program.write("    print(\"predict_batch of \" + str(len(rows)) + \" rows: \" + format(batch_time * 1000, "
+                         "\".2f\") + \" ms per call (\" +\n")
+    mentee_program.write("          format(batch_time / len(rows) * 1000000, \".3f\") + \" us per row)\")\n")
+    mentee_program.write("\n")
+    mentee_program.write("\n")
+    mentee_program.write("# This function reads the csv file specified in the command line, and classifies each row of "
+                         "data into one of\n")
+    mentee_program.write("# two classes. The trained program can also be imported, and its rows classified with "
+                         "predict_one and\n")
+    mentee_program.write("# predict_batch.\n")
+    mentee_program.write("if __name__ == '__main__':\n")
+    mentee_program.write("    parser = argparse.ArgumentParser(description=\"Classify each row of a csv file into one "
+                         "of two classes.\")\n")
+    mentee_program.write("    parser.add_argument(\"input_file\", help=\"the csv file (or binary column cache) to "
+                         "classify, or '-' for stdin\")\n")
+    mentee_program.write("    parser.add_argument(\"output_file\", nargs=\"?\", default=\"output.csv\",\n")
+    mentee_program.write("                        help=\"the csv file the classes are written to, or '-' for stdout "
+                         "(default: output.csv)\")\n")
+    mentee_program.write("    parser.add_argument(\"--workers\", type=int, default=1,\n")
+    mentee_program.write("                        help=\"the amount of processes that classify byte ranges of a csv "
+                         "file at the same time \"\n")
+    mentee_program.write("                             \"(default: 1)\")\n")
+    mentee_program.write("    parser.add_argument(\"--benchmark\", action=\"store_true\",\n")
+    mentee_program.write("                        help=\"time predict_one and predict_batch on the rows of the csv "
+                         "file instead of writing \"\n")
+    mentee_program.write("                             \"their classes\")\n")
+    mentee_program.write("    args = parser.parse_args()\n")
+    mentee_program.write("\n")
+    mentee_program.write("    try:\n")
+    mentee_program.write("        if args.benchmark:\n")
+    mentee_program.write("            benchmark_api(args.input_file)\n")
+    mentee_program.write("        # Only a csv file on disk can be split into byte ranges, so stdin and binary column "
+                         "caches are always\n")
+    mentee_program.write("        # classified in this process. The classified data is put into another csv file.\n")
+    mentee_program.write("        elif args.workers > 1 and args.input_file != \"-\" and not "
+                         "is_column_cache(args.input_file):\n")
+    mentee_program.write("            score_in_parallel(args.input_file, args.output_file, args.workers)\n")
+    mentee_program.write("        else:\n")
+    mentee_program.write("            score_file(args.input_file, args.output_file)\n")
+    mentee_program.write("\n")
+    mentee_program.write("    # If the file is unable to be opened for whatever reason, we will inform the user.\n")
+    mentee_program.write("    except OSError:\n")
+    mentee_program.write("        print(\"Error - cannot open file '\" + args.input_file + \"'\")\n")
 
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][6][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][6][2]) + "'])\n")
 
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][6][0]) +
-                                         "] <= " + str(all_splits[3][6][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][12][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][13][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][7][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][7][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][7][0]) +
-                                         "] <= " + str(all_splits[3][7][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][14][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][15][2]) + "'])\n")
-
-    # This is if the decision tree is 9 levels deep
-    elif total_depth == 9:
-        mentee_program.write("                    if record[" + str(all_splits[0][0][0]) + "] <= " +
-                             str(all_splits[0][0][1]) + ":\n")
-
-        # If the stopping criteria has been met, we just return whatever majority class exists for this node
-        if all_splits[1][0][1] == 0:
-            mentee_program.write("                        write_data.writerow(['" + str(all_splits[1][0][2]) + "'])\n")
-
-        # Otherwise, we utilize the best attribute and the best threshold
+# This function will write an array of ints into the trained program as a NumPy array constant, 20 values a line.
+#
+# argument 1 (mentee_program) - the trained program that is being written
+# argument 2 (name) - the name of the constant
+# argument 3 (values) - the values of the array
+def write_array_constant(mentee_program, name, values):
+    value_text = [str(value) for value in values]
+    mentee_program.write(name + " = np.array([\n")
+    for line_start in range(0, len(value_text), 20):
+        mentee_program.write("    " + ", ".join(value_text[line_start:line_start + 20]) + ",\n")
+    mentee_program.write("], dtype=np.intp)\n")
+
+
+# This function will write the decision tree into a model file, so it can be loaded by predictor.py without
+# writing a new program. The model file is json holding the arrays of the decision tree, what each attribute is
+# rounded to, the names of the attributes and the name of each class.
+#
+# argument 1 (model_name) - the name of the model file
+# argument 2 (attr_names) - the names of the seven attributes
+def write_model_file(model_name, attr_names):
+    model = {"format": model_format, "feature_names": attr_names, "attr_steps": attr_steps,
+             "class_labels": {str(class_id): label for class_id, label in class_labels.items()},
+             "depth": total_depth, "feature": decision_tree.feature.tolist(),
+             "threshold": decision_tree.threshold.tolist(), "left": decision_tree.left.tolist(),
+             "right": decision_tree.right.tolist(), "value": decision_tree.value.tolist(),
+             "samples": decision_tree.samples.tolist()}
+    with open(model_name, "w") as model_file:
+        json.dump(model, model_file, separators=(",", ":"))
+
+
+# This function will write the decision tree into the trained program as a function called classify, which takes
+# a normalized record and returns its class. Each split becomes a single if statement whose first branch returns,
+# so the second branch needs no else and only first branches add a level of indentation. Subtrees that would be
+# nested deeper than max_emit_depth get a function of their own, so a tree of any depth can be compiled, and so
+# do subtrees that simplify_tree has merged, so they are written only once.
+#
+# argument 1 (mentee_program) - the trained program that is being written
+def write_tree_functions(mentee_program):
+    mentee_program.write("# This function classifies one normalized record by walking the decision tree, and returns "
+                         "its class.\n")
+    mentee_program.write("#\n")
+    mentee_program.write("# argument 1 (record) - the normalized record\n")
+    mentee_program.write("def classify(record):\n")
+    function_nodes = []  # The nodes whose subtrees still have to be written as functions of their own
+    shared_nodes = shared_subtrees()
+    write_tree_node(mentee_program, 0, "    ", 0, function_nodes, shared_nodes - {0})
+
+    for node in function_nodes:
+        mentee_program.write("\n")
+        mentee_program.write("\n")
+        mentee_program.write("def classify_node_" + str(node) + "(record):\n")
+        write_tree_node(mentee_program, node, "    ", 0, function_nodes, shared_nodes - {node})
+
+
+# This function will write a node of the decision tree (and its subtree) into the trained program. A leaf returns
+# its majority class, a split tests its attribute against its threshold, and a node with a function of its own
+# returns what that function returns. The nodes are written from a stack rather than by recursion, since the second
+# child of a split is written at the same indentation as the split itself, so a long chain of second children
+# never reaches max_emit_depth and would otherwise recurse once for every node of the chain.
+#
+# argument 1 (mentee_program) - the trained program that is being written
+# argument 2 (node) - the node of decision_tree that is written
+# argument 3 (indent) - the indentation of the node in the trained program
+# argument 4 (depth) - how many levels of indentation the node has inside its function
+# argument 5 (function_nodes) - the list of nodes that will be written as functions of their own
+# argument 6 (shared_nodes) - the set of nodes that are always written as functions of their own
+def write_tree_node(mentee_program, node, indent, depth, function_nodes, shared_nodes):
+    pending_nodes = [(node, indent, depth)]  # The nodes still to be written, with the next one at the end
+    while pending_nodes:
+        node, indent, depth = pending_nodes.pop()
+        if decision_tree.is_leaf(node):
+            mentee_program.write(indent + "return " + str(decision_tree.value[node]) + "\n")
+        elif depth >= max_emit_depth or node in shared_nodes:
+            if node not in function_nodes:
+                function_nodes.append(node)
+            mentee_program.write(indent + "return classify_node_" + str(node) + "(record)\n")
         else:
-            mentee_program.write("                        if record[" + str(all_splits[1][0][0]) + "] <= " +
-                                 str(all_splits[1][0][1]) + ":\n")
+            mentee_program.write(indent + "if record[" + str(decision_tree.feature[node]) + "] <= " +
+                                 str(decision_tree.threshold[node]) + ":\n")
 
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][0][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][0][2]) +
-                                     "'])\n")
+            # The first child is written (inside the if) before the second child, which follows the if
+            pending_nodes.append((decision_tree.right[node], indent, depth))
+            pending_nodes.append((decision_tree.left[node], indent + "    ", depth + 1))
 
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][0][0]) + "] <= " +
-                                     str(all_splits[2][0][1]) + ":\n")
 
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][0][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][0][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][0][0]) +
-                                         "] <= " + str(all_splits[3][0][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][0][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][1][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][1][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][1][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][1][0]) +
-                                         "] <= " + str(all_splits[3][1][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][2][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][3][2]) + "'])\n")
-
-            mentee_program.write("                        else:\n")
+# This function will print the size of the trained program, and how long it takes to compile and import it.
+# Importing runs the body of the module (its imports and function definitions) without classifying anything.
+#
+# argument 1 (program_name) - the name of the trained program
+def report_program_cost(program_name):
+    with open(program_name) as program_file:
+        program_source = program_file.read()
 
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][1][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][1][2]) +
-                                     "'])\n")
+    start_time = time.perf_counter()
+    program_code = compile(program_source, program_name, "exec")
+    compile_time = time.perf_counter() - start_time
 
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][1][0]) + "] <= " +
-                                     str(all_splits[2][1][1]) + ":\n")
+    start_time = time.perf_counter()
+    exec(program_code, {"__name__": program_name[:-3]})
+    import_time = time.perf_counter() - start_time
 
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][2][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][2][2]) + "'])\n")
+    print("Wrote '" + program_name + "' (" + str(len(program_source.encode("utf-8"))) + " bytes, " +
+          str(program_source.count("\n")) + " lines): compiles in " + format(compile_time * 1000, ".2f") +
+          " ms, imports in " + format(import_time * 1000, ".2f") + " ms")
 
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][2][0]) +
-                                         "] <= " + str(all_splits[3][2][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][4][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][5][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][3][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][3][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][3][0]) +
-                                         "] <= " + str(all_splits[3][3][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][6][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][7][2]) + "'])\n")
 
-        mentee_program.write("                    else:\n")
+# This function will add a complete event to the training trace, which lasts from start_time until now. The
+# events are in the Chrome trace event format, so events that happen while another one lasts (such as the
+# attributes swept for a node, or the nodes of its subtree) are shown nested inside it.
+#
+# argument 1 (name) - the name of the event
+# argument 2 (category) - what kind of work the event is ('phase', 'node', 'sweep', 'histogram', 'partition',
+#                         'scan' or 'subtrees')
+# argument 3 (start_time) - when the event started (a time.perf_counter value)
+# argument 4 (event_args) - the details of the event
+def trace_event(name, category, start_time, event_args):
+    trace_events.append({"name": name, "cat": category, "ph": "X", "ts": round(start_time * 1000000, 3),
+                         "dur": round((time.perf_counter() - start_time) * 1000000, 3), "pid": os.getpid(),
+                         "tid": 0, "args": event_args})
+
+
+# This function will run a task in a worker process, and returns its result along with the trace events the
+# worker collected while running it (or None if the training is not traced). The worker starts a new trace for
+# its next task.
+#
+# argument 1 (task) - the function to run
+# argument 2 (task_args) - the arguments of the task
+def pool_task(task, *task_args):
+    global trace_events
+    task_result = task(*task_args)
+    worker_events = trace_events
+    if trace_events is not None:
+        trace_events = []
+    return task_result, worker_events
+
+
+# This function will add the trace events a worker process returned from pool_task to the trace of this process,
+# and returns the result of the task. The events keep the pid of the worker, so each worker is shown on its own.
+#
+# argument 1 (pool_result) - the result of the task and the trace events of the worker
+def merge_trace_events(pool_result):
+    task_result, worker_events = pool_result
+    if trace_events is not None and worker_events:
+        trace_events.extend(worker_events)
+    return task_result
 
-        # If the stopping criteria has been met, we just return whatever majority class exists for this node
-        if all_splits[1][1][1] == 0:
-            mentee_program.write("                        write_data.writerow(['" + str(all_splits[1][1][2]) + "'])\n")
 
-        # Otherwise, we utilize the best attribute and the best threshold
+# This function will write the training trace into a json file that chrome://tracing, Perfetto or speedscope
+# can open, along with the total time of each phase and of each kind of work, and prints those totals.
+#
+# argument 1 (trace_name) - the name of the trace file
+def write_trace(trace_name):
+    phase_totals = {}  # The time of each phase, in milliseconds
+    work_totals = {}  # The time of each kind of work inside the nodes (without their subtrees), in milliseconds
+    thresholds = 0  # The amount of thresholds tested over every node
+    records_scanned = 0  # The amount of records looked at over every node
+    node_count = 0  # The amount of nodes best_split visited
+    for an_event in trace_events:
+        if an_event["cat"] == "phase":
+            phase_totals[an_event["name"]] = phase_totals.get(an_event["name"], 0) + an_event["dur"] / 1000
+        elif an_event["cat"] == "node":
+            node_count += 1
         else:
-            mentee_program.write("                        if record[" + str(all_splits[1][1][0]) + "] <= " +
-                                 str(all_splits[1][1][1]) + ":\n")
-
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][2][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][2][2]) +
-                                     "'])\n")
-
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][2][0]) + "] <= " +
-                                     str(all_splits[2][2][1]) + ":\n")
+            work_totals[an_event["cat"]] = work_totals.get(an_event["cat"], 0) + an_event["dur"] / 1000
+            thresholds += an_event["args"].get("thresholds", 0)
+            records_scanned += an_event["args"].get("records_scanned", 0)
 
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][4][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][4][2]) + "'])\n")
+    with open(trace_name, "w") as trace_file:
+        json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms",
+                   "otherData": {"phase_ms": phase_totals, "work_ms": work_totals, "nodes": node_count,
+                                 "thresholds": thresholds, "records_scanned": records_scanned}}, trace_file)
 
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][4][0]) +
-                                         "] <= " + str(all_splits[3][4][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][8][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][9][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][5][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][5][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][5][0]) +
-                                         "] <= " + str(all_splits[3][5][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][10][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][11][2]) + "'])\n")
+    print("Wrote the trace of " + str(node_count) + " nodes to '" + trace_name + "' (" + str(thresholds) +
+          " thresholds tested, " + str(records_scanned) + " records scanned)")
+    for name, total_ms in list(phase_totals.items()) + list(work_totals.items()):
+        print("    " + name.ljust(14) + format(total_ms, "10.2f") + " ms")
 
-            mentee_program.write("                        else:\n")
 
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][3][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][3][2]) +
-                                     "'])\n")
+# This function will reset the global list of splits (and the depth of the decision tree) so that a new
+# decision tree can be built by best_split.
+def reset_tree():
+    global decision_tree, total_depth
+    total_depth = 0
 
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][3][0]) + "] <= " +
-                                     str(all_splits[2][3][1]) + ":\n")
+    # Initialize the global decision tree to a tree without any nodes
+    decision_tree = DecisionTree()
 
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][6][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][6][2]) + "'])\n")
 
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][6][0]) +
-                                         "] <= " + str(all_splits[3][6][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][12][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][13][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][7][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][7][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][7][0]) +
-                                         "] <= " + str(all_splits[3][7][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][14][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][15][2]) + "'])\n")
-
-    # This is if the decision tree is 10 levels deep
-    elif total_depth == 10:
-        mentee_program.write("                    if record[" + str(all_splits[0][0][0]) + "] <= " +
-                             str(all_splits[0][0][1]) + ":\n")
-
-        # If the stopping criteria has been met, we just return whatever majority class exists for this node
-        if all_splits[1][0][1] == 0:
-            mentee_program.write("                        write_data.writerow(['" + str(all_splits[1][0][2]) + "'])\n")
-
-        # Otherwise, we utilize the best attribute and the best threshold
-        else:
-            mentee_program.write("                        if record[" + str(all_splits[1][0][0]) + "] <= " +
-                                 str(all_splits[1][0][1]) + ":\n")
+# This function will normalize the attributes of one row of a csv file. The ages are rounded to the nearest 2
+# years, the heights to the nearest 4 centimeters, and the tail lengths, hair lengths, bang lengths and reaches
+# to the nearest 2 units. The ear lobes are converted into ints.
+#
+# argument 1 (record) - the row of the csv file, as a list of strings
+def normalize_attributes(record):
+    this_record = [round(float(record[attr_index].strip()) / attr_steps[attr_index]) * attr_steps[attr_index]
+                   for attr_index in range(6)]
+    this_record.append(int(record[6].strip()))
+    return this_record
 
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][0][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][0][2]) +
-                                     "'])\n")
 
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][0][0]) + "] <= " +
-                                     str(all_splits[2][0][1]) + ":\n")
+# This function will normalize one row of a training csv file, which is its attributes followed by its class id.
+#
+# argument 1 (record) - the row of the csv file, as a list of strings
+def normalize_row(record):
+    this_record = normalize_attributes(record)
+    this_record.append(int(record[8].strip()))  # We convert each class id into an int
+    return this_record
 
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][0][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][0][2]) + "'])\n")
 
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][0][0]) +
-                                         "] <= " + str(all_splits[3][0][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][0][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][1][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][1][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][1][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][1][0]) +
-                                         "] <= " + str(all_splits[3][1][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][2][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][3][2]) + "'])\n")
+# This function will determine whether a file is a binary column cache instead of a csv file.
+#
+# argument 1 (file_name) - the name of the file
+def is_column_cache(file_name):
+    with open(file_name, "rb") as test_file:
+        return test_file.read(len(cache_magic)) == cache_magic
 
-            mentee_program.write("                        else:\n")
 
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][1][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][1][2]) +
-                                     "'])\n")
+# This function will convert a csv file (for training or for classifying) into a binary column cache, so that it
+# never has to be parsed again. The cache starts with the magic bytes, the length of its header and the header
+# itself (json describing the amount of rows, the type and byte order of the values and every column with its
+# rounding step and its smallest and largest value). The normalized values of each column follow, one column
+# after the other, as 2 byte integers.
+#
+# argument 1 (csv_name) - the name of the csv file
+# argument 2 (cache_name) - the name of the binary column cache to write
+def write_column_cache(csv_name, cache_name):
+    with open(csv_name) as csv_file:
+        read_data = csv.reader(csv_file)
+        header = [name.strip() for name in next(read_data)]
+
+        # Training files have a class id that is kept as the last column, but files to classify do not
+        class_position = header.index("ClassID") if "ClassID" in header else None
+        column_names = header[:7] + (["ClassID"] if class_position is not None else [])
+        columns = [array('h') for _ in column_names]
+        for record in read_data:
+            this_record = normalize_attributes(record)
+            if class_position is not None:
+                this_record.append(int(record[class_position].strip()))
+            for column, value in zip(columns, this_record):
+                column.append(value)
+
+    cache_header = {"rows": len(columns[0]), "typecode": "h", "byteorder": sys.byteorder, "data_offset": 0,
+                    "columns": [{"name": column_names[column_index],
+                                 "step": attr_steps[column_index] if column_index < 7 else 1,
+                                 "low": min(columns[column_index], default=0),
+                                 "high": max(columns[column_index], default=0)}
+                                for column_index in range(len(column_names))]}
+
+    # The columns start after the header, on a multiple of 8 bytes
+    header_bytes = b""
+    while cache_header["data_offset"] < 16 + len(header_bytes):
+        cache_header["data_offset"] = (16 + len(json.dumps(cache_header).encode("utf-8")) + 7) // 8 * 8
+        header_bytes = json.dumps(cache_header).encode("utf-8")
+
+    with open(cache_name, "wb") as cache_file:
+        cache_file.write(cache_magic)
+        cache_file.write(struct.pack("<I", len(header_bytes)) + bytes(4))
+        cache_file.write(header_bytes.ljust(cache_header["data_offset"] - 16))
+        for column in columns:
+            column.tofile(cache_file)
+
+    return cache_header["rows"]
+
+
+# This function will memory-map a binary column cache written by write_column_cache, and returns its header and
+# a view of each of its columns. Nothing is parsed or copied, the views read the values straight from the file.
+#
+# argument 1 (cache_name) - the name of the binary column cache
+def open_column_cache(cache_name):
+    with open(cache_name, "rb") as cache_file:
+        cache_map = mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ)
+    header_length = struct.unpack_from("<I", cache_map, 8)[0]
+    cache_header = json.loads(bytes(cache_map[16:16 + header_length]).decode("utf-8"))
+    column_size = cache_header["rows"] * array(cache_header["typecode"]).itemsize
+
+    columns = []
+    for column_index in range(len(cache_header["columns"])):
+        column_start = cache_header["data_offset"] + column_index * column_size
+        column = memoryview(cache_map)[column_start:column_start + column_size].cast(cache_header["typecode"])
+
+        # The columns can only be used in place if they are in the byte order of this machine
+        if cache_header["byteorder"] != sys.byteorder:
+            column = array(cache_header["typecode"], column)
+            column.byteswap()
+        columns.append(column)
+
+    return cache_header, columns
+
+
+# This function will read the names of the seven attributes from the header of a csv file (or binary column
+# cache).
+#
+# argument 1 (file_name) - the name of the csv file or binary column cache
+def read_attribute_names(file_name):
+    if is_column_cache(file_name):
+        cache_header, _ = open_column_cache(file_name)
+        return [a_column["name"] for a_column in cache_header["columns"][:7]]
 
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][1][0]) + "] <= " +
-                                     str(all_splits[2][1][1]) + ":\n")
+    with open(file_name) as csv_file:
+        return [name.strip() for name in next(csv.reader(csv_file))[:7]]
 
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][2][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][2][2]) + "'])\n")
 
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][2][0]) +
-                                         "] <= " + str(all_splits[3][2][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][4][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][5][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][3][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][3][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][3][0]) +
-                                         "] <= " + str(all_splits[3][3][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][6][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][7][2]) + "'])\n")
+# This function will read the rows of a training csv file (or binary column cache) one at a time, and yields
+# each of them normalized.
+#
+# argument 1 (file_name) - the name of the training csv file or binary column cache
+def stream_training_file(file_name):
+    if is_column_cache(file_name):
+        _, columns = open_column_cache(file_name)
+        yield from zip(*columns)
+        return
 
-        mentee_program.write("                    else:\n")
+    with open(file_name) as csv_file:
+        read_data = csv.reader(csv_file)
+        read_data.__next__()  # We ignore the headers
+        for record in read_data:
+            yield normalize_row(record)
 
-        # If the stopping criteria has been met, we just return whatever majority class exists for this node
-        if all_splits[1][1][1] == 0:
-            mentee_program.write("                        write_data.writerow(['" + str(all_splits[1][1][2]) + "'])\n")
 
-        # Otherwise, we utilize the best attribute and the best threshold
-        else:
-            mentee_program.write("                        if record[" + str(all_splits[1][1][0]) + "] <= " +
-                                 str(all_splits[1][1][1]) + ":\n")
+# This function will read in a training csv file and normalize every record in it, and returns the normalized
+# records as columns (one column for each value of a record, with the class ids last). If NumPy is installed,
+# the csv file is parsed and normalized in large chunks a whole column at a time, otherwise it is done one row
+# at a time. A binary column cache is memory-mapped instead, so its columns are used without any parsing. It
+# also fills the global attribute lists (and their smallest and largest values) that best_split uses.
+#
+# argument 1 (file_name) - the name of the training csv file or binary column cache
+def load_training_file(file_name):
+    global attr_bounds
+
+    if is_column_cache(file_name):
+        cache_header, columns = open_column_cache(file_name)
+        if len(columns) != 8:
+            raise ValueError("the column cache '" + file_name + "' has no class ids to train on")
+        attr_bounds = [(a_column["low"], a_column["high"]) for a_column in cache_header["columns"][:6]]
+    elif columnar is not None:
+        columns = columnar.read_csv_columns(file_name, attr_steps)
+        attr_bounds = [(min(column, default=0), max(column, default=0)) for column in columns[:6]]
+    else:
+        records = list(stream_training_file(file_name))  # A list of all the records in the training data set
+        columns = [array('i', [a_record[value_index] for a_record in records]) for value_index in range(8)]
 
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][2][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][2][2]) +
-                                     "'])\n")
+        # Find the smallest and largest value of each attribute once, rather than at every node
+        attr_bounds = [(min(column, default=0), max(column, default=0)) for column in columns[:6]]
 
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][2][0]) + "] <= " +
-                                     str(all_splits[2][2][1]) + ":\n")
+    return columns
 
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][4][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][4][2]) + "'])\n")
 
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][4][0]) +
-                                         "] <= " + str(all_splits[3][4][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][8][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][9][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][5][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][5][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][5][0]) +
-                                         "] <= " + str(all_splits[3][5][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][10][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][11][2]) + "'])\n")
+# This function will convert a column of the record store into an array of 4 byte integers, unless it already
+# is one. Views of a binary column cache hold 2 byte integers and cannot be sent to other processes.
+#
+# argument 1 (column) - the column of the record store
+def int_column(column):
+    if isinstance(column, array) and column.typecode == 'i':
+        return column
+    return array('i', column)
 
-            mentee_program.write("                        else:\n")
 
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][3][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][3][2]) +
-                                     "'])\n")
+# This function will build a new decision tree from the normalized records. The columns of the records become
+# the shared record store, and best_split then works on slices of a single index array.
+#
+# argument 1 (columns) - the columns of the normalized records returned by load_training_file
+# argument 2 (jobs) - the amount of processes that score the attributes of large nodes
+# argument 3 (subtree_workers) - the amount of processes that build large subtrees
+def train_tree(columns, jobs=1, subtree_workers=1):
+    global record_columns, record_index, attribute_pool
+    reset_tree()
+    record_count = len(columns[0])
+    record_columns = list(columns)
+    record_index = array('i', range(record_count))
+    build_nlogn_table(record_count)
+
+    if jobs <= 1:
+        train_subtrees(record_count, subtree_workers)
+        return
 
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][3][0]) + "] <= " +
-                                     str(all_splits[2][3][1]) + ":\n")
+    # The pool is started after the record store is built, so each worker gets its own copy of the store once
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                             initargs=([int_column(column) for column in record_columns], attr_bounds,
+                                       split_mode, trace_events is not None)) as attribute_pool:
+        try:
+            train_subtrees(record_count, subtree_workers)
+        finally:
+            attribute_pool = None
 
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][6][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][6][2]) + "'])\n")
 
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][6][0]) +
-                                         "] <= " + str(all_splits[3][6][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][12][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][13][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][7][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][7][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][7][0]) +
-                                         "] <= " + str(all_splits[3][7][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][14][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][15][2]) + "'])\n")
-
-    # This is if the decision tree is 11 levels deep
-    elif total_depth == 11:
-        mentee_program.write("                    if record[" + str(all_splits[0][0][0]) + "] <= " +
-                             str(all_splits[0][0][1]) + ":\n")
-
-        # If the stopping criteria has been met, we just return whatever majority class exists for this node
-        if all_splits[1][0][1] == 0:
-            mentee_program.write("                        write_data.writerow(['" + str(all_splits[1][0][2]) + "'])\n")
-
-        # Otherwise, we utilize the best attribute and the best threshold
-        else:
-            mentee_program.write("                        if record[" + str(all_splits[1][0][0]) + "] <= " +
-                                 str(all_splits[1][0][1]) + ":\n")
+# This function will build the decision tree from the record store, handing large subtrees to a pool of worker
+# processes if there is more than 1 subtree worker. The record store is moved into a shared memory block first,
+# so the workers read the records from it instead of having them pickled. The top levels of the tree are built
+# in this process until there are about twice as many subtrees as workers, and those subtrees are handed out.
+#
+# argument 1 (record_count) - the amount of records in the record store
+# argument 2 (subtree_workers) - the amount of processes that build large subtrees
+def train_subtrees(record_count, subtree_workers):
+    global record_columns, record_index, subtree_pool, subtree_depth
 
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][0][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][0][2]) +
-                                     "'])\n")
+    if subtree_workers <= 1 or record_count == 0:
+        best_split(0, record_count, 0, decision_tree.add_node())
+        return
 
+    local_columns = record_columns
+    shared_columns, shared_index = open_shared_store(record_count)
+    try:
+        record_columns, record_index = shared_columns, shared_index
+
+        subtree_depth = math.ceil(math.log2(subtree_workers)) + 1
+        with ProcessPoolExecutor(max_workers=subtree_workers, initializer=init_subtree_worker,
+                                 initargs=(shared_store.name, record_count, attr_bounds, split_mode,
+                                           (stop_depth, stop_records, stop_purity),
+                                           trace_events is not None)) as subtree_pool:
+            try:
+                best_split(0, record_count, 0, decision_tree.add_node())
+                wait_for_subtrees()
+            finally:
+                subtree_pool = None
+                subtree_futures.clear()
+    finally:
+        record_columns, record_index = local_columns, array('i', shared_index)
+        close_shared_store(shared_columns, shared_index)
+
+
+# This function will create a shared memory block for the record store, and copies the record columns and
+# record_index into it. It returns the views of the columns and of record_index over the block.
+#
+# argument 1 (record_count) - the amount of records in the record store
+def open_shared_store(record_count):
+    global shared_store
+    shared_store = shared_memory.SharedMemory(create=True, size=record_count * 4 * 9)
+    shared_columns, shared_index = share_store_views(record_count)
+    try:
+        for value_index in range(8):
+            shared_columns[value_index][:] = int_column(record_columns[value_index])
+        shared_index[:] = record_index
+    except BaseException:
+        close_shared_store(shared_columns, shared_index)
+        raise
+    return shared_columns, shared_index
+
+
+# This function will release the views over the shared memory block of the record store, and closes and removes
+# the block.
+#
+# argument 1 (shared_columns) - the views of the record columns over the block
+# argument 2 (shared_index) - the view of record_index over the block
+def close_shared_store(shared_columns, shared_index):
+    global shared_store
+    # The views must be released before the shared memory block can be closed
+    for a_view in shared_columns + [shared_index]:
+        a_view.release()
+    shared_store.close()
+    shared_store.unlink()
+    shared_store = None
+
+
+# This function will train a bagged ensemble of decision trees. Each tree is built by best_split on its own
+# bootstrap sample (as many records as the training data set, drawn with replacement), which is just a
+# record_index holding some records more than once and others not at all, so the records themselves are never
+# copied. With more than 1 ensemble worker the trees are built by a pool of worker processes that all read the
+# record columns from one shared memory block.
+#
+# argument 1 (columns) - the columns of the normalized records returned by load_training_file
+# argument 2 (tree_count) - the amount of trees in the ensemble
+# argument 3 (ensemble_workers) - the amount of processes that build trees at the same time
+# argument 4 (seed) - the seed of the bootstrap samples, so the same ensemble can be trained again
+def train_ensemble(columns, tree_count, ensemble_workers, seed):
+    global record_columns, record_index, decision_tree, total_depth
+    record_count = len(columns[0])
+    record_columns = list(columns)
+    record_index = array('i', range(record_count))
+    build_nlogn_table(record_count)
+    ensemble_trees.clear()
+
+    if ensemble_workers <= 1 or record_count == 0:
+        ensemble_trees.extend(ensemble_task(tree_number, seed) for tree_number in range(tree_count))
+    else:
+        local_columns = record_columns
+        shared_columns, shared_index = open_shared_store(record_count)
+        try:
+            with ProcessPoolExecutor(max_workers=ensemble_workers, initializer=init_subtree_worker,
+                                     initargs=(shared_store.name, record_count, attr_bounds, split_mode,
+                                               (stop_depth, stop_records, stop_purity),
+                                               trace_events is not None)) as tree_pool:
+                tree_futures = [tree_pool.submit(pool_task, ensemble_task, tree_number, seed)
+                                for tree_number in range(tree_count)]
+                ensemble_trees.extend(merge_trace_events(future.result()) for future in tree_futures)
+        finally:
+            record_columns = local_columns
+            close_shared_store(shared_columns, shared_index)
+
+    # The last tree is left as the decision tree, and the ensemble has as many levels as its deepest tree
+    decision_tree = ensemble_trees[-1][0]
+    total_depth = max(tree_depth for _, tree_depth in ensemble_trees)
+
+
+# This function will build one tree of a bagged ensemble on its bootstrap sample, and returns the tree along with
+# its total amount of levels. The bootstrap sample only depends on the seed and the number of the tree, so it is
+# the same whichever process builds the tree.
+#
+# argument 1 (tree_number) - the number of the tree in the ensemble
+# argument 2 (seed) - the seed of the bootstrap samples
+def ensemble_task(tree_number, seed):
+    global record_index
+    record_count = len(record_columns[0])
+    store_index = record_index  # In a worker of the pool, this is the view over the shared memory block
+    bootstrap = random.Random(str(seed) + ":" + str(tree_number))
+    record_index = array('i', bootstrap.choices(range(record_count), k=record_count))
+    try:
+        reset_tree()
+        best_split(0, record_count, 0, decision_tree.add_node())
+    finally:
+        record_index = store_index
+    return decision_tree, total_depth
+
+
+# This function will try every combination of a grid of stopping rules (the deepest depth, the fewest records and
+# the purity at which nodes stop splitting) with k-fold cross-validation, and returns the combination with the
+# best accuracy. A node is split on the same attribute and threshold whatever the stopping rules are, so the tree
+# of any combination is the tree of the loosest combination with its branches cut off where that combination
+# stops. Each fold therefore only trains the loosest tree once, and every combination is scored by walking that
+# tree with its own stopping rules. The folds are trained by a pool of worker processes that all read the record
+# columns from one shared memory block, if there is more than 1 sweep worker.
+#
+# argument 1 (columns) - the columns of the normalized records returned by load_training_file
+# argument 2 (stop_grid) - the depths, amounts of records and purities to try
+# argument 3 (fold_count) - the amount of folds of the cross-validation
+# argument 4 (sweep_workers) - the amount of processes that train folds at the same time
+# argument 5 (seed) - the seed that shuffles the records into folds
+def sweep_stop_rules(columns, stop_grid, fold_count, sweep_workers, seed):
+    global record_columns, record_index
+    record_count = len(columns[0])
+    record_columns = list(columns)
+    record_index = array('i', range(record_count))
+    build_nlogn_table(record_count)
+    stop_settings = list(itertools.product(*stop_grid))
+
+    if sweep_workers <= 1:
+        fold_results = [fold_task(fold_number, fold_count, seed, stop_settings) for fold_number in range(fold_count)]
+    else:
+        local_columns = record_columns
+        shared_columns, shared_index = open_shared_store(record_count)
+        try:
+            with ProcessPoolExecutor(max_workers=sweep_workers, initializer=init_subtree_worker,
+                                     initargs=(shared_store.name, record_count, attr_bounds, split_mode,
+                                               (stop_depth, stop_records, stop_purity),
+                                               trace_events is not None)) as fold_pool:
+                fold_futures = [fold_pool.submit(pool_task, fold_task, fold_number, fold_count, seed, stop_settings)
+                                for fold_number in range(fold_count)]
+                fold_results = [merge_trace_events(future.result()) for future in fold_futures]
+        finally:
+            record_columns = local_columns
+            close_shared_store(shared_columns, shared_index)
+
+    # The accuracy of a combination is over the held-out records of every fold together
+    sweep_results = []
+    for setting_number, stop_rules in enumerate(stop_settings):
+        correct = sum(fold_correct[setting_number] for fold_correct, _ in fold_results)
+        sweep_results.append((correct / max(record_count, 1), stop_rules))
+
+    # Ties go to the shallowest tree with the most records and the lowest purity, which is the smallest tree
+    sweep_results.sort(key=lambda a_result: (-a_result[0], a_result[1][0], -a_result[1][1], a_result[1][2]))
+    largest_fold = max(fold_nodes for _, fold_nodes in fold_results)
+    print("Trained " + str(fold_count) + " folds (of up to " + str(largest_fold) + " nodes) to score " +
+          str(len(stop_settings)) + " combinations of stopping rules")
+    for accuracy, (max_depth, min_records, purity) in sweep_results:
+        print("    max depth " + str(max_depth).rjust(3) + ", min records " + str(min_records).rjust(6) + ", purity " +
+              format(purity, ".3f") + ": " + format(accuracy * 100, "6.2f") + "% accurate")
+    return sweep_results[0][1]
+
+
+# This function will split the records into folds for cross-validation. The records are shuffled with the seed,
+# so every process that splits them gets the same folds.
+#
+# argument 1 (record_count) - the amount of records in the record store
+# argument 2 (fold_count) - the amount of folds
+# argument 3 (seed) - the seed that shuffles the records
+def fold_indexes(record_count, fold_count, seed):
+    shuffled_indexes = list(range(record_count))
+    random.Random(seed).shuffle(shuffled_indexes)
+    return [array('i', shuffled_indexes[fold_number::fold_count]) for fold_number in range(fold_count)]
+
+
+# This function will train the loosest tree of a sweep on every fold but one, and counts how many of the records
+# of the held-out fold each combination of stopping rules classifies correctly. It returns those counts along
+# with the amount of nodes of the tree.
+#
+# argument 1 (fold_number) - the number of the held-out fold
+# argument 2 (fold_count) - the amount of folds
+# argument 3 (seed) - the seed that shuffles the records into folds
+# argument 4 (stop_settings) - the combinations of depth, amount of records and purity to score
+def fold_task(fold_number, fold_count, seed, stop_settings):
+    global record_index, stop_depth, stop_records, stop_purity
+    folds = fold_indexes(len(record_columns[0]), fold_count, seed)
+    held_out = folds.pop(fold_number)
+    training_index = array('i', itertools.chain.from_iterable(folds))
+
+    # The loosest stopping rules grow the tree that contains the trees of every other combination
+    store_index = record_index  # In a worker of the pool, this is the view over the shared memory block
+    store_rules = (stop_depth, stop_records, stop_purity)
+    stop_depth = max(max_depth for max_depth, _, _ in stop_settings)
+    stop_records = min(min_records for _, min_records, _ in stop_settings)
+    stop_purity = max(purity for _, _, purity in stop_settings)
+    record_index = training_index
+    try:
+        reset_tree()
+        best_split(0, len(training_index), 0, decision_tree.add_node())
+    finally:
+        record_index = store_index
+        stop_depth, stop_records, stop_purity = store_rules
+
+    # best_split reordered the training indexes, but every node still sees the same records when they are routed
+    training_stats = [NodeStats(assam, bhutan) for assam, bhutan in count_node_classes(training_index)]
+    held_out_counts = count_node_classes(held_out)
+    fold_correct = []
+    for stop_rules in stop_settings:
+        correct = 0
+        node_stack = [(0, 0)]
+        while node_stack:
+            node, depth = node_stack.pop()
+            if decision_tree.is_leaf(node) or stop_splitting(depth, training_stats[node], stop_rules):
+                # The node is a leaf with these stopping rules, so its held-out records get its majority class
+                if decision_tree.value[node] != 0:
+                    correct += held_out_counts[node][1 if decision_tree.value[node] == 1 else 0]
             else:
-                mentee_program.write("                            if record[" + str(all_splits[2][0][0]) + "] <= " +
-                                     str(all_splits[2][0][1]) + ":\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][0][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][0][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][0][0]) +
-                                         "] <= " + str(all_splits[3][0][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][0][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][1][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][1][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][1][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][1][0]) +
-                                         "] <= " + str(all_splits[3][1][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][2][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][3][2]) + "'])\n")
-
-            mentee_program.write("                        else:\n")
+                node_stack.append((decision_tree.left[node], depth + 1))
+                node_stack.append((decision_tree.right[node], depth + 1))
+        fold_correct.append(correct)
+    return fold_correct, len(decision_tree)
 
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][1][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][1][2]) +
-                                     "'])\n")
 
+# This function will route records down the decision tree, and counts how many Assams and Bhutans reach each of
+# its nodes.
+#
+# argument 1 (indexes) - the indexes of the records in the record store
+def count_node_classes(indexes):
+    node_counts = [[0, 0] for _ in range(len(decision_tree))]  # The Assams and Bhutans of each node
+    class_column = record_columns[7]
+    features = decision_tree.feature
+    thresholds = decision_tree.threshold
+    lefts = decision_tree.left
+    rights = decision_tree.right
+    for a_index in indexes:
+        class_slot = 1 if class_column[a_index] == 1 else 0
+        node = 0
+        while True:
+            node_counts[node][class_slot] += 1
+            if lefts[node] == -1:
+                break
+            if record_columns[features[node]][a_index] <= thresholds[node]:
+                node = lefts[node]
             else:
-                mentee_program.write("                            if record[" + str(all_splits[2][1][0]) + "] <= " +
-                                     str(all_splits[2][1][1]) + ":\n")
+                node = rights[node]
+    return node_counts
 
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][2][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][2][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][2][0]) +
-                                         "] <= " + str(all_splits[3][2][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][4][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][5][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][3][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][3][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][3][0]) +
-                                         "] <= " + str(all_splits[3][3][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][6][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][7][2]) + "'])\n")
 
-        mentee_program.write("                    else:\n")
+# This function will parse a comma-separated list of values from the command line.
+#
+# argument 1 (text) - the comma-separated values
+# argument 2 (value_type) - the type of each value (int or float)
+def parse_grid(text, value_type):
+    return [value_type(value) for value in text.split(",")]
 
-        # If the stopping criteria has been met, we just return whatever majority class exists for this node
-        if all_splits[1][1][1] == 0:
-            mentee_program.write("                        write_data.writerow(['" + str(all_splits[1][1][2]) + "'])\n")
 
-        # Otherwise, we utilize the best attribute and the best threshold
+# This function will train the decision tree with 1, 2, 4, 8 and 16 subtree workers, and prints how long each
+# run took and its speedup over a single worker.
+#
+# argument 1 (columns) - the columns of the normalized records returned by load_training_file
+def report_subtree_scaling(columns):
+    single_time = 0
+    for subtree_workers in [1, 2, 4, 8, 16]:
+        start_time = time.perf_counter()
+        train_tree(columns, 1, subtree_workers)
+        run_time = time.perf_counter() - start_time
+        if subtree_workers == 1:
+            single_time = run_time
+        print(str(subtree_workers) + " subtree workers: " + format(run_time, ".3f") + " s (speedup " +
+              format(single_time / run_time, ".2f") + "x)")
+
+
+# This function will determine the statistics of both children of a node from the histogram of the attribute
+# the node is split on.
+#
+# argument 1 (histogram) - the Assam and Bhutan counts of every bin of the attribute
+# argument 2 (low_threshold) - the smallest value of the attribute over the whole training data set
+# argument 3 (threshold) - the threshold the node is split on
+def split_stats(histogram, low_threshold, threshold):
+    stats1 = NodeStats(sum(histogram[0][:threshold - low_threshold + 1]),
+                       sum(histogram[1][:threshold - low_threshold + 1]))
+    return stats1, NodeStats(sum(histogram[0]) - stats1.assam, sum(histogram[1]) - stats1.bhutan)
+
+
+# This function will build the decision tree without ever holding the training data in memory. The tree is grown
+# one level at a time: every pass over the csv file routes each row to the node it reaches on the level being
+# built, and adds it to the histograms of that node. Then all nodes of the level are split at once from their
+# histograms. Only one child of a pair needs to be scanned when both children are split, since the histograms of
+# the other child are the parent's minus its sibling's. Children that stop splitting become leaves straight away
+# (their class counts are known from the parent), so they are never scanned. Memory is bounded by the amount of
+# nodes on a level times the amount of bins, no matter how many rows the file has, so the thresholds are scored
+# with nlogn_entropy rather than the n x log(n) table. Each pass over the file is traced, along with every node
+# of the level that is split or stays a leaf.
+#
+# argument 1 (file_name) - the name of the training csv file
+def train_streaming(file_name):
+    global attr_bounds, total_depth
+    reset_tree()
+
+    # The first pass finds the smallest and largest value of each attribute, and the class counts of the root
+    start_time = time.perf_counter()
+    low_values = None
+    high_values = None
+    root_stats = NodeStats(0, 0)
+    for a_record in stream_training_file(file_name):
+        if low_values is None:
+            low_values = a_record[:6]
+            high_values = a_record[:6]
         else:
-            mentee_program.write("                        if record[" + str(all_splits[1][1][0]) + "] <= " +
-                                 str(all_splits[1][1][1]) + ":\n")
-
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][2][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][2][2]) +
-                                     "'])\n")
-
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][2][0]) + "] <= " +
-                                     str(all_splits[2][2][1]) + ":\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][4][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][4][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][4][0]) +
-                                         "] <= " + str(all_splits[3][4][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][8][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][9][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][5][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][5][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
+            low_values = [min(low_value, value) for low_value, value in zip(low_values, a_record)]
+            high_values = [max(high_value, value) for high_value, value in zip(high_values, a_record)]
+        if a_record[7] == 1:
+            root_stats.bhutan += 1
+        else:
+            root_stats.assam += 1
+    if low_values is None:
+        low_values = [0] * 6
+        high_values = [0] * 6
+    attr_bounds = list(zip(low_values, high_values))
+    if trace_events is not None:
+        trace_event("bounds pass", "scan", start_time, {"records_scanned": root_stats.total()})
+
+    total_depth = 1
+    level_stats = {decision_tree.add_node(root_stats.total(), root_stats.major_class()): root_stats}
+    derived_nodes = []  # The nodes whose histograms are their parent's minus their sibling's, and how to get them
+    if stop_splitting(0, root_stats):
+        level_stats = {}
+        if trace_events is not None:
+            trace_event("leaf 0", "node", time.perf_counter(), {"node": 0, "depth": 0, "records": root_stats.total()})
+
+    depth = 0
+    while level_stats:
+        # We scan every node of the level that cannot get its histograms from its parent and sibling
+        derived_indexes = set(derived[0] for derived in derived_nodes)
+        level_histograms = {}
+        for node in level_stats:
+            if node not in derived_indexes:
+                level_histograms[node] = [[[0] * (high - low + 1), [0] * (high - low + 1)]
+                                          for low, high in attr_bounds]
+        if level_histograms:
+            start_time = time.perf_counter()
+            record_count = 0  # The amount of rows read on this pass
+            for a_record in stream_training_file(file_name):
+                record_count += 1
+                # Every record reaches a leaf of the levels built so far, which is either one of the nodes being
+                # split on this level or a leaf that has stopped splitting
+                node = decision_tree.find_leaf(a_record)
+                if node in level_histograms:
+                    histograms = level_histograms[node]
+                    class_slot = 1 if a_record[7] == 1 else 0
+                    for attr_index in range(len(attr_bounds)):
+                        histograms[attr_index][class_slot][a_record[attr_index] - attr_bounds[attr_index][0]] += 1
+            if trace_events is not None:
+                trace_event("level " + str(depth) + " pass", "scan", start_time,
+                            {"depth": depth, "nodes": len(level_histograms), "records_scanned": record_count})
+        for node, parent_histograms, sibling_node in derived_nodes:
+            level_histograms[node] = subtract_histograms(parent_histograms, level_histograms[sibling_node])
+
+        # We split every node of the level at once, and find out which of their children will be split as well
+        next_stats = {}
+        derived_nodes = []
+        for node in sorted(level_stats):
+            node_time = time.perf_counter()
+            histograms = level_histograms[node]
+            attribute_bests = sweep_histograms(histograms, nlogn_entropy)
+            best_split_found = pick_best_split(attribute_bests, level_stats[node])
+
+            # A node that no split would improve stays a leaf
+            if best_split_found is None:
+                if trace_events is not None:
+                    trace_event("leaf " + str(node), "node", node_time,
+                                {"node": node, "depth": depth, "records": level_stats[node].total()})
+                continue
+            best_attribute, best_threshold = best_split_found
+            child_nodes = decision_tree.split_node(node, best_attribute, best_threshold)
+
+            child_stats = split_stats(histograms[best_attribute], attr_bounds[best_attribute][0], best_threshold)
+            total_depth = max(total_depth, depth + 2)
+            splitting_children = []
+            for child_node, a_child_stats in zip(child_nodes, child_stats):
+                decision_tree.value[child_node] = a_child_stats.major_class()
+                decision_tree.samples[child_node] = a_child_stats.total()
+                if not stop_splitting(depth + 1, a_child_stats):
+                    next_stats[child_node] = a_child_stats
+                    splitting_children.append(child_node)
+                elif trace_events is not None:
+                    # A child that stops splitting is never scanned, so it is traced as a leaf right away
+                    trace_event("leaf " + str(child_node), "node", time.perf_counter(),
+                                {"node": child_node, "depth": depth + 1, "records": a_child_stats.total()})
+
+            # If both children will be split, only the smaller one is scanned on the next pass
+            if len(splitting_children) == 2:
+                if child_stats[0].total() <= child_stats[1].total():
+                    derived_nodes.append((splitting_children[1], histograms, splitting_children[0]))
                 else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][5][0]) +
-                                         "] <= " + str(all_splits[3][5][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][10][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][11][2]) + "'])\n")
+                    derived_nodes.append((splitting_children[0], histograms, splitting_children[1]))
 
-            mentee_program.write("                        else:\n")
+            if trace_events is not None:
+                trace_event("node " + str(node), "node", node_time,
+                            {"node": node, "depth": depth, "records": level_stats[node].total(),
+                             "attribute": best_attribute, "threshold": best_threshold})
 
-            # If the stopping criteria has been met, we just return whatever majority class exists for this node
-            if all_splits[2][3][1] == 0:
-                mentee_program.write("                            write_data.writerow(['" + str(all_splits[2][3][2]) +
-                                     "'])\n")
-
-            else:
-                mentee_program.write("                            if record[" + str(all_splits[2][3][0]) + "] <= " +
-                                     str(all_splits[2][3][1]) + ":\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][6][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][6][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][6][0]) +
-                                         "] <= " + str(all_splits[3][6][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][12][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][13][2]) + "'])\n")
-
-                mentee_program.write("                            else:\n")
-
-                # If the stopping criteria has been met, we just return whatever majority class exists for this node
-                if all_splits[3][7][1] == 0:
-                    mentee_program.write("                                write_data.writerow(['" +
-                                         str(all_splits[3][7][2]) + "'])\n")
-
-                # Otherwise, we utilize the best attribute and the best threshold
-                else:
-                    mentee_program.write("                                if record[" + str(all_splits[3][7][0]) +
-                                         "] <= " + str(all_splits[3][7][1]) + ":\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][14][2]) + "'])\n")
-                    mentee_program.write("                                else:\n")
-                    mentee_program.write("                                    write_data.writerow(['" +
-                                         str(all_splits[4][15][2]) + "'])\n")
-
-    mentee_program.write("\n")
-    mentee_program.write("            csv_file.close()\n")
-    mentee_program.write("            output_file.close()\n")
-    mentee_program.write("\n")
-    mentee_program.write("        # If the file is unable to be opened for whatever reason, we will inform the user.\n")
-    mentee_program.write("        except OSError:\n")
-    mentee_program.write("            print(\"Error - cannot open file \" + sys.argv[1] + \"'\")\n")
-    mentee_program.close()
+        level_stats = next_stats
+        depth += 1
 
 
 # This function will read in the csv file specified in the command line (if the file is valid),
 # and provides hints to the user if there is anything wrong with the command line arguments.
 if __name__ == '__main__':
-    # If the amount of arguments (plus the name of the program) is not 2, we will inform the user.
-    if len(sys.argv) != 2:
-        print("Error - invalid number of arguments (must specify the training csv file)")
-
-    else:
-        try:
-            # The second cmd argument is the csv file we have to open and retrieve data from
-            with open(sys.argv[1]) as csv_file:
-                read_data = csv.reader(csv_file)
-                read_data.__next__()  # We ignore the headers
-                records = []  # A list of all the records in the training data set
-                level1 = [[0, 0, 0]]
-                level2 = [[0, 0, 0]] * 2
-                level3 = [[0, 0, 0]] * 4
-                level4 = [[0, 0, 0]] * 8
-                level5 = [[0, 0, 0]] * 16
-                level6 = [[0, 0, 0]] * 32
-                level7 = [[0, 0, 0]] * 64
-                level8 = [[0, 0, 0]] * 128
-                level9 = [[0, 0, 0]] * 256
-                level10 = [[0, 0, 0]] * 512
-                level11 = [[0, 0, 0]] * 1024
-                total_depth = 0
-
-                # Initialize the global list of splits to an empty array
-                all_splits = [level1, level2, level3, level4, level5, level6, level7, level8, level9, level10, level11]
-                attr_array = [[]] * 6  # Initialize all arrays to an empty array
-
-                # Add each value of a record to a local list
-                for record in read_data:
-                    # We normalize each age by rounding them to the nearest 2 years
-                    the_float = float(record[0].strip())
-                    norm_age = round(the_float / 2) * 2
-
-                    # Add the normalized value to the appropriate index of the list
-                    if not attr_array[0]:
-                        attr_array[0] = [norm_age]
-                    else:
-                        attr_array[0].append(norm_age)
-
-                    # We normalize each height by rounding them to the nearest 4 centimeters
-                    the_float = float(record[1].strip())
-                    norm_height = round(the_float / 4) * 4
-
-                    # Add the normalized value to the appropriate index of the list
-                    if not attr_array[1]:
-                        attr_array[1] = [norm_height]
-                    else:
-                        attr_array[1].append(norm_height)
-
-                    # We normalize each tail length by rounding them to the nearest 2 units
-                    the_float = float(record[2].strip())
-                    norm_tail = round(the_float / 2) * 2
-
-                    # Add the normalized value to the appropriate index of the list
-                    if not attr_array[1]:
-                        attr_array[2] = [norm_tail]
-                    else:
-                        attr_array[2].append(norm_tail)
-
-                    # We normalize each hair length by rounding them to the nearest 2 units
-                    the_float = float(record[3].strip())
-                    norm_hair = round(the_float / 2) * 2
-
-                    # Add the normalized value to the appropriate index of the list
-                    if not attr_array[1]:
-                        attr_array[3] = [norm_hair]
-                    else:
-                        attr_array[3].append(norm_hair)
-
-                    # We normalize each bang length by rounding them to the nearest 2 units
-                    the_float = float(record[4].strip())
-                    norm_bang = round(the_float / 2) * 2
-
-                    # Add the normalized value to the appropriate index of the list
-                    if not attr_array[1]:
-                        attr_array[4] = [norm_bang]
-                    else:
-                        attr_array[4].append(norm_bang)
-
-                    # We normalize each reach by rounding them to the nearest 2 units
-                    the_float = float(record[5].strip())
-                    norm_reach = round(the_float / 2) * 2
-
-                    # Add the normalized value to the appropriate index of the list
-                    if not attr_array[1]:
-                        attr_array[5] = [norm_reach]
-                    else:
-                        attr_array[5].append(norm_reach)
-
-                    # We convert each lobe value into an int
-                    lobe = int(record[6].strip())
-
-                    # We convert each class id into an int
-                    class_id = int(record[8].strip())
-
-                    this_record = [norm_age, norm_height, norm_tail, norm_hair, norm_bang, norm_reach, lobe, class_id]
-                    records.append(this_record)  # We add the normalized record to the record list
-
-                # Runs the recursive function to find best ways to split
-                best_split(records, 0, 0)
-
-                # Prints out all levels of the decision tree so we know where we are splitting and where we aren't
-                print(all_splits[0])
-                print(all_splits[1])
-                print(all_splits[2])
-                print(all_splits[3])
-                print(all_splits[4])
-                print(all_splits[5])
-                print(all_splits[6])
-                print(all_splits[7])
-                print(all_splits[8])
-                print(all_splits[9])
-                print(all_splits[10])
-
-                # Write a new trained program utilizing the results from best_split
-                write_trained_program()
-
-        # If the file is unable to be opened for whatever reason, we will inform the user.
-        except OSError:
-            print("Error - cannot open file '" + sys.argv[1] + "'")
+    parser = argparse.ArgumentParser(description="Train a decision tree on a csv file and write the trained program "
+                                                 "'HW05_Classifier_Hu.py'.")
+    parser.add_argument("training_file", help="the training csv file (or a binary column cache of it)")
+    parser.add_argument("--split-mode", choices=["sorted", "histogram"], default="sorted",
+                        help="find thresholds by sorting the records of each node, or from per-node histograms of "
+                             "the quantized attributes (default: sorted)")
+    parser.add_argument("--backend", choices=["lists", "numpy"], default="lists",
+                        help="build the tree from lists of records, or from NumPy column arrays (default: lists)")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="the amount of processes that score the attributes of large nodes at the same time "
+                             "(default: 1)")
+    parser.add_argument("--subtree-workers", type=int, default=1,
+                        help="the amount of processes that build large subtrees at the same time, reading the "
+                             "records from shared memory (default: 1)")
+    parser.add_argument("--subtree-scaling", action="store_true",
+                        help="report the training time with 1, 2, 4, 8 and 16 subtree workers")
+    parser.add_argument("--streaming", action="store_true",
+                        help="grow the tree one level at a time with a pass over the csv file for each level, "
+                             "instead of loading the training data into memory")
+    parser.add_argument("--max-depth", type=int, default=10,
+                        help="the deepest a node can be, where the root is at depth 0 (default: 10)")
+    parser.add_argument("--min-records", type=int, default=9,
+                        help="nodes with fewer records than this are not split (default: 9)")
+    parser.add_argument("--purity", type=float, default=0.95,
+                        help="nodes whose majority class is more than this fraction of their records are not split "
+                             "(default: 0.95)")
+    parser.add_argument("--sweep", action="store_true",
+                        help="pick the max depth, min records and purity from the sweep grids below with k-fold "
+                             "cross-validation before training")
+    parser.add_argument("--sweep-depths", default="4,6,8,10,12",
+                        help="the max depths the sweep tries (default: 4,6,8,10,12)")
+    parser.add_argument("--sweep-min-records", default="2,9,25,100",
+                        help="the min records the sweep tries (default: 2,9,25,100)")
+    parser.add_argument("--sweep-purities", default="0.9,0.95,0.99,1.0",
+                        help="the purities the sweep tries (default: 0.9,0.95,0.99,1.0)")
+    parser.add_argument("--folds", type=int, default=5, help="the amount of folds of the sweep (default: 5)")
+    parser.add_argument("--sweep-workers", type=int, default=1,
+                        help="the amount of processes that train the folds of the sweep at the same time, reading "
+                             "the records from shared memory (default: 1)")
+    parser.add_argument("--ensemble", type=int, default=1, metavar="TREES",
+                        help="train a bagged ensemble of this many trees, each on its own bootstrap sample, and "
+                             "write a trained program that lets them vote with NumPy (default: 1, a single tree)")
+    parser.add_argument("--ensemble-workers", type=int, default=1,
+                        help="the amount of processes that build the trees of the ensemble at the same time, "
+                             "reading the records from shared memory (default: 1)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="the seed of the bootstrap samples of the ensemble and of the folds of the sweep "
+                             "(default: 0)")
+    parser.add_argument("--classifier", choices=["rows", "numpy"], default="rows",
+                        help="write a trained program that classifies one record at a time, or whole chunks of "
+                             "records at once with NumPy (default: rows)")
+    parser.add_argument("--no-simplify", action="store_true",
+                        help="keep the decision tree as it was trained, instead of collapsing splits that make no "
+                             "difference and merging identical subtrees")
+    parser.add_argument("--model-file", default="HW05_Model_Hu.json",
+                        help="the model file that predictor.py can load, written along with the trained program "
+                             "(default: HW05_Model_Hu.json)")
+    parser.add_argument("--trace", metavar="TRACE_FILE",
+                        help="record how long each phase, node and attribute of training took, and write it as a "
+                             "Chrome trace json file")
+    parser.add_argument("--convert", metavar="CACHE_FILE",
+                        help="convert the csv file into a binary column cache that training and the trained program "
+                             "can memory-map instead of parsing, and exit")
+    args = parser.parse_args()
+    if args.ensemble > 1 and (args.streaming or args.backend == "numpy"):
+        parser.error("an ensemble is always built by best_split, so --ensemble cannot be combined with --streaming "
+                     "or --backend numpy")
+    if args.sweep and args.streaming:
+        parser.error("the sweep needs the training data in memory, so --sweep cannot be combined with --streaming")
+
+    # A count of processes or trees below 1 means nothing, and a single fold leaves no records to train the sweep on
+    for flag_name, flag_value, lowest_value in [("--jobs", args.jobs, 1),
+                                                ("--subtree-workers", args.subtree_workers, 1),
+                                                ("--ensemble", args.ensemble, 1),
+                                                ("--ensemble-workers", args.ensemble_workers, 1),
+                                                ("--sweep-workers", args.sweep_workers, 1), ("--folds", args.folds, 2)]:
+        if flag_value < lowest_value:
+            print("Error - " + flag_name + " must be at least " + str(lowest_value) + ", not " + str(flag_value))
+            sys.exit(1)
+    split_mode = args.split_mode
+    stop_depth = args.max_depth
+    stop_records = args.min_records
+    stop_purity = args.purity
+    if args.trace:
+        trace_events = []
+
+    try:
+        if args.convert:
+            row_count = write_column_cache(args.training_file, args.convert)
+            print("Wrote " + str(row_count) + " rows to '" + args.convert + "'")
+            sys.exit()
+
+        # Runs the recursive function to find best ways to split, either on the lists of records or on NumPy
+        # columns of them. In streaming mode, the training data is never loaded into memory at all.
+        if args.streaming:
+            start_time = time.perf_counter()
+            train_streaming(args.training_file)
+            if trace_events is not None:
+                trace_event("train", "phase", start_time, {"mode": "streaming"})
+        else:
+            # The training file argument is the csv file we have to open and retrieve data from
+            start_time = time.perf_counter()
+            columns = load_training_file(args.training_file)
+            load_time = time.perf_counter() - start_time
+            if trace_events is not None:
+                trace_event("load", "phase", start_time, {"records": len(columns[0])})
+            print("Loaded " + str(len(columns[0])) + " rows in " + format(load_time, ".3f") + " s (" +
+                  format(len(columns[0]) / max(load_time, 1e-9), ",.0f") + " rows per second)")
+            if args.sweep:
+                start_time = time.perf_counter()
+                stop_depth, stop_records, stop_purity = sweep_stop_rules(
+                    columns, (parse_grid(args.sweep_depths, int), parse_grid(args.sweep_min_records, int),
+                              parse_grid(args.sweep_purities, float)), args.folds, args.sweep_workers, args.seed)
+                print("Swept the stopping rules in " + format(time.perf_counter() - start_time, ".3f") +
+                      " s, and training with max depth " + str(stop_depth) + ", min records " + str(stop_records) +
+                      " and purity " + str(stop_purity))
+                if trace_events is not None:
+                    trace_event("sweep", "phase", start_time, {"folds": args.folds})
+            if args.ensemble > 1:
+                start_time = time.perf_counter()
+                train_ensemble(columns, args.ensemble, args.ensemble_workers, args.seed)
+                train_time = time.perf_counter() - start_time
+                print("Trained " + str(args.ensemble) + " trees in " + format(train_time, ".3f") + " s (" +
+                      format(train_time / args.ensemble, ".3f") + " s per tree)")
+            elif args.backend == "numpy":
+                start_time = time.perf_counter()
+                reset_tree()
+                total_depth = columnar.train_columns(columnar.load_columns(columns), attr_bounds, decision_tree,
+                                                     (stop_depth, stop_records, stop_purity))
+            else:
+                if args.subtree_scaling:
+                    kept_events = trace_events
+                    trace_events = None  # Only the training run that is kept is traced
+                    report_subtree_scaling(columns)
+                    trace_events = kept_events
+                start_time = time.perf_counter()
+                train_tree(columns, args.jobs, args.subtree_workers)
+            if trace_events is not None:
+                trace_event("train", "phase", start_time, {"mode": args.backend + " " + split_mode})
+
+        if not args.no_simplify:
+            start_time = time.perf_counter()
+            if ensemble_trees:
+                simplify_ensemble()
+            else:
+                simplify_tree()
+            if trace_events is not None:
+                trace_event("simplify", "phase", start_time, {"nodes": len(decision_tree)})
+
+        # Prints out all levels of the decision tree so we know where we are splitting and where we aren't. An
+        # ensemble has too many trees for that, so only the size of each tree is printed.
+        if ensemble_trees:
+            for tree_number, (a_tree, tree_depth) in enumerate(ensemble_trees):
+                print("Tree " + str(tree_number) + ": " + str(len(a_tree)) + " nodes, " + str(tree_depth) + " levels")
+        else:
+            for a_level in tree_levels():
+                print(a_level)
+
+        # Write a new trained program utilizing the results from best_split. The trees of an ensemble only vote
+        # in the NumPy program.
+        classifier = "numpy" if ensemble_trees else args.classifier
+        start_time = time.perf_counter()
+        write_trained_program(classifier)
+        if trace_events is not None:
+            trace_event("write program", "phase", start_time, {"classifier": classifier})
+
+        # A model file holds a single tree, so none is written for an ensemble
+        if not ensemble_trees:
+            start_time = time.perf_counter()
+            write_model_file(args.model_file, read_attribute_names(args.training_file))
+            if trace_events is not None:
+                trace_event("write model", "phase", start_time, {})
+        if trace_events is not None:
+            write_trace(args.trace)
+
+    # If the file is unable to be opened (or holds nothing to train on) for whatever reason, we will inform the user.
+    except OSError:
+        print("Error - cannot open file '" + args.training_file + "'")
+    except ValueError as error:
+        print("Error - " + str(error))
@@ -0,0 +1,143 @@
+import csv
+import json
+import os
+import sys
+import time
+
+model_format = "HW06TREE1"  # The format of the model files written by 'main.py' (write_model_file)
+max_emit_depth = 40  # Subtrees nested deeper than this are compiled as functions of their own
+compiled_models = {}  # The predictors that have been loaded, by the name, modification time and size of their file
+
+
+# This class holds a decision tree that has been loaded from a model file and compiled into a Python function
+# that is specialized for it, along with what is needed to normalize the rows of a csv file for it.
+class Predictor:
+    __slots__ = ("feature_names", "attr_steps", "class_labels", "node_count", "classify")
+
+    # argument 1 (model) - the contents of the model file
+    # argument 2 (classify) - the compiled function that classifies a normalized record
+    def __init__(self, model, classify):
+        self.feature_names = model["feature_names"]
+        self.attr_steps = model["attr_steps"]
+        self.class_labels = {int(class_id): label for class_id, label in model["class_labels"].items()}
+        self.node_count = len(model["feature"])
+        self.classify = classify
+
+    # This function will normalize the attributes of one row of a csv file, by rounding each of them to the
+    # nearest multiple of its step.
+    #
+    # argument 1 (row) - the row of the csv file, as a list of strings
+    def normalize(self, row):
+        return [round(float(row[attr_index]) / attr_step) * attr_step
+                for attr_index, attr_step in enumerate(self.attr_steps)]
+
+    # This function will determine the class of one row of a csv file.
+    #
+    # argument 1 (row) - the row of the csv file, as a list of strings
+    def predict_row(self, row):
+        return self.classify(self.normalize(row))
+
+
+# This function will write the source of a node of the decision tree (and its subtree) into a list of lines, the
+# same way write_tree_node in main.py writes the trained program (from a stack of nodes, so long chains of second
+# children do not recurse).
+#
+# argument 1 (model) - the contents of the model file
+# argument 2 (source_lines) - the lines of source that are being written
+# argument 3 (node) - the node of the decision tree that is written
+# argument 4 (indent) - the indentation of the node
+# argument 5 (depth) - how many levels of indentation the node has inside its function
+# argument 6 (function_nodes) - the list of nodes that will be written as functions of their own
+# argument 7 (shared_nodes) - the set of nodes that are always written as functions of their own
+def write_node_source(model, source_lines, node, indent, depth, function_nodes, shared_nodes):
+    pending_nodes = [(node, indent, depth)]  # The nodes still to be written, with the next one at the end
+    while pending_nodes:
+        node, indent, depth = pending_nodes.pop()
+        if model["left"][node] == -1:
+            source_lines.append(indent + "return " + str(model["value"][node]))
+        elif depth >= max_emit_depth or node in shared_nodes:
+            if node not in function_nodes:
+                function_nodes.append(node)
+            source_lines.append(indent + "return classify_node_" + str(node) + "(record)")
+        else:
+            source_lines.append(indent + "if record[" + str(model["feature"][node]) + "] <= " +
+                                str(model["threshold"][node]) + ":")
+            pending_nodes.append((model["right"][node], indent, depth))
+            pending_nodes.append((model["left"][node], indent + "    ", depth + 1))
+
+
+# This function will compile the decision tree of a model into a function that classifies a normalized record,
+# with the attributes and thresholds of every split written into its code. A simplified decision tree can reach
+# the same split from more than one place, and such splits are compiled once as functions of their own.
+#
+# argument 1 (model) - the contents of the model file
+def compile_model(model):
+    parent_counts = [0] * len(model["left"])
+    for node in range(len(model["left"])):
+        if model["left"][node] != -1:
+            parent_counts[model["left"][node]] += 1
+            parent_counts[model["right"][node]] += 1
+    shared_nodes = set(node for node in range(len(model["left"]))
+                       if parent_counts[node] > 1 and model["left"][node] != -1)
+
+    source_lines = ["def classify(record):"]
+    function_nodes = []  # The nodes whose subtrees still have to be written as functions of their own
+    write_node_source(model, source_lines, 0, "    ", 0, function_nodes, shared_nodes - {0})
+    for node in function_nodes:
+        source_lines.append("def classify_node_" + str(node) + "(record):")
+        write_node_source(model, source_lines, node, "    ", 0, function_nodes, shared_nodes - {node})
+
+    model_namespace = {}
+    exec(compile("\n".join(source_lines) + "\n", "<model>", "exec"), model_namespace)
+    return model_namespace["classify"]
+
+
+# This function will load a model file and compile it into a predictor. Predictors are cached, so loading the
+# same model file again is free until the file changes.
+#
+# argument 1 (model_name) - the name of the model file
+def load_predictor(model_name):
+    model_stat = os.stat(model_name)
+    cache_key = (os.path.abspath(model_name), model_stat.st_mtime_ns, model_stat.st_size)
+    if cache_key not in compiled_models:
+        with open(model_name) as model_file:
+            try:
+                model = json.load(model_file)
+            except ValueError:
+                model = None  # The file is not json at all
+        if not isinstance(model, dict) or model.get("format") != model_format:
+            raise ValueError("'" + model_name + "' is not a model file")
+        compiled_models[cache_key] = Predictor(model, compile_model(model))
+    return compiled_models[cache_key]
+
+
+# This function will load the model file specified in the command line and classify each row of a csv file
+# with it, writing the classes into another csv file the same way the trained program does.
+if __name__ == '__main__':
+    # If the amount of arguments (plus the name of the program) is not 3 or 4, we will inform the user.
+    if len(sys.argv) not in [3, 4]:
+        print("Error - invalid number of arguments (must specify the model file, the csv file, and optionally the "
+              "output file)")
+    else:
+        try:
+            start_time = time.perf_counter()
+            predictor = load_predictor(sys.argv[1])
+            print("Loaded '" + sys.argv[1] + "' (" + str(predictor.node_count) + " nodes) in " +
+                  format((time.perf_counter() - start_time) * 1000, ".2f") + " ms", file=sys.stderr)
+
+            output_name = sys.argv[3] if len(sys.argv) == 4 else "output.csv"
+            with open(sys.argv[2], newline="") as csv_file, open(output_name, "w", newline="") as output_file:
+                read_data = csv.reader(csv_file)
+                write_data = csv.writer(output_file)
+                header = next(read_data)
+                header.append('Class')
+                write_data.writerow(header)  # Puts the header in the output file
+                write_data.writerows([predictor.predict_row(row)] for row in read_data)
+
+        # If a file is unable to be opened for whatever reason, we will inform the user.
+        except OSError as error:
+            print("Error - cannot open file '" + error.filename + "'")
+
+        # If the model file is not one written by 'main.py', we will inform the user as well.
+        except ValueError as error:
+            print("Error - " + str(error))
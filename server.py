@@ -0,0 +1,196 @@
+import argparse
+import asyncio
+import csv
+import json
+import time
+
+import predictor
+
+status_reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}  # HTTP status lines
+
+
+# This class groups the records of requests that arrive close together into one batch, which is classified in one
+# pass when it has waited max_wait seconds since its first request arrived, or as soon as it holds max_rows
+# records. With a max_wait of 0 a batch holds the requests that were read in the same pass of the event loop, so
+# no request is held back. The compiled tree classifies a record in well under a microsecond, far less than it
+# takes to parse its request, so waiting longer only adds latency unless classifying is made more expensive.
+class MicroBatcher:
+    __slots__ = ("predictor", "max_wait", "max_rows", "pending", "pending_rows", "flush_timer", "batch_count",
+                 "request_count", "row_count")
+
+    # argument 1 (model) - the Predictor that classifies the records
+    # argument 2 (max_wait) - the longest a request waits for other requests to join its batch, in seconds
+    # argument 3 (max_rows) - the amount of records that makes a batch be classified straight away
+    def __init__(self, model, max_wait, max_rows):
+        self.predictor = model
+        self.max_wait = max_wait
+        self.max_rows = max_rows
+        self.pending = []  # The records of each request in the batch, with the future that gets their classes
+        self.pending_rows = 0  # The amount of records in the batch
+        self.flush_timer = None  # The timer that classifies the batch when it has waited long enough
+        self.batch_count = 0  # The amount of batches classified so far
+        self.request_count = 0  # The amount of requests classified so far
+        self.row_count = 0  # The amount of records classified so far
+
+    # This function will add the records of a request to the batch, and returns their classes once the batch
+    # has been classified.
+    #
+    # argument 1 (records) - the normalized records of the request
+    async def classify(self, records):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((records, future))
+        self.pending_rows += len(records)
+        if self.pending_rows >= self.max_rows:
+            self.flush()
+        elif self.flush_timer is None:
+            self.flush_timer = loop.call_later(self.max_wait, self.flush)
+        return await future
+
+    # This function will classify every record in the batch, and hands each request its classes.
+    def flush(self):
+        if self.flush_timer is not None:
+            self.flush_timer.cancel()
+            self.flush_timer = None
+        pending = self.pending
+        self.pending = []
+        self.pending_rows = 0
+
+        classify = self.predictor.classify
+        for records, future in pending:
+            if not future.cancelled():
+                future.set_result([classify(record) for record in records])
+            self.row_count += len(records)
+        self.batch_count += 1
+        self.request_count += len(pending)
+
+
+# This function will read the rows of a request body. A json body is either a list of rows or an object with a
+# list of rows under "rows", where each row is a list of values or an object keyed by the attribute names. A csv
+# body has one row on each line, optionally after a header.
+#
+# argument 1 (model) - the Predictor the rows are meant for
+# argument 2 (content_type) - the content type of the body
+# argument 3 (body) - the body of the request
+def parse_rows(model, content_type, body):
+    if content_type.startswith("text/csv"):
+        rows = [row for row in csv.reader(body.decode("utf-8").splitlines()) if row]
+        if rows and rows[0][0].strip() == model.feature_names[0]:
+            rows = rows[1:]  # We ignore the headers
+        return rows
+
+    rows = json.loads(body)
+    if isinstance(rows, dict):
+        rows = rows["rows"]
+    return [[row[name] for name in model.feature_names] if isinstance(row, dict) else row for row in rows]
+
+
+# This function will write an HTTP response with a json body.
+#
+# argument 1 (writer) - the stream of the connection
+# argument 2 (status) - the HTTP status code
+# argument 3 (content) - what is written as json into the body
+def write_response(writer, status, content):
+    body = json.dumps(content).encode("utf-8")
+    writer.write(("HTTP/1.1 " + str(status) + " " + status_reasons[status] + "\r\n"
+                  "Content-Type: application/json\r\nContent-Length: " + str(len(body)) + "\r\n\r\n").encode("ascii") +
+                 body)
+
+
+# This function will serve the requests of one connection until the client closes it. 'POST /predict' classifies
+# the rows in its body and answers with their classes, and 'GET /stats' answers with how much has been
+# classified so far.
+#
+# argument 1 (batcher) - the MicroBatcher that classifies the records
+# argument 2 (reader) - the stream the requests are read from
+# argument 3 (writer) - the stream the responses are written to
+async def serve_connection(batcher, reader, writer):
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            method, path = request_line.decode("ascii").split()[:2]
+
+            headers = {}
+            while True:
+                header_line = await reader.readline()
+                if header_line in [b"\r\n", b"\n", b""]:
+                    break
+                name, value = header_line.decode("latin-1").split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+            if path == "/stats":
+                write_response(writer, 200, {"requests": batcher.request_count, "rows": batcher.row_count,
+                                             "batches": batcher.batch_count})
+            elif path != "/predict":
+                write_response(writer, 404, {"error": "unknown path '" + path + "'"})
+            elif method != "POST":
+                write_response(writer, 405, {"error": "rows must be sent with POST"})
+            else:
+                try:
+                    records = [batcher.predictor.normalize(row)
+                               for row in parse_rows(batcher.predictor, headers.get("content-type", ""), body)]
+                except (ValueError, KeyError, IndexError, TypeError) as error:
+                    write_response(writer, 400, {"error": "invalid rows (" + repr(error) + ")"})
+                else:
+                    write_response(writer, 200, {"classes": await batcher.classify(records)})
+            await writer.drain()
+            if headers.get("connection", "").lower() == "close":
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass  # A client that goes away or sends a broken request line just loses its connection
+    finally:
+        writer.close()
+
+
+# This function will load the model file and serve it until the process is stopped, on a Unix socket if one is
+# given and on a localhost TCP port otherwise.
+#
+# argument 1 (args) - the command line arguments
+async def run_server(args):
+    start_time = time.perf_counter()
+    batcher = MicroBatcher(predictor.load_predictor(args.model_file), args.max_wait / 1000, args.max_rows)
+    print("Loaded '" + args.model_file + "' (" + str(batcher.predictor.node_count) + " nodes) in " +
+          format((time.perf_counter() - start_time) * 1000, ".2f") + " ms")
+
+    async def handle_connection(reader, writer):
+        await serve_connection(batcher, reader, writer)
+
+    if args.unix_socket:
+        scoring_server = await asyncio.start_unix_server(handle_connection, path=args.unix_socket)
+        print("Serving on unix socket '" + args.unix_socket + "'")
+    else:
+        scoring_server = await asyncio.start_server(handle_connection, host=args.host, port=args.port)
+        print("Serving on http://" + args.host + ":" + str(args.port))
+    async with scoring_server:
+        await scoring_server.serve_forever()
+
+
+# This function will start the scoring server with the options in the command line.
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve a model file written by 'main.py' over HTTP, classifying "
+                                                 "concurrent requests together in micro-batches.")
+    parser.add_argument("model_file", help="the model file to serve")
+    parser.add_argument("--host", default="127.0.0.1", help="the address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8506, help="the port to listen on (default: 8506)")
+    parser.add_argument("--unix-socket", help="listen on this Unix socket instead of a TCP port")
+    parser.add_argument("--max-wait", type=float, default=0.0,
+                        help="the longest a request waits for others to join its batch, in milliseconds. Only "
+                             "raise it when classifying a batch costs more than parsing its requests (default: 0, "
+                             "which batches the requests that arrive together without holding any back)")
+    parser.add_argument("--max-rows", type=int, default=4096,
+                        help="classify a batch as soon as it holds this many rows (default: 4096)")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run_server(args))
+    except KeyboardInterrupt:
+        pass
+
+    # If the model file is unable to be opened for whatever reason, we will inform the user.
+    except OSError as error:
+        print("Error - " + str(error))
+    except ValueError as error:
+        print("Error - " + str(error))